@@ -0,0 +1,873 @@
+"""
+Teste de carga local da aplicação (httpx + ASGITransport contra app.main:app, sem
+servidor) e medidas que precisam de processos novos ou de muitos dados, sobre
+planilhas sintéticas geradas por app.planilhas_sinteticas. Os micro-benchmarks das
+funções de app/utils.py ficam em tests/benchmarks (pytest-benchmark).
+
+Uso:
+    python -m app.benchmark [--itens 500] [--estacoes 40] [--usuarios 10] [--iteracoes 20]
+                            [--so carga|carga_login|senhas|workers|leitura|exportacao|memoria|resultados|partida] [--workers 1,2,4]
+                            [--linhas 1000000] [--linhas-exportacao 100000] [--banco postgresql://...]
+                            [--orcamento-partida-ms 1200]
+                            [--salvar-base base.json] [--comparar base.json] [--tolerancia 0.25]
+
+--so carga_login repete logins e GET /selecao_estacao enquanto outros usuários abrem
+formulários com os caches limpos (leitura fria), com as cargas no executor_planilhas e
+direto no event loop, e compara o p95 do login.
+--so senhas mede a vazão de cadastros e logins simultâneos, com o bcrypt no pool de
+threads e direto no event loop, e a latência de GET /login durante a rajada.
+--so workers sobe N processos ao mesmo tempo (como uvicorn --workers N), com e sem
+CACHE_COMPARTILHADO, e mede o tempo até cada um ter as planilhas processadas e a
+memória (RSS) de cada processo. --so leitura compara a leitura a frio das planilhas
+(ler_planilha contra o pd.read_excel por aba de antes): tempo e pico de RSS, cada
+medida num processo novo. --so exportacao mede tempo e pico de RSS da exportação de
+--linhas-exportacao resultados: gerar_excel e gerar_csv contra o to_excel anterior.
+--so memoria compara a memória ocupada pelos itens (TabelaItens, por coluna) com a
+de uma lista de dicionários, um por linha.
+--so resultados grava --linhas resultados sintéticos (SQLite descartável ou --banco,
+que deve estar vazio) e compara as consultas dos relatórios, lidas dos resumos, com
+as mesmas agregações calculadas direto na tabela resultados. --so partida mede o
+import de app.main (python -X importtime, processos novos) e termina com código 1 se
+a mediana passar de --orcamento-partida-ms ou se pandas/openpyxl forem importados.
+
+--comparar termina com código 1 se alguma medida ficar mais de --tolerancia
+(fração) acima da linha de base.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import re
+import statistics
+import subprocess
+import sys
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+# =====================================================
+# MEDIÇÃO
+# =====================================================
+def cronometrar(funcao, repeticoes=5, preparar=None):
+    """Executa funcao repeticoes vezes (preparar roda antes de cada uma, fora do tempo)"""
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        "mediana_ms": statistics.median(tempos) * 1000,
+        "min_ms": min(tempos) * 1000,
+        "repeticoes": repeticoes,
+    }
+
+
+def percentis(tempos):
+    ordenados = sorted(tempos)
+    posicao = lambda p: ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+    return {
+        "n": len(ordenados),
+        "p50_ms": posicao(0.50) * 1000,
+        "p95_ms": posicao(0.95) * 1000,
+        "p99_ms": posicao(0.99) * 1000,
+        "max_ms": ordenados[-1] * 1000,
+    }
+
+
+# =====================================================
+# CONVERSÃO DE LINHAS EM ITENS (_textos_da_tabela)
+# =====================================================
+def tabela_mista(linhas, seed=42):
+    """
+    DataFrame com o que aparece nas planilhas: textos com espaços nas pontas,
+    inteiros, decimais, datas, células e linhas inteiras vazias
+    """
+    import random
+    import pandas as pd
+
+    rng = random.Random(seed)
+    textos = [" EQ-{} ", "{}", "  ", "TAG {}\t"]
+    dados = {
+        "texto": [rng.choice(textos).format(n) if rng.random() > 0.2 else rng.choice([None, float("nan")])
+                  for n in range(linhas)],
+        "inteiro": [n if n % 9 else None for n in range(linhas)],
+        "decimal": [n / 8 if n % 4 else float("nan") for n in range(linhas)],
+        "data": [datetime(2024, 1, 1) + timedelta(hours=n) if n % 6 else None for n in range(linhas)],
+        "misto": [[n, f" {n} ", n * 0.5, True, None][n % 5] for n in range(linhas)],
+    }
+    df = pd.DataFrame(dados)
+    df.loc[df.index % 13 == 0, :] = None  # linhas inteiras vazias
+    return df
+
+
+def itens_por_linha(df):
+    """Conversão anterior ao _textos_da_tabela (iterrows, célula a célula), como referência"""
+    import pandas as pd
+
+    itens = []
+    for _, row in df.iterrows():
+        if pd.isna(row).all():
+            continue
+        item = {}
+        for col in df.columns:
+            val = row[col]
+            item[col] = str(val).strip() if pd.notna(val) else ""
+        itens.append(item)
+    return itens
+
+
+def itens_por_coluna(df):
+    """Mesma saída de itens_por_linha, pelo _textos_da_tabela"""
+    from app.utils import _textos_da_tabela
+
+    textos, vazias = _textos_da_tabela(df)
+    textos.columns = df.columns
+    return textos[~vazias].to_dict("records")
+
+
+# =====================================================
+# ENVIO DO FORMULÁRIO ISOLADO (MILHARES DE ITENS)
+# =====================================================
+def campos_envio(itens):
+    """Campos de um /enviar com itens itens, distribuídos pelas abas do MAPEAMENTO_ABAS"""
+    from app.utils import MAPEAMENTO_ABAS
+
+    abas = list(MAPEAMENTO_ABAS.values())
+    campos = {"estacao": "CPR"}
+    for n in range(1, itens + 1):
+        info = abas[n % len(abas)]
+        campos.update({f"status_{n}": "OK" if n % 7 else "NOK", f"just_{n}": "" if n % 5 else "folga no borne",
+                       f"equipamento_{n}": f"EQ-{n}", f"aba_{n}": info["titulo"]})
+        if info.get("campo_medido"):
+            campos[f"{info['campo_medido']}_{n}"] = f"{n % 230} V"
+    return campos
+
+
+# =====================================================
+# TESTE DE CARGA (ASGI, SEM SERVIDOR)
+# =====================================================
+async def teste_carga(usuarios, iteracoes, estacoes):
+    try:
+        import httpx
+    except ImportError:
+        sys.exit("O teste de carga precisa do httpx (pip install httpx)")
+    from app.main import MAPEAMENTO_ABAS, app
+
+    tempos = {}
+    erros = {}
+
+    async def requisicao(cenario, cliente, metodo, url, **kwargs):
+        inicio = time.perf_counter()
+        resposta = await cliente.request(metodo, url, **kwargs)
+        tempos.setdefault(cenario, []).append(time.perf_counter() - inicio)
+        # Redirecionar para o login também é falha (sessão perdida)
+        if resposta.status_code >= 400 or resposta.headers.get("location", "").startswith("/login"):
+            erros[cenario] = erros.get(cenario, 0) + 1
+        return resposta
+
+    def novo_cliente():
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+
+    async def usuario_virtual(numero):
+        nome = f"benchmark{numero}"
+        estacao = estacoes[numero % len(estacoes)]
+        async with novo_cliente() as cliente:
+            await cliente.post("/register", data={"username": nome, "password": "senha", "email": f"{nome}@benchmark"})
+            await requisicao("login", cliente, "POST", "/login", data={"username": nome, "password": "senha"})
+            for i in range(iteracoes):
+                aba_id = str(i % 6 + 1)
+                await requisicao("visualizar_aba", cliente, "GET", f"/formulario_isolado/CPR/{aba_id}")
+                await requisicao("formulario_campo", cliente, "GET", f"/formulario_campo/{estacao}")
+
+                # Como o formulário: aba_<n> leva o nome da aba na planilha, não o número
+                envio = {"estacao": "CPR"}
+                for item in range(1, 21):
+                    envio.update({f"status_{item}": "OK", f"aba_{item}": MAPEAMENTO_ABAS[aba_id]["titulo"],
+                                  f"equipamento_{item}": f"EQ-{item}", f"just_{item}": ""})
+                await requisicao("enviar", cliente, "POST", "/enviar", data=envio)
+
+                campos = {}
+                for item in range(1, 11):
+                    campos.update({f"comunicacao_{item}_status": "OK", f"comunicacao_{item}_equipamento": f"EQ-{item}"})
+                await requisicao("salvar_formulario_campo", cliente, "POST", "/salvar_formulario_campo",
+                                 json={"estacao": estacao, "comunicacao": campos})
+
+    async with app.router.lifespan_context(app):
+        inicio = time.perf_counter()
+        await asyncio.gather(*(usuario_virtual(n) for n in range(usuarios)))
+        duracao = time.perf_counter() - inicio
+
+    cenarios = {nome: dict(percentis(t), erros=erros.get(nome, 0)) for nome, t in tempos.items()}
+    for nome, r in cenarios.items():
+        print(f"   {nome:<26} n={r['n']:<5} p50={r['p50_ms']:>8.1f} ms  p95={r['p95_ms']:>8.1f} ms  "
+              f"p99={r['p99_ms']:>8.1f} ms  erros={r['erros']}")
+    total = sum(len(t) for t in tempos.values())
+    print(f"   {total} requisições em {duracao:.2f} s ({total / duracao:.1f} req/s)")
+    return {"cenarios": cenarios, "requisicoes_por_segundo": total / duracao}
+
+
+# =====================================================
+# LOGIN DURANTE CARGAS FRIAS DE PLANILHA
+# =====================================================
+async def benchmark_carga_login(usuarios, iteracoes, estacoes):
+    """
+    usuarios clientes repetem POST /login e GET /selecao_estacao enquanto outros
+    usuarios clientes abrem formulários com os caches limpos antes de cada página
+    (leitura fria da planilha e do índice por estação). Roda com as cargas no
+    executor_planilhas e, para comparação, direto no event loop como antes.
+    """
+    try:
+        import httpx
+    except ImportError:
+        sys.exit("O benchmark de login durante cargas precisa do httpx (pip install httpx)")
+    from app import main as aplicacao, utils
+
+    async def no_event_loop(funcao, *args, chave=None):
+        return funcao(*args)
+
+    def novo_cliente():
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=aplicacao.app), base_url="http://benchmark")
+
+    async def rodada(modo):
+        tempos = {}
+        terminou = asyncio.Event()
+
+        async def requisicao(cenario, cliente, metodo, url, **kwargs):
+            inicio = time.perf_counter()
+            resposta = await cliente.request(metodo, url, **kwargs)
+            tempos.setdefault(cenario, []).append(time.perf_counter() - inicio)
+            if resposta.status_code >= 400 or resposta.headers.get("location", "").startswith("/login"):
+                raise RuntimeError(f"{cenario}: {metodo} {url} -> {resposta.status_code}")
+
+        async def entrar(cliente, nome):
+            await cliente.post("/register", data={"username": nome, "password": "senha", "email": f"{nome}@benchmark"})
+            await requisicao("login sem carga", cliente, "POST", "/login", data={"username": nome, "password": "senha"})
+
+        async def usuario_login(numero):
+            nome = f"login_{modo}_{numero}"
+            async with novo_cliente() as cliente:
+                await entrar(cliente, nome)
+                while not terminou.is_set():
+                    await requisicao("login", cliente, "POST", "/login", data={"username": nome, "password": "senha"})
+                    await requisicao("selecao_estacao", cliente, "GET", "/selecao_estacao")
+
+        async def usuario_formulario(numero):
+            async with novo_cliente() as cliente:
+                await entrar(cliente, f"formulario_{modo}_{numero}")
+                await prontos.wait()
+                for i in range(iteracoes):
+                    utils.cache_planilhas.limpar()
+                    utils.indice_estacoes.limpar()
+                    if i % 2:
+                        url = f"/formulario_campo/{estacoes[(numero + i) % len(estacoes)]}"
+                    else:
+                        url = f"/formulario_isolado/CPR/{(numero + i) % len(utils.MAPEAMENTO_ABAS) + 1}"
+                    await requisicao("formulario frio", cliente, "GET", url)
+
+        prontos = asyncio.Event()
+        logins = [asyncio.create_task(usuario_login(n)) for n in range(usuarios)]
+        formularios = [asyncio.create_task(usuario_formulario(n)) for n in range(usuarios)]
+        # Os formulários começam depois dos primeiros logins, para medir o login sem carga à parte
+        while len(tempos.get("login sem carga", [])) < 2 * usuarios:
+            await asyncio.sleep(0.01)
+        prontos.set()
+        await asyncio.gather(*formularios)
+        terminou.set()
+        await asyncio.gather(*logins)
+        return {cenario: percentis(t) for cenario, t in tempos.items()}
+
+    resultado = {}
+    originais = aplicacao.executar_em_pool, utils.executar_em_pool
+    for modo in ("event_loop", "pool"):
+        if modo == "event_loop":
+            aplicacao.executar_em_pool = utils.executar_em_pool = no_event_loop
+        try:
+            async with aplicacao.app.router.lifespan_context(aplicacao.app):
+                resultado[modo] = await rodada(modo)
+        finally:
+            aplicacao.executar_em_pool, utils.executar_em_pool = originais
+        for cenario in ("login sem carga", "login", "selecao_estacao", "formulario frio"):
+            r = resultado[modo][cenario]
+            print(f"   {modo:<10} {cenario:<16} n={r['n']:<5} p50={r['p50_ms']:>8.1f} ms  "
+                  f"p95={r['p95_ms']:>8.1f} ms  max={r['max_ms']:>8.1f} ms")
+    return resultado
+
+
+# =====================================================
+# LOGINS SIMULTÂNEOS (BCRYPT)
+# =====================================================
+async def benchmark_senhas(usuarios):
+    """
+    Rajada de cadastros e logins simultâneos (início de turno), com o bcrypt no
+    PoolSenhas e, para comparação, direto no event loop como antes. Durante a
+    rajada, um cliente pede GET /login em sequência: a latência dele mostra
+    quanto o resto do tráfego espera pelo bcrypt.
+    """
+    try:
+        import httpx
+    except ImportError:
+        sys.exit("O benchmark de logins precisa do httpx (pip install httpx)")
+    from app import main as aplicacao
+
+    async def no_event_loop(funcao, *args):
+        return funcao(*args)
+
+    def novo_cliente():
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=aplicacao.app), base_url="http://benchmark")
+
+    async def rajada(prefixo, metodo_rota):
+        status = []
+        terminou = asyncio.Event()
+
+        async def usuario(numero):
+            nome = f"{prefixo}{numero}"
+            async with novo_cliente() as cliente:
+                resposta = await cliente.post(metodo_rota, data={"username": nome, "password": "senha", "email": f"{nome}@benchmark"})
+                status.append(resposta.status_code)
+
+        async def sonda():
+            tempos = []
+            async with novo_cliente() as cliente:
+                while not terminou.is_set():
+                    inicio = time.perf_counter()
+                    await cliente.get("/login")
+                    tempos.append(time.perf_counter() - inicio)
+                    await asyncio.sleep(0.01)
+            return tempos
+
+        tarefa_sonda = asyncio.create_task(sonda())
+        inicio = time.perf_counter()
+        await asyncio.gather(*(usuario(n) for n in range(usuarios)))
+        duracao = time.perf_counter() - inicio
+        terminou.set()
+        tempos = await tarefa_sonda
+        falhas = sum(1 for codigo in status if codigo >= 400)
+        return {"duracao_s": duracao, "por_segundo": usuarios / duracao, "falhas": falhas,
+                "sonda_get_login": percentis(tempos)}
+
+    resultado = {}
+    executar_original = aplicacao.pool_senhas.executar
+    async with aplicacao.app.router.lifespan_context(aplicacao.app):
+        for modo, executar in (("event_loop", no_event_loop), ("pool", executar_original)):
+            aplicacao.pool_senhas.executar = executar
+            try:
+                for rota in ("/register", "/login"):
+                    r = await rajada(f"senhas_{modo}_", rota)
+                    resultado[f"{modo} {rota}"] = r
+                    print(f"   {modo:<10} {rota:<9} {usuarios} simultâneos em {r['duracao_s']:.2f} s "
+                          f"({r['por_segundo']:.1f}/s, falhas={r['falhas']})  GET /login durante a rajada: "
+                          f"n={r['sonda_get_login']['n']} p50={r['sonda_get_login']['p50_ms']:.1f} ms max={r['sonda_get_login']['max_ms']:.1f} ms")
+            finally:
+                aplicacao.pool_senhas.executar = executar_original
+    return resultado
+
+
+# =====================================================
+# VÁRIOS WORKERS (CACHE COMPARTILHADO)
+# =====================================================
+def _rss_mb():
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+def _worker(inicio, resultados):
+    """Um processo worker: importa a aplicação e processa as planilhas (como AQUECER_PLANILHAS=true)"""
+    from app import main, utils
+    utils.aquecer_planilhas()
+    resultados.put({"partida_s": time.time() - inicio, "rss_mb": _rss_mb()})
+
+
+def benchmark_workers(contagens, pasta):
+    contexto = multiprocessing.get_context("spawn")
+    base_compartilhado = "/dev/shm" if os.path.isdir("/dev/shm") else pasta
+    resultados = {}
+    for modo in ("local", "compartilhado"):
+        for quantidade in contagens:
+            destino = ""
+            if modo == "compartilhado":
+                destino = tempfile.mkdtemp(prefix="benchmark_cache_", dir=base_compartilhado)
+            os.environ["CACHE_COMPARTILHADO"] = destino
+
+            fila = contexto.Queue()
+            inicio = time.time()
+            processos = [contexto.Process(target=_worker, args=(inicio, fila)) for _ in range(quantidade)]
+            for processo in processos:
+                processo.start()
+            for processo in processos:
+                processo.join()
+            if any(processo.exitcode for processo in processos):
+                sys.exit(f"Um dos workers terminou com erro ({modo} x{quantidade})")
+            medidas = [fila.get() for _ in processos]
+            if destino:
+                shutil.rmtree(destino, ignore_errors=True)
+
+            nome = f"{modo} x{quantidade}"
+            resultados[nome] = {
+                "partida_max_s": max(m["partida_s"] for m in medidas),
+                "rss_medio_mb": statistics.mean(m["rss_mb"] for m in medidas),
+                "rss_total_mb": sum(m["rss_mb"] for m in medidas),
+            }
+            r = resultados[nome]
+            print(f"   {nome:<18} partida (último worker) {r['partida_max_s']:>6.2f} s   "
+                  f"RSS/worker {r['rss_medio_mb']:>7.1f} MB   RSS total {r['rss_total_mb']:>7.1f} MB")
+    os.environ["CACHE_COMPARTILHADO"] = ""
+    return resultados
+
+
+# =====================================================
+# LEITURA A FRIO DA PLANILHA (LER_PLANILHA x READ_EXCEL POR ABA)
+# =====================================================
+def ler_planilha_anterior(caminho_planilha, escolher_abas):
+    """Leitura anterior ao ler_planilha: pd.ExcelFile e um pd.read_excel por aba, reabrindo o arquivo"""
+    import pandas as pd
+
+    xlsx = pd.ExcelFile(caminho_planilha)
+    return {nome: pd.read_excel(caminho_planilha, sheet_name=nome) for nome in escolher_abas(xlsx.sheet_names)}
+
+
+def _pico_rss_mb():
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith("VmHWM:"):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+def _worker_leitura(leitor, caminho_planilha, escolha, resultados):
+    """Um processo novo por medida: imports fora do tempo, leitura a frio, pico de RSS do processo"""
+    import pandas  # noqa: F401
+    import openpyxl  # noqa: F401
+    from app import utils
+
+    ler = utils.ler_planilha if leitor == "ler_planilha" else ler_planilha_anterior
+    rss_inicial = _rss_mb()
+    inicio = time.perf_counter()
+    planilha = ler(caminho_planilha, getattr(utils, escolha))
+    resultados.put({
+        "tempo_s": time.perf_counter() - inicio,
+        "pico_rss_mb": _pico_rss_mb(),
+        "pico_acima_imports_mb": _pico_rss_mb() - rss_inicial,
+        "linhas": sum(len(df) for df in planilha.values()),
+    })
+
+
+def _em_processo_novo(alvo, *args):
+    """Roda alvo(*args, fila) num processo novo (spawn) e devolve o que ele colocou na fila"""
+    contexto = multiprocessing.get_context("spawn")
+    fila = contexto.Queue()
+    processo = contexto.Process(target=alvo, args=(*args, fila))
+    processo.start()
+    try:
+        while True:
+            try:
+                return fila.get(timeout=1)
+            except queue.Empty:
+                if not processo.is_alive():
+                    sys.exit(f"O processo de medida terminou com erro ({alvo.__name__}{args})")
+    finally:
+        processo.join()
+
+
+def benchmark_leitura(planilha, planilha_campo, repeticoes):
+    resultados = {}
+    for caminho, escolha in ((planilha, "abas_mapeadas"), (planilha_campo, "abas_formulario_campo")):
+        for leitor in ("read_excel por aba", "ler_planilha"):
+            medidas = [_em_processo_novo(_worker_leitura, leitor, caminho, escolha) for _ in range(repeticoes)]
+
+            nome = f"{os.path.basename(caminho)} {leitor}"
+            resultados[nome] = {
+                "tempo_mediano_s": statistics.median(m["tempo_s"] for m in medidas),
+                "pico_rss_mb": statistics.median(m["pico_rss_mb"] for m in medidas),
+                "pico_acima_imports_mb": statistics.median(m["pico_acima_imports_mb"] for m in medidas),
+                "linhas": medidas[0]["linhas"],
+            }
+            r = resultados[nome]
+            print(f"   {nome:<42} {r['tempo_mediano_s']:>6.2f} s   pico RSS {r['pico_rss_mb']:>7.1f} MB "
+                  f"(+{r['pico_acima_imports_mb']:.1f} MB na leitura)   {r['linhas']} linhas")
+    return resultados
+
+
+# =====================================================
+# EXPORTAÇÃO DOS RESULTADOS (GERAR_EXCEL x TO_EXCEL)
+# =====================================================
+def linhas_exportacao(quantidade):
+    """Linhas como as de /exportar_resultados, geradas sob demanda (como o cursor com yield_per)"""
+    inicio = datetime(2024, 1, 1)
+    for n in range(quantidade):
+        yield {"Data": inicio + timedelta(minutes=n), "Usuario": f"usuario{n % 50}", "Estacao": f"E{n % 40:03d}",
+               "Aba": "SENSORES", "Equipamento": f"EQ-{n % 5000}", "Status": "OK" if n % 9 else "NOK",
+               "Justificativa": "" if n % 9 else "leitura fora da faixa"}
+
+
+def salvar_resultados_anterior(caminho_saida, dados):
+    """Exportação anterior ao escrever_excel: a lista inteira num DataFrame e to_excel"""
+    import pandas as pd
+
+    df = pd.DataFrame(dados)
+    df.to_excel(caminho_saida, index=False)
+
+
+def _worker_exportacao(exportador, quantidade, resultados):
+    import pandas  # noqa: F401
+    import openpyxl  # noqa: F401
+    from app import utils
+
+    rss_inicial = _rss_mb()
+    inicio = time.perf_counter()
+    with tempfile.TemporaryDirectory() as pasta:
+        destino = os.path.join(pasta, "resultados")
+        if exportador == "salvar_resultados anterior":
+            # A rota anterior montava a lista com todos os resultados antes de exportar
+            salvar_resultados_anterior(destino + ".xlsx", list(linhas_exportacao(quantidade)))
+        else:
+            gerar = utils.gerar_excel if exportador == "gerar_excel" else utils.gerar_csv
+            with open(destino, "wb") as arquivo:
+                for bloco in gerar(linhas_exportacao(quantidade)):
+                    arquivo.write(bloco if isinstance(bloco, bytes) else bloco.encode())
+        tamanho = sum(os.path.getsize(os.path.join(pasta, nome)) for nome in os.listdir(pasta))
+    resultados.put({
+        "tempo_s": time.perf_counter() - inicio,
+        "pico_rss_mb": _pico_rss_mb(),
+        "pico_acima_imports_mb": _pico_rss_mb() - rss_inicial,
+        "tamanho_mb": tamanho / 1024 / 1024,
+    })
+
+
+def benchmark_exportacao(quantidade):
+    resultados = {}
+    for exportador in ("salvar_resultados anterior", "gerar_excel", "gerar_csv"):
+        r = resultados[exportador] = _em_processo_novo(_worker_exportacao, exportador, quantidade)
+        print(f"   {exportador:<28} {r['tempo_s']:>6.2f} s   pico RSS {r['pico_rss_mb']:>7.1f} MB "
+              f"(+{r['pico_acima_imports_mb']:.1f} MB na exportação)   arquivo {r['tamanho_mb']:.1f} MB")
+    return resultados
+
+
+# =====================================================
+# MEMÓRIA DOS ITENS (TABELAITENS x LISTA DE DICIONÁRIOS)
+# =====================================================
+def tamanho_profundo(objeto):
+    """Bytes do objeto e de tudo que ele referencia (objetos compartilhados contam uma vez)"""
+    from app.tabela_itens import TabelaItens
+
+    vistos, pilha, total = set(), [objeto], 0
+    while pilha:
+        atual = pilha.pop()
+        if id(atual) in vistos:
+            continue
+        vistos.add(id(atual))
+        total += sys.getsizeof(atual)
+        if isinstance(atual, dict):
+            pilha.extend(atual.keys())
+            pilha.extend(atual.values())
+        elif isinstance(atual, (list, tuple, set)):
+            pilha.extend(atual)
+        elif isinstance(atual, TabelaItens):
+            pilha.extend((atual.colunas, atual._posicoes, atual._dados))
+    return total
+
+
+def _como_dicionarios(tabela):
+    """Layout anterior: um dicionário por linha, com um objeto str próprio por célula"""
+    copiar = lambda v: v.encode().decode() if isinstance(v, str) else v
+    return [{chave: copiar(valor) for chave, valor in linha.items()} for linha in tabela]
+
+
+def benchmark_memoria(planilha, planilha_campo):
+    from app import utils
+
+    itens = {aba_id: utils._carregar_itens(planilha, aba_id)["items"] for aba_id in utils.MAPEAMENTO_ABAS}
+    grupos = utils.construir_indice_estacoes(planilha_campo).grupos
+    conjuntos = {
+        "formulário isolado (todas as abas)": (itens, {a: _como_dicionarios(t) for a, t in itens.items()}),
+        "índice do formulário campo": (grupos, {
+            tipo: {estacao: _como_dicionarios(t) for estacao, t in por_estacao.items()}
+            for tipo, por_estacao in grupos.items()
+        }),
+    }
+
+    resultados = {}
+    for nome, (tabelas, dicionarios) in conjuntos.items():
+        atual, anterior = tamanho_profundo(tabelas), tamanho_profundo(dicionarios)
+        resultados[nome] = {"tabela_itens_mb": atual / 2**20, "dicionarios_mb": anterior / 2**20}
+        print(f"   {nome:<36} dicionários {anterior / 2**20:>8.2f} MB   TabelaItens {atual / 2**20:>8.2f} MB "
+              f"({atual / anterior:.0%})")
+    return resultados
+
+
+# =====================================================
+# RELATÓRIOS DOS RESULTADOS (RESUMOS x VARREDURA)
+# =====================================================
+ABAS_SINTETICAS = ["ATERRAMENTO", "ALIMENTAÇÃO", "COMUNICAÇÃO", "SENSORES", "DESEMPENHO DO SISTEMA", "INSPEÇÃO VISUAL"]
+
+
+def resultados_sinteticos(quantidade, estacoes, rng, inicio, dias=365, equipamentos=200):
+    """Envios de 20 itens da mesma estação e aba, espalhados por dias dias; ~15% NOK"""
+    envio = []
+    for _ in range(quantidade):
+        if not envio:
+            estacao, aba = rng.choice(estacoes), rng.choice(ABAS_SINTETICAS)
+            data = inicio + timedelta(seconds=rng.randrange(dias * 86400))
+        envio.append({
+            "data": data, "usuario": f"benchmark{rng.randrange(50)}", "estacao": estacao, "aba": aba,
+            "equipamento": f"EQ-{rng.randrange(equipamentos)}", "status": "NOK" if rng.random() < 0.15 else "OK",
+            "justificativa": "", "valor_medido": None,
+        })
+        if len(envio) == 20:
+            yield from envio
+            envio = []
+    yield from envio
+
+
+def benchmark_resultados(linhas, estacoes, repeticoes):
+    import random
+    from sqlalchemy import func, insert, select
+    from app import main
+
+    main.preparar_banco()
+    with main.SessionLocal() as db:
+        if db.scalar(select(main.Resultado.id).limit(1)) is not None:
+            sys.exit("--so resultados precisa de um banco sem resultados (use um banco descartável)")
+
+    rng = random.Random(42)
+    inicio = datetime(2025, 1, 1)
+    resultados = {"banco": main.engine.dialect.name, "linhas": linhas}
+
+    # Gravação por envio (20 itens): sem e com a atualização dos resumos na transação
+    amostra = list(resultados_sinteticos(20 * 200, estacoes, rng, inicio))
+    envios = [amostra[i:i + 20] for i in range(0, len(amostra), 20)]
+
+    def gravar_sem_resumos(linhas_envio):
+        with main.SessionLocal() as db, db.begin():
+            db.execute(insert(main.Resultado), linhas_envio)
+
+    for nome, gravar in (("envio sem resumos", gravar_sem_resumos), ("envio com resumos", main.gravar_resultados)):
+        tempos = []
+        for linhas_envio in envios:
+            t = time.perf_counter()
+            gravar(linhas_envio)
+            tempos.append(time.perf_counter() - t)
+        resultados[nome] = percentis(tempos)
+        print(f"   {nome:<34} p50={resultados[nome]['p50_ms']:>7.2f} ms  p95={resultados[nome]['p95_ms']:>7.2f} ms")
+
+    # Carga em massa e cálculo completo dos resumos (o que preencher_resumos faz num banco antigo)
+    t = time.perf_counter()
+    restantes = resultados_sinteticos(linhas - 2 * len(amostra), estacoes, rng, inicio)
+    while True:
+        lote = [linha for _, linha in zip(range(50_000), restantes)]
+        if not lote:
+            break
+        with main.SessionLocal() as db, db.begin():
+            db.execute(insert(main.Resultado), lote)
+    print(f"   carga de {linhas} resultados: {time.perf_counter() - t:.1f} s")
+    resultados["reconstruir_resumos_s"] = cronometrar(main.reconstruir_resumos, 1)["mediana_ms"] / 1000
+    print(f"   reconstruir_resumos: {resultados['reconstruir_resumos_s']:.1f} s")
+
+    R = main.Resultado
+    nok = func.count().filter(R.status == "NOK")
+    varreduras = {
+        "NOK por estação": (["estacao"], {}, select(R.estacao, func.count(), nok).group_by(R.estacao)),
+        "NOK por aba de uma estação": (["aba"], {"estacao": estacoes[0]},
+                                       select(R.aba, func.count(), nok).where(R.estacao == estacoes[0]).group_by(R.aba)),
+        "NOK por equipamento de uma aba": (["equipamento"], {"aba": ABAS_SINTETICAS[0]},
+                                           select(R.equipamento, func.count(), nok).where(R.aba == ABAS_SINTETICAS[0])
+                                           .group_by(R.equipamento)),
+        "NOK por dia de uma estação": (["dia"], {"estacao": estacoes[0]},
+                                       select(func.date(R.data), func.count(), nok).where(R.estacao == estacoes[0])
+                                       .group_by(func.date(R.data))),
+    }
+
+    def executar(query):
+        with main.SessionLocal() as db:
+            return db.execute(query).all()
+
+    for nome, (agrupar, filtros, query) in varreduras.items():
+        resumo = cronometrar(lambda: main.consultar_resumo(agrupar, **filtros), repeticoes)
+        varredura = cronometrar(lambda: executar(query), repeticoes)
+        resultados[nome] = {"resumo_ms": resumo["mediana_ms"], "varredura_ms": varredura["mediana_ms"]}
+        print(f"   {nome:<34} resumos {resumo['mediana_ms']:>9.2f} ms   varredura {varredura['mediana_ms']:>9.2f} ms")
+
+    consultas = {
+        "pendências (NOK) de uma estação": lambda: main.consultar_ultimo_status(estacao=estacoes[0], status="NOK"),
+        "histórico de um equipamento": lambda: main.consultar_historico(estacoes[0], "EQ-1"),
+    }
+    for nome, consulta in consultas.items():
+        resultados[nome] = {"resumo_ms": cronometrar(consulta, repeticoes)["mediana_ms"]}
+        print(f"   {nome:<34} {resultados[nome]['resumo_ms']:>9.2f} ms")
+    return resultados
+
+
+# =====================================================
+# PARTIDA (IMPORT DE APP.MAIN)
+# =====================================================
+# Só devem ser importados na primeira leitura/escrita de planilha
+IMPORTS_ADIADOS = ("pandas", "openpyxl", "numpy")
+LINHA_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def _importtime(modulo):
+    """Tempos acumulados (ms) de python -X importtime -c 'import modulo' num processo novo, por módulo"""
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                              cwd=raiz, capture_output=True, text=True, check=True)
+    tempos = {}
+    for linha in processo.stderr.splitlines():
+        encontrado = LINHA_IMPORTTIME.match(linha)
+        if encontrado:
+            nivel = len(encontrado.group(3)) // 2  # 0: importado por modulo (ou o próprio)
+            tempos[encontrado.group(4)] = (int(encontrado.group(2)) / 1000, nivel)
+    return tempos
+
+
+def benchmark_partida(repeticoes, orcamento_ms):
+    execucoes = [_importtime("app.main") for _ in range(repeticoes)]
+    total = statistics.median(tempos["app.main"][0] for tempos in execucoes)
+    diretos = {nome for tempos in execucoes for nome, (_, nivel) in tempos.items() if nivel == 1}
+    modulos = {nome: statistics.median(tempos.get(nome, (0, 0))[0] for tempos in execucoes) for nome in diretos}
+    adiados = sorted(nome for nome in IMPORTS_ADIADOS if any(nome in tempos for tempos in execucoes))
+
+    print(f"   import app.main: mediana {total:.0f} ms em {repeticoes} processos (orçamento {orcamento_ms:.0f} ms)")
+    for nome, ms in sorted(modulos.items(), key=lambda item: -item[1])[:8]:
+        print(f"      {nome:<32} {ms:>8.1f} ms")
+    if adiados:
+        print(f"   ⚠️  importados no boot: {', '.join(adiados)}")
+    return {"import_app_main_ms": total, "orcamento_ms": orcamento_ms, "modulos_ms": modulos, "imports_adiados_no_boot": adiados}
+
+
+# =====================================================
+# LINHA DE BASE
+# =====================================================
+def medidas_comparaveis(resultado):
+    """
+    Medidas em que maior é pior: p95 de cada cenário do teste de carga e
+    mediana do import de app.main
+    """
+    medidas = {}
+    for nome, r in resultado.get("carga", {}).get("cenarios", {}).items():
+        medidas[f"carga {nome} p95"] = r["p95_ms"]
+    if "partida" in resultado:
+        medidas["partida import app.main"] = resultado["partida"]["import_app_main_ms"]
+    return medidas
+
+
+# Diferenças menores que isso são ruído de medição, mesmo que a variação relativa seja grande
+MARGEM_ABSOLUTA_MS = 0.05
+
+
+def comparar(resultado, base, tolerancia):
+    atuais, anteriores = medidas_comparaveis(resultado), medidas_comparaveis(base)
+    regressoes = []
+    print(f"\n📊 Comparação com a linha de base (tolerância {tolerancia:.0%})")
+    for nome, atual in atuais.items():
+        anterior = anteriores.get(nome)
+        if anterior is None:
+            continue
+        variacao = (atual - anterior) / anterior if anterior else 0.0
+        regrediu = variacao > tolerancia and atual - anterior > MARGEM_ABSOLUTA_MS
+        if regrediu:
+            regressoes.append(nome)
+        marca = "🔴" if regrediu else "🟢"
+        print(f"   {marca} {nome:<48} {anterior:>10.2f} → {atual:>10.2f} ms ({variacao:+.0%})")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks e teste de carga com planilhas sintéticas")
+    parser.add_argument("--itens", type=int, default=500, help="linhas por aba das planilhas sintéticas")
+    parser.add_argument("--estacoes", type=int, default=40)
+    parser.add_argument("--repeticoes", type=int, default=5, help="repetições de cada medida")
+    parser.add_argument("--usuarios", type=int, default=10, help="usuários simultâneos no teste de carga")
+    parser.add_argument("--iteracoes", type=int, default=20, help="ciclos (aba, formulário campo, envios) por usuário")
+    parser.add_argument("--so", choices=["carga", "carga_login", "senhas", "workers", "leitura", "exportacao", "memoria", "resultados", "partida"])
+    parser.add_argument("--workers", default="1,2,4", help="quantidades de processos para --so workers")
+    parser.add_argument("--linhas", type=int, default=1_000_000, help="resultados sintéticos para --so resultados")
+    parser.add_argument("--linhas-exportacao", type=int, default=100_000, help="linhas exportadas em --so exportacao")
+    parser.add_argument("--banco", help="DATABASE_URL para --so resultados (padrão: SQLite descartável)")
+    parser.add_argument("--orcamento-partida-ms", type=float, default=1200,
+                        help="tempo máximo (mediana) do import de app.main para --so partida")
+    parser.add_argument("--salvar-base", metavar="ARQUIVO")
+    parser.add_argument("--comparar", metavar="ARQUIVO")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args()
+
+    # Antes de importar qualquer módulo da aplicação: planilhas sintéticas e banco descartável
+    pasta = tempfile.mkdtemp(prefix="benchmark_")
+    planilha = os.environ["PLANILHA"] = os.path.join(pasta, "planilha.xlsx")
+    planilha_campo = os.environ["PLANILHA_CAMPO"] = os.path.join(pasta, "planilha_campo.xlsx")
+    os.environ["ARTEFATO_PLANILHAS"] = os.path.join(pasta, "artefato.pkl")
+    os.environ["DATABASE_URL"] = args.banco or f"sqlite:///{os.path.join(pasta, 'benchmark.db')}"
+
+    from app.planilhas_sinteticas import gerar_planilha, gerar_planilha_campo, lista_estacoes
+    gerar_planilha(planilha, args.itens)
+    gerar_planilha_campo(planilha_campo, args.itens, args.estacoes)
+
+    resultado = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {k: v for k, v in vars(args).items() if k in ("itens", "estacoes", "repeticoes", "usuarios", "iteracoes")},
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(), "cpus": os.cpu_count()},
+    }
+    print(f"📁 Planilhas sintéticas em {pasta}")
+
+    if args.so == "workers":
+        print("\n🧮 Vários workers, sem e com cache compartilhado")
+        resultado["workers"] = benchmark_workers([int(n) for n in args.workers.split(",")], pasta)
+    if args.so == "leitura":
+        print(f"\n📖 Leitura a frio das planilhas ({args.itens} linhas por aba, um processo novo por medida)")
+        resultado["leitura"] = benchmark_leitura(planilha, planilha_campo, args.repeticoes)
+    if args.so == "exportacao":
+        print(f"\n📤 Exportação de {args.linhas_exportacao} resultados (um processo novo por exportador)")
+        resultado["exportacao"] = benchmark_exportacao(args.linhas_exportacao)
+    if args.so == "memoria":
+        print(f"\n🧠 Memória dos itens ({args.itens} linhas por aba)")
+        resultado["memoria"] = benchmark_memoria(planilha, planilha_campo)
+    if args.so == "resultados":
+        # As varreduras de referência passam do limite de query lenta de propósito
+        os.environ.setdefault("DB_SLOW_QUERY_MS", "600000")
+        print(f"\n📈 Relatórios dos resultados ({args.linhas} linhas)")
+        resultado["resultados"] = benchmark_resultados(args.linhas, lista_estacoes(args.estacoes), args.repeticoes)
+    if args.so == "carga_login":
+        # Leituras frias de verdade: sem cache entre processos e bcrypt barato, para o login medir a espera
+        os.environ["CACHE_COMPARTILHADO"] = ""
+        os.environ.setdefault("BCRYPT_ROUNDS", "6")
+        print(f"\n🧊 Login durante cargas frias de planilha ({args.usuarios} + {args.usuarios} usuários)")
+        resultado["carga_login"] = asyncio.run(benchmark_carga_login(args.usuarios, args.iteracoes, lista_estacoes(args.estacoes)))
+    if args.so == "senhas":
+        print(f"\n🔐 Cadastros e logins simultâneos ({args.usuarios} usuários)")
+        resultado["senhas"] = asyncio.run(benchmark_senhas(args.usuarios))
+    if args.so == "partida":
+        print("\n🚀 Partida: import de app.main")
+        resultado["partida"] = benchmark_partida(args.repeticoes, args.orcamento_partida_ms)
+    if args.so in (None, "carga"):
+        print(f"\n🚦 Teste de carga: {args.usuarios} usuários x {args.iteracoes} iterações")
+        resultado["carga"] = asyncio.run(teste_carga(args.usuarios, args.iteracoes, lista_estacoes(args.estacoes)))
+
+    if args.salvar_base:
+        with open(args.salvar_base, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Linha de base gravada em {args.salvar_base}")
+
+    partida = resultado.get("partida")
+    if partida and (partida["import_app_main_ms"] > partida["orcamento_ms"] or partida["imports_adiados_no_boot"]):
+        print("\n❌ Partida acima do orçamento ou com imports que deveriam ser adiados")
+        sys.exit(1)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressoes = comparar(resultado, json.load(f), args.tolerancia)
+        if regressoes:
+            print(f"\n❌ {len(regressoes)} medida(s) acima da tolerância")
+            sys.exit(1)
+        print("\n✅ Sem regressões")
+
+
+if __name__ == "__main__":
+    main()
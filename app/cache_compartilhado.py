@@ -0,0 +1,183 @@
+"""
+Camada de cache compartilhada entre os processos da aplicação (uvicorn --workers N
+ou gunicorn com workers do uvicorn): a planilha é processada por um único processo
+e os demais leem o resultado pronto, em vez de cada worker ler a planilha de novo.
+
+CACHE_COMPARTILHADO escolhe o backend:
+    /dev/shm/radix-planilhas    diretório de arquivos lidos via mmap (memória compartilhada)
+    redis://localhost:6379/0     Redis ou compatível (KeyDB, Valkey, Dragonfly); precisa do pacote redis
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+def _resumo(valor):
+    return hashlib.sha256(repr(valor).encode()).hexdigest()[:20]
+
+
+class CacheCompartilhado:
+    """
+    Chaves são tuplas que começam pela versão da planilha (caminho, mtime, tamanho),
+    de forma que uma planilha alterada nunca devolve o valor da versão anterior.
+    Falhas do backend não derrubam a requisição: o valor é processado localmente.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.falhas = 0
+
+    def obter_ou_construir(self, chave, construir):
+        """Valor de chave; ausente, só um processo executa construir() e os demais esperam por ele"""
+        valor = self._obter(chave)
+        if valor is not None:
+            self.hits += 1
+            return valor
+        self.misses += 1
+
+        with ExitStack() as pilha:
+            try:
+                pilha.enter_context(self.construtor(chave))
+            except Exception as e:
+                self.falhas += 1
+                print(f"❌ Cache compartilhado indisponível (trava): {e}")
+            # Outro processo pode ter construído enquanto este esperava
+            valor = self._obter(chave)
+            if valor is None:
+                valor = construir()
+                self._guardar(chave, valor)
+        return valor
+
+    def _obter(self, chave):
+        try:
+            return self.obter(chave)
+        except Exception as e:
+            self.falhas += 1
+            print(f"❌ Cache compartilhado indisponível (leitura): {e}")
+            return None
+
+    def _guardar(self, chave, valor):
+        try:
+            self.guardar(chave, valor)
+        except Exception as e:
+            self.falhas += 1
+            print(f"❌ Cache compartilhado indisponível (gravação): {e}")
+
+    def estatisticas(self):
+        return {"hits": self.hits, "misses": self.misses, "falhas": self.falhas}
+
+
+class CacheArquivos(CacheCompartilhado):
+    """
+    Um arquivo pickle por chave num diretório (de preferência em /dev/shm). A leitura
+    desserializa direto do mmap: as páginas do arquivo ficam uma vez só na memória,
+    compartilhadas por todos os workers, sem cópia intermediária para cada processo.
+    A gravação é atômica (arquivo temporário + rename) e remove as versões antigas
+    da mesma planilha.
+    """
+
+    def __init__(self, diretorio):
+        super().__init__()
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _prefixo(self, chave):
+        # chave[0] é a versão: (caminho, mtime_ns, tamanho)
+        return f"{_resumo(chave[0][0])}.{_resumo(chave[0][1:])}"
+
+    def _arquivo(self, chave):
+        return os.path.join(self.diretorio, f"{self._prefixo(chave)}.{_resumo(chave[1:])}.pkl")
+
+    def obter(self, chave):
+        try:
+            with open(self._arquivo(chave), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                return pickle.loads(m)
+        except FileNotFoundError:
+            return None
+
+    def guardar(self, chave, valor):
+        arquivo = self._arquivo(chave)
+        temporario = f"{arquivo}.{os.getpid()}.tmp"
+        with open(temporario, "wb") as f:
+            pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, arquivo)
+
+        planilha, versao = self._prefixo(chave).split(".")
+        for nome in os.listdir(self.diretorio):
+            if nome.startswith(planilha + ".") and not nome.startswith(f"{planilha}.{versao}.") and ".pkl" in nome:
+                try:
+                    os.remove(os.path.join(self.diretorio, nome))
+                except FileNotFoundError:
+                    pass
+
+    @contextmanager
+    def construtor(self, chave):
+        """Trava entre processos (flock) por chave"""
+        with open(self._arquivo(chave) + ".lock", "a") as trava:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(trava, fcntl.LOCK_UN)
+
+
+class CacheRedis(CacheCompartilhado):
+    """
+    Valores pickle num Redis (ou compatível). Cada versão expira depois de ttl segundos
+    sem ser regravada; a trava de construção é um SET NX com expiração.
+    """
+
+    def __init__(self, url=None, cliente=None, prefixo="radix:planilhas:", ttl=7 * 24 * 3600, espera_trava=120):
+        super().__init__()
+        if cliente is None:
+            if redis is None:
+                raise RuntimeError("CACHE_COMPARTILHADO com redis:// precisa do pacote redis (pip install redis)")
+            cliente = redis.Redis.from_url(url)
+        self.cliente = cliente
+        self.prefixo = prefixo
+        self.ttl = ttl
+        self.espera_trava = espera_trava
+
+    def _chave(self, chave):
+        return f"{self.prefixo}{_resumo(chave[0])}:{_resumo(chave[1:])}"
+
+    def obter(self, chave):
+        dados = self.cliente.get(self._chave(chave))
+        return None if dados is None else pickle.loads(dados)
+
+    def guardar(self, chave, valor):
+        self.cliente.set(self._chave(chave), pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), ex=self.ttl)
+
+    @contextmanager
+    def construtor(self, chave):
+        nome = self._chave(chave) + ":trava"
+        token = f"{os.getpid()}:{threading.get_ident()}"
+        limite = time.monotonic() + self.espera_trava
+        # Sem a trava até o limite (construtor travado ou morto): constrói assim mesmo
+        while not self.cliente.set(nome, token, nx=True, ex=self.espera_trava) and time.monotonic() < limite:
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if self.cliente.get(nome) in (token, token.encode()):
+                self.cliente.delete(nome)
+
+
+def criar_cache_compartilhado(destino):
+    """Backend conforme CACHE_COMPARTILHADO; vazio desliga a camada compartilhada"""
+    if not destino:
+        return None
+    if destino.startswith(("redis://", "rediss://", "unix://")):
+        return CacheRedis(destino)
+    return CacheArquivos(destino)
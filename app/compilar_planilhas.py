@@ -0,0 +1,26 @@
+"""
+Compila as planilhas num artefato serializado que a aplicação carrega no boot.
+
+Uso:
+    python -m app.compilar_planilhas [--planilha ...] [--planilha-campo ...] [--destino ...]
+"""
+import argparse
+
+from app.utils import PLANILHA, PLANILHA_CAMPO, ARTEFATO_PLANILHAS, compilar_artefato
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compila as planilhas de inspeção num artefato pickle")
+    parser.add_argument("--planilha", default=PLANILHA)
+    parser.add_argument("--planilha-campo", default=PLANILHA_CAMPO)
+    parser.add_argument("--destino", default=ARTEFATO_PLANILHAS)
+    args = parser.parse_args()
+
+    artefato = compilar_artefato(args.planilha, args.planilha_campo, args.destino)
+    print(f"✅ Artefato gravado em {args.destino}")
+    print(f"   Abas: {len(artefato['planilha']['itens'])}")
+    print(f"   Formulário campo: {'ok' if artefato['planilha_campo']['indice'] else 'planilha não encontrada'}")
+
+
+if __name__ == "__main__":
+    main()
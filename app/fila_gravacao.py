@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+
+
+class FilaGravacao:
+    """
+    Fila write-behind: as requisições apenas enfileiram as linhas e uma thread
+    grava em lotes quando acumula tamanho_lote linhas ou a cada intervalo segundos.
+    """
+
+    def __init__(self, gravar, tamanho_lote=200, intervalo=2.0, tentativas_parada=3):
+        self.gravar = gravar
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.tentativas_parada = tentativas_parada
+        self.gravadas = 0
+        self.descartadas = 0
+        self._fila = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name="fila-gravacao", daemon=True)
+                self._thread.start()
+
+    def enfileirar(self, linhas):
+        """Enfileira as linhas de uma submissão (gravadas juntas no mesmo lote)"""
+        if not linhas:
+            return
+        self.iniciar()
+        self._fila.put(list(linhas))
+
+    def parar(self, timeout=30):
+        """
+        Grava tudo o que ainda está na fila e encerra a thread. Se a gravação
+        final falhar, tenta de novo (tentativas_parada vezes) e, por fim, registra
+        no log as linhas que não puderam ser gravadas.
+        """
+        with self._lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._fila.put(None)
+        thread.join(timeout)
+
+    def pendentes(self):
+        return self._fila.qsize()
+
+    def _executar(self):
+        lote = []
+        limite = time.monotonic() + self.intervalo
+        while True:
+            try:
+                linhas = self._fila.get(timeout=max(0, limite - time.monotonic()))
+            except queue.Empty:
+                linhas = []
+
+            if linhas is None:
+                self._encerrar(lote)
+                return
+
+            lote.extend(linhas)
+            if len(lote) >= self.tamanho_lote or time.monotonic() >= limite:
+                if self._descarregar(lote):
+                    lote = []
+                limite = time.monotonic() + self.intervalo
+
+    def _encerrar(self, lote):
+        # Submissões enfileiradas depois da sentinela também entram na gravação final
+        while True:
+            try:
+                linhas = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if linhas is not None:
+                lote.extend(linhas)
+
+        for tentativa in range(self.tentativas_parada):
+            if self._descarregar(lote):
+                return
+            if tentativa + 1 < self.tentativas_parada:
+                time.sleep(min(self.intervalo, 2 ** tentativa))
+
+        self.descartadas += len(lote)
+        print(f"❌ Fila encerrada com {len(lote)} linhas não gravadas após {self.tentativas_parada} tentativas:")
+        for linha in lote:
+            print(f"   {linha}")
+
+    def _descarregar(self, lote):
+        if not lote:
+            return True
+        try:
+            self.gravar(lote)
+            self.gravadas += len(lote)
+            return True
+        except Exception as e:
+            # Mantém o lote para a próxima tentativa
+            print(f"❌ Erro ao gravar lote ({len(lote)} linhas): {e}")
+            return False
@@ -1,10 +1,19 @@
+import asyncio
+import hashlib
 import os
-from datetime import datetime, timedelta
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
 from typing import Optional
+from urllib.parse import parse_qsl
 from pathlib import Path
 
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import Depends, FastAPI, Request, Form
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
@@ -14,11 +23,21 @@ load_dotenv(dotenv_path=".env")
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
-from sqlalchemy import Column, Integer, String, Boolean, create_engine, or_
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import (Column, Integer, String, Boolean, Date, DateTime, Index, UniqueConstraint, bindparam, create_engine,
+                        delete, event, func, insert, inspect, or_, select, text)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
-from app.utils import carregar_itens, salvar_resultados, carregar_abas, carregar_formulario_campo
+from app.fila_gravacao import FilaGravacao
+from app.metricas import Contador, Medidor, MiddlewareMetricas, medir, registro
+from app.observador_planilhas import ObservadorPlanilhas
+from app.utils import (
+    PLANILHA, PLANILHA_CAMPO, carregar_artefato, aquecer_planilhas, executar_em_pool,
+    gerar_excel, gerar_csv, cache_planilhas, obter_indice_formulario_campo_async,
+    carregar_itens_async, carregar_itens_versionado_async, paginar_itens, indice_estacoes, executor_planilhas, registro_estacoes,
+    DIRETORIO_PLANILHAS, MAPEAMENTO_ABAS, identificar_aba, recarregar_planilha, cache_compartilhado
+)
 
 # =====================================================
 # CONFIGURAÇÕES GERAIS
@@ -26,6 +45,11 @@ from app.utils import carregar_itens, salvar_resultados, carregar_abas, carregar
 SECRET_KEY = os.getenv("SECRET_KEY", "mude_para_producao_gerar_com_openssl")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
+CACHE_USUARIOS_TTL = float(os.getenv("CACHE_USUARIOS_TTL", "30"))
+CACHE_USUARIOS_MAX = int(os.getenv("CACHE_USUARIOS_MAX", "1024"))
+FILA_CAMPO_LOTE = int(os.getenv("FILA_CAMPO_LOTE", "200"))
+FILA_CAMPO_INTERVALO = float(os.getenv("FILA_CAMPO_INTERVALO", "2"))
+SINCRONIZAR_MAX_ENVIOS = int(os.getenv("SINCRONIZAR_MAX_ENVIOS", "50"))
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL or "railway.internal" in DATABASE_URL:
@@ -36,14 +60,127 @@ else:
 
 COOKIE_NAME = "access_token"
 COOKIE_SECURE = os.getenv("COOKIE_SECURE", "false").lower() == "true"
+AQUECER_PLANILHAS = os.getenv("AQUECER_PLANILHAS", "false").lower() == "true"
+# Linhas renderizadas na primeira carga das tabelas; o restante vem da API paginada
+ITENS_POR_PAGINA = int(os.getenv("ITENS_POR_PAGINA", "200"))
+ITENS_POR_PAGINA_MAX = int(os.getenv("ITENS_POR_PAGINA_MAX", "1000"))
+# Recarga das planilhas alteradas em disco sem reiniciar o servidor
+OBSERVAR_PLANILHAS = os.getenv("OBSERVAR_PLANILHAS", "true").lower() == "true"
+OBSERVAR_PLANILHAS_INTERVALO = float(os.getenv("OBSERVAR_PLANILHAS_INTERVALO", "2"))
+# Identifica o build nos ETags; sem VERSAO_APP, vem dos arquivos de app/templates e app/static
+VERSAO_APP = os.getenv("VERSAO_APP")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Senhas: custo do bcrypt ajustável; com PASSWORD_REHASH=true hashes com custo antigo são regravados no login
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS")
+PASSWORD_REHASH = os.getenv("PASSWORD_REHASH", "false").lower() == "true"
+SENHAS_WORKERS = int(os.getenv("SENHAS_WORKERS", "4"))
+
+if BCRYPT_ROUNDS:
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=int(BCRYPT_ROUNDS))
+else:
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # =====================================================
 # BANCO DE DADOS
 # =====================================================
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_SLOW_CHECKOUT_MS = float(os.getenv("DB_SLOW_CHECKOUT_MS", "100"))
+# Esquema e resumos preparados no startup; false quando o deploy roda python -m app.migrar antes
+MIGRAR_BANCO_NO_STARTUP = os.getenv("MIGRAR_BANCO_NO_STARTUP", "true").lower() == "true"
+
+estatisticas_banco = {
+    "queries": 0,
+    "queries_lentas": 0,
+    "tempo_queries": 0.0,
+    "checkouts": 0,
+    "espera_checkout_total": 0.0,
+    "espera_checkout_maxima": 0.0,
+}
+# Atualizado por várias threads (pool de threads do FastAPI, fila de gravação, planilhas)
+lock_estatisticas_banco = threading.Lock()
+
+class PoolInstrumentado(QueuePool):
+    """QueuePool que mede quanto tempo cada checkout esperou por uma conexão livre"""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            espera = time.perf_counter() - inicio
+            with lock_estatisticas_banco:
+                estatisticas_banco["checkouts"] += 1
+                estatisticas_banco["espera_checkout_total"] += espera
+                estatisticas_banco["espera_checkout_maxima"] = max(estatisticas_banco["espera_checkout_maxima"], espera)
+            if espera * 1000 >= DB_SLOW_CHECKOUT_MS:
+                print(f"🐢 Checkout lento do pool: {espera * 1000:.0f} ms")
+
+def instrumentar_engine(engine):
+    """Registra tempo de cada query e avisa sobre queries lentas"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_query", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        duracao = time.perf_counter() - conn.info["inicio_query"].pop()
+        lenta = duracao * 1000 >= DB_SLOW_QUERY_MS
+        with lock_estatisticas_banco:
+            estatisticas_banco["queries"] += 1
+            estatisticas_banco["tempo_queries"] += duracao
+            if lenta:
+                estatisticas_banco["queries_lentas"] += 1
+        if lenta:
+            print(f"🐢 Query lenta ({duracao * 1000:.0f} ms): {' '.join(statement.split())[:200]}")
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(contexto):
+        # Query que falhou não passa pelo after_cursor_execute: descarta o início dela
+        conexao = contexto.connection
+        if conexao is not None and conexao.info.get("inicio_query"):
+            conexao.info["inicio_query"].pop()
+
+def criar_engine(url):
+    """
+    Engine configurado por variáveis de ambiente.
+    SQLite: WAL, synchronous=NORMAL e busy_timeout, para leitores não travarem no escritor.
+    Demais bancos: tamanho do pool, overflow, recycle e pre-ping.
+    """
+    opcoes = {
+        "poolclass": PoolInstrumentado,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+    if url.startswith("sqlite"):
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+            **opcoes
+        )
+
+        @event.listens_for(engine, "connect")
+        def _pragmas_sqlite(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.close()
+    else:
+        engine = create_engine(url, pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=DB_POOL_PRE_PING, **opcoes)
+
+    instrumentar_engine(engine)
+    return engine
+
+engine = criar_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
@@ -55,39 +192,618 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
 
-Base.metadata.create_all(bind=engine)
+class Resultado(Base):
+    __tablename__ = "resultados"
+    id = Column(Integer, primary_key=True, index=True)
+    data = Column(DateTime, nullable=False, index=True)
+    usuario = Column(String, nullable=False)
+    estacao = Column(String, nullable=True)
+    aba = Column(String, nullable=True)
+    equipamento = Column(String, nullable=True)
+    status = Column(String, nullable=True)
+    justificativa = Column(String, nullable=True)
+    valor_medido = Column(String, nullable=True)  # ex.: alimentação aferida (aba DESEMPENHO DO SISTEMA)
+
+    __table_args__ = (
+        # Exportação e histórico por estação/aba e por equipamento, em ordem de data
+        Index("ix_resultados_estacao_aba_data", "estacao", "aba", "data"),
+        Index("ix_resultados_estacao_equipamento_data", "estacao", "equipamento", "data"),
+    )
+
+class ResumoResultados(Base):
+    """
+    Contagem de resultados por estação, aba e dia, atualizada na mesma transação de cada
+    gravação (atualizar_resumos): os relatórios leem esta tabela em vez de varrer
+    resultados. Campos ausentes no resultado ficam como "".
+    """
+    __tablename__ = "resumo_resultados"
+    id = Column(Integer, primary_key=True)
+    estacao = Column(String, nullable=False)
+    aba = Column(String, nullable=False)
+    dia = Column(Date, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    ok = Column(Integer, nullable=False, default=0)
+    nok = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("estacao", "aba", "dia", name="uq_resumo_resultados"),
+        Index("ix_resumo_resultados_dia", "dia"),
+    )
+
+class ResumoItem(Base):
+    """
+    Por item (estação, aba, equipamento): contagem de todos os resultados e o resultado
+    mais recente. Sem o dia na chave: um equipamento é verificado poucas vezes por dia,
+    e a contagem diária por item teria quase tantas linhas quanto resultados.
+    """
+    __tablename__ = "resumo_itens"
+    id = Column(Integer, primary_key=True)
+    estacao = Column(String, nullable=False)
+    aba = Column(String, nullable=False)
+    equipamento = Column(String, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    ok = Column(Integer, nullable=False, default=0)
+    nok = Column(Integer, nullable=False, default=0)
+    data = Column(DateTime, nullable=False)
+    usuario = Column(String, nullable=False)
+    status = Column(String, nullable=True)
+    valor_medido = Column(String, nullable=True)
+
+    __table_args__ = (UniqueConstraint("estacao", "aba", "equipamento", name="uq_resumo_itens"),)
+
+class ResultadoCampo(Base):
+    __tablename__ = "resultados_campo"
+    id = Column(Integer, primary_key=True, index=True)
+    data = Column(DateTime, nullable=False, index=True)
+    usuario = Column(String, nullable=False)
+    estacao = Column(String, nullable=False, index=True)
+    tipo = Column(String, nullable=False)
+    item = Column(Integer, nullable=False)
+    equipamento = Column(String, nullable=True)
+    sensor = Column(String, nullable=True)
+    item_pt = Column(String, nullable=True)
+    status = Column(String, nullable=True)
+    observacao = Column(String, nullable=True)
+    valor_clp = Column(String, nullable=True)
+    valor_epm = Column(String, nullable=True)
+
+class EnvioSincronizado(Base):
+    """Envios recebidos por /api/sincronizar; id_cliente (gerado no aparelho) garante a idempotência"""
+    __tablename__ = "envios_sincronizados"
+    id = Column(Integer, primary_key=True, index=True)
+    id_cliente = Column(String, unique=True, index=True, nullable=False)
+    usuario = Column(String, nullable=False)
+    tipo = Column(String, nullable=False)
+    estacao = Column(String, nullable=True)
+    itens = Column(Integer, nullable=False, default=0)
+    preenchido_em = Column(DateTime, nullable=True)
+    recebido_em = Column(DateTime, nullable=False)
+
+def adicionar_colunas_novas():
+    """create_all não altera tabelas existentes: adiciona as colunas (nullable) que faltarem no banco"""
+    inspetor = inspect(engine)
+    for tabela in Base.metadata.sorted_tables:
+        if not inspetor.has_table(tabela.name):
+            continue
+        existentes = {coluna["name"] for coluna in inspetor.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name in existentes or not coluna.nullable:
+                continue
+            tipo = coluna.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {tipo}"))
+            print(f"🟡 Coluna {tabela.name}.{coluna.name} adicionada")
+
+def criar_indices_novos():
+    """Pelo mesmo motivo, cria os índices declarados que ainda não existem no banco"""
+    inspetor = inspect(engine)
+    for tabela in Base.metadata.sorted_tables:
+        existentes = {indice["name"] for indice in inspetor.get_indexes(tabela.name)}
+        for indice in tabela.indexes:
+            if indice.name not in existentes:
+                indice.create(bind=engine, checkfirst=True)
+                print(f"🟡 Índice {indice.name} criado")
+
+# =====================================================
+# RESUMOS DOS RESULTADOS (incrementais)
+# =====================================================
+CHAVE_ITEM = ("estacao", "aba", "equipamento")
+
+CONTAGENS = ("total", "ok", "nok")
+CAMPOS_ULTIMO = ("data", "usuario", "status", "valor_medido")
+
+def _sql_upsert(tabela, chave, somar, ultimo=()):
+    """
+    INSERT ... ON CONFLICT DO UPDATE (mesma sintaxe no SQLite 3.24+ e no PostgreSQL),
+    montado uma vez como text(): o on_conflict_do_update do SQLAlchemy não tem chave de
+    cache e era recompilado a cada gravação. Os campos de ultimo só são substituídos
+    por um resultado com data igual ou mais recente.
+    """
+    nome = tabela.__tablename__
+    colunas = [*chave, *somar, *ultimo]
+    atualizar = [f"{c} = {nome}.{c} + excluded.{c}" for c in somar]
+    atualizar += [f"{c} = CASE WHEN {nome}.data <= excluded.data THEN excluded.{c} ELSE {nome}.{c} END" for c in ultimo]
+    return text(
+        f"INSERT INTO {nome} ({', '.join(colunas)}) VALUES ({', '.join(':' + c for c in colunas)}) "
+        f"ON CONFLICT ({', '.join(chave)}) DO UPDATE SET {', '.join(atualizar)}"
+    ).bindparams(*(bindparam(c, type_=tabela.__table__.c[c].type) for c in colunas))
+
+UPSERT_RESUMO_DIA = _sql_upsert(ResumoResultados, ("estacao", "aba", "dia"), CONTAGENS)
+UPSERT_RESUMO_ITEM = _sql_upsert(ResumoItem, CHAVE_ITEM, CONTAGENS, CAMPOS_ULTIMO)
+
+def atualizar_resumos(db, linhas):
+    """
+    Soma as linhas que estão sendo gravadas em resumo_resultados e resumo_itens, na
+    transação da gravação. As linhas são agregadas antes (uma por chave) e aplicadas com
+    INSERT ... ON CONFLICT DO UPDATE, atômico também entre vários workers.
+    """
+    if not linhas:
+        return
+    por_dia = {}
+    por_item = {}
+    for linha in linhas:
+        item = tuple(linha.get(campo) or "" for campo in CHAVE_ITEM)
+        status = linha.get("status")
+        for contagens, chave in ((por_dia, (item[0], item[1], linha["data"].date())), (por_item, item)):
+            contagem = contagens.get(chave)
+            if contagem is None:
+                contagem = contagens[chave] = dict.fromkeys(CONTAGENS, 0)
+            contagem["total"] += 1
+            contagem["ok"] += status == "OK"
+            contagem["nok"] += status == "NOK"
+        contagem = por_item[item]
+        if "data" not in contagem or linha["data"] >= contagem["data"]:
+            contagem.update((campo, linha.get(campo)) for campo in CAMPOS_ULTIMO)
+
+    db.execute(UPSERT_RESUMO_DIA, [
+        {"estacao": estacao, "aba": aba, "dia": dia, **contagem} for (estacao, aba, dia), contagem in por_dia.items()
+    ])
+    # Envio offline sincronizado depois de um mais novo não substitui o resultado mais recente do item
+    db.execute(UPSERT_RESUMO_ITEM, [dict(zip(CHAVE_ITEM, item), **contagem) for item, contagem in por_item.items()])
+
+def reconstruir_resumos():
+    """Recalcula os resumos a partir de resultados, por SQL (GROUP BY e row_number), numa transação"""
+    chave = [func.coalesce(getattr(Resultado, campo), "").label(campo) for campo in CHAVE_ITEM]
+    contagens = [
+        func.count().label("total"),
+        func.count().filter(Resultado.status == "OK").label("ok"),
+        func.count().filter(Resultado.status == "NOK").label("nok"),
+    ]
+    dia = func.date(Resultado.data)
+    por_dia = select(chave[0], chave[1], dia.label("dia"), *contagens).group_by(chave[0], chave[1], dia)
+
+    ordem = func.row_number().over(partition_by=chave, order_by=(Resultado.data.desc(), Resultado.id.desc()))
+    janela = [func.count().over(partition_by=chave).label("total"),
+              func.count().filter(Resultado.status == "OK").over(partition_by=chave).label("ok"),
+              func.count().filter(Resultado.status == "NOK").over(partition_by=chave).label("nok")]
+    recentes = select(*chave, *janela, *(getattr(Resultado, campo) for campo in CAMPOS_ULTIMO),
+                      ordem.label("ordem")).subquery()
+    colunas_item = [*CHAVE_ITEM, *CONTAGENS, *CAMPOS_ULTIMO]
+    por_item = select(*(recentes.c[campo] for campo in colunas_item)).where(recentes.c.ordem == 1)
+
+    with SessionLocal() as db, db.begin():
+        db.execute(delete(ResumoResultados))
+        db.execute(delete(ResumoItem))
+        db.execute(insert(ResumoResultados).from_select(["estacao", "aba", "dia", *CONTAGENS], por_dia))
+        db.execute(insert(ResumoItem).from_select(colunas_item, por_item))
+
+def preencher_resumos():
+    """Banco com resultados anteriores aos resumos: calcula os resumos uma vez"""
+    with SessionLocal() as db:
+        vazios = db.scalar(select(ResumoResultados.id).limit(1)) is None
+        if not vazios or db.scalar(select(Resultado.id).limit(1)) is None:
+            return
+    inicio = time.perf_counter()
+    try:
+        reconstruir_resumos()
+    except IntegrityError:
+        # Outro worker preencheu ao mesmo tempo
+        return
+    print(f"🟡 Resumos dos resultados calculados em {time.perf_counter() - inicio:.1f} s")
+
+@medir("preparar_banco")
+def preparar_banco():
+    """
+    Cria/atualiza o esquema (tabelas, colunas e índices novos) e preenche os resumos.
+    Roda no startup (lifespan), não na importação do módulo; com MIGRAR_BANCO_NO_STARTUP=false,
+    fica a cargo de python -m app.migrar, executado uma vez antes de subir os workers.
+    """
+    Base.metadata.create_all(bind=engine)
+    adicionar_colunas_novas()
+    criar_indices_novos()
+    preencher_resumos()
 
 # =====================================================
 # APP FASTAPI
 # =====================================================
-app = FastAPI(title="Radix - Inspeção (com Auth)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MIGRAR_BANCO_NO_STARTUP:
+        await executar_em_pool(preparar_banco)
+    # Artefato compilado (python -m app.compilar_planilhas) evita a leitura a frio das planilhas
+    if carregar_artefato():
+        print("🟢 Planilhas carregadas do artefato compilado")
+    if AQUECER_PLANILHAS:
+        print("🟡 Aquecendo planilhas...")
+        await executar_em_pool(aquecer_planilhas, PLANILHA, PLANILHA_CAMPO)
+        await executar_em_pool(registro_estacoes.aquecer)
+    fila_campo.iniciar()
+    if OBSERVAR_PLANILHAS:
+        cache_planilhas.manter_versao_anterior = True
+        indice_estacoes.manter_versao_anterior = True
+        observador_planilhas.iniciar()
+    yield
+    await executar_em_pool(observador_planilhas.parar)
+    # Garante que as submissões enfileiradas sejam gravadas antes de encerrar
+    await executar_em_pool(fila_campo.parar)
+
+class TemplatesMedidos(Jinja2Templates):
+    """Jinja2Templates que registra o tempo de renderização como etapa 'template'"""
+
+    def TemplateResponse(self, *args, **kwargs):
+        with medir("template"):
+            return super().TemplateResponse(*args, **kwargs)
+
+app = FastAPI(title="Radix - Inspeção (com Auth)", lifespan=lifespan)
+app.add_middleware(MiddlewareMetricas)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
+templates = TemplatesMedidos(directory="app/templates")
+
+def versao_interface(*diretorios):
+    """Hash de nome, mtime e tamanho dos arquivos: um deploy que muda HTML ou scripts muda a versão"""
+    arquivos = sorted(
+        (str(arquivo), arquivo.stat().st_mtime_ns, arquivo.stat().st_size)
+        for diretorio in diretorios for arquivo in Path(diretorio).rglob("*") if arquivo.is_file()
+    )
+    return hashlib.sha1(repr(arquivos).encode("utf-8")).hexdigest()[:12]
+
+VERSAO_INTERFACE = VERSAO_APP or versao_interface("app/templates", "app/static")
+
+# =====================================================
+# RENDERIZAÇÃO EM CACHE / HTTP CACHING
+# =====================================================
+@medir("template_fragmento")
+def renderizar_fragmento(template, contexto):
+    return templates.get_template(template).render(**contexto)
+
+async def fragmento_em_cache(caminho_planilha, chave, template, carregar_contexto):
+    """
+    Renderiza o trecho pesado (tabelas) uma vez por versão da planilha e guarda
+    no cache_planilhas; só o restante da página é renderizado a cada requisição.
+    """
+    chave = ("fragmento", template) + chave
+    renderizar = lambda: renderizar_fragmento(template, carregar_contexto())
+    return await executar_em_pool(cache_planilhas.obter, caminho_planilha, chave, renderizar, chave=(caminho_planilha,) + chave)
+
+def gerar_etag(*partes):
+    """ETag das partes da página mais a versão da interface (templates/estáticos do deploy)"""
+    partes = (VERSAO_INTERFACE,) + partes
+    return '"' + hashlib.sha1(repr(partes).encode("utf-8")).hexdigest() + '"'
 
-PLANILHA = "app/planilhas/FT-5.82.AD.BA6XX-403 - ANEXO 1.xlsm"
-PLANILHA_CAMPO = "app/planilhas/Geral_Formulario_Campo.xlsx"
+def nao_modificado(request: Request, etag: str) -> bool:
+    enviados = request.headers.get("if-none-match", "")
+    return etag in [t.strip().removeprefix("W/") for t in enviados.split(",")]
+
+def resposta_nao_modificada(etag: str):
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+def com_etag(response, etag: str):
+    # private: a página inclui o nome do usuário; no-cache: o navegador sempre revalida
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
 
 # =====================================================
 # FUNÇÕES DE AUTENTICAÇÃO
 # =====================================================
 def get_db():
+    """Sessão por requisição (usar com Depends); sempre devolvida ao pool no final"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+class CacheUsuarios:
+    """Cache de curta duração dos usuários autenticados, limitado em tamanho"""
+
+    def __init__(self, ttl=30, max_entradas=1024):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, username):
+        with self._lock:
+            entrada = self._entradas.get(username)
+            if entrada is None:
+                self.misses += 1
+                return None
+            expira, user = entrada
+            if expira < time.monotonic():
+                del self._entradas[username]
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(username)
+            self.hits += 1
+            return user
+
+    def guardar(self, username, user):
+        with self._lock:
+            self._entradas[username] = (time.monotonic() + self.ttl, user)
+            self._entradas.move_to_end(username)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entradas": len(self._entradas)}
+
+cache_usuarios = CacheUsuarios(ttl=CACHE_USUARIOS_TTL, max_entradas=CACHE_USUARIOS_MAX)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidar_cache_usuarios(mapper, connection, target):
+    # Alteração de usuário (senha, ativo, nome) não pode ser servida do cache
+    cache_usuarios.limpar()
+
+@medir("gravar_resultados")
+def gravar_resultados(linhas):
+    """Insere todas as linhas de uma submissão numa única transação (insert em lote)"""
+    if not linhas:
+        return
+    with SessionLocal() as db, db.begin():
+        db.execute(insert(Resultado), linhas)
+        atualizar_resumos(db, linhas)
+
+@medir("gravar_resultados_campo")
+def gravar_resultados_campo(linhas):
+    with SessionLocal() as db, db.begin():
+        db.execute(insert(ResultadoCampo), linhas)
+
+@medir("gravar_envios")
+def gravar_envios(envios):
+    """
+    Grava um lote de envios sincronizados numa única transação.
+    Envios cujo id_cliente já foi recebido são ignorados (reenvio após falha de rede).
+    Retorna o conjunto de ids gravados agora.
+    """
+    for tentativa in range(2):
+        try:
+            with SessionLocal() as db, db.begin():
+                ids = [e["id"] for e in envios]
+                existentes = set(db.scalars(
+                    select(EnvioSincronizado.id_cliente).where(EnvioSincronizado.id_cliente.in_(ids))
+                ))
+                novos = [e for e in envios if e["id"] not in existentes]
+                if not novos:
+                    return set()
+
+                resultados = [l for e in novos if e["tipo"] == "isolado" for l in e["linhas"]]
+                resultados_campo = [l for e in novos if e["tipo"] == "campo" for l in e["linhas"]]
+                if resultados:
+                    db.execute(insert(Resultado), resultados)
+                    atualizar_resumos(db, resultados)
+                if resultados_campo:
+                    db.execute(insert(ResultadoCampo), resultados_campo)
+                db.execute(insert(EnvioSincronizado), [{
+                    "id_cliente": e["id"],
+                    "usuario": e["usuario"],
+                    "tipo": e["tipo"],
+                    "estacao": e["estacao"],
+                    "itens": len(e["linhas"]),
+                    "preenchido_em": e["preenchido_em"],
+                    "recebido_em": e["recebido_em"],
+                } for e in novos])
+                return {e["id"] for e in novos}
+        except IntegrityError:
+            # O mesmo id chegou por outra requisição ao mesmo tempo: na nova tentativa ele já existe
+            if tentativa:
+                raise
+
+fila_campo = FilaGravacao(gravar_resultados_campo, tamanho_lote=FILA_CAMPO_LOTE, intervalo=FILA_CAMPO_INTERVALO)
+
+# Planilha alterada: a versão anterior continua sendo servida até a nova ser lida e validada
+observador_planilhas = ObservadorPlanilhas(
+    {DIRETORIO_PLANILHAS, os.path.dirname(PLANILHA), os.path.dirname(PLANILHA_CAMPO)},
+    recarregar_planilha,
+    intervalo=OBSERVAR_PLANILHAS_INTERVALO,
+)
+
+COLUNAS_EXPORTACAO = ["Data", "Usuario", "Estacao", "Aba", "Equipamento", "Status", "Justificativa", "Valor medido"]
+
+def iterar_resultados(estacao=None, aba=None, tamanho_lote=1000):
+    """Percorre os resultados gravados em lotes (yield_per), sem carregar tudo em memória"""
+    query = select(
+        Resultado.data, Resultado.usuario, Resultado.estacao, Resultado.aba,
+        Resultado.equipamento, Resultado.status, Resultado.justificativa, Resultado.valor_medido
+    ).order_by(Resultado.data, Resultado.id)
+    if estacao:
+        query = query.where(Resultado.estacao == estacao.upper())
+    if aba:
+        query = query.where(Resultado.aba == aba)
+
+    with SessionLocal() as db:
+        for r in db.execute(query.execution_options(yield_per=tamanho_lote)):
+            yield {
+                "Data": r.data.strftime("%Y-%m-%d %H:%M:%S"),
+                "Usuario": r.usuario,
+                "Estacao": r.estacao,
+                "Aba": r.aba,
+                "Equipamento": r.equipamento,
+                "Status": r.status,
+                "Justificativa": r.justificativa,
+                "Valor medido": r.valor_medido,
+            }
+
+DIMENSOES_RESUMO = ("estacao", "aba", "equipamento", "dia")
+
+def _filtrar_item(query, tabela, estacao=None, aba=None, equipamento=None):
+    if estacao:
+        query = query.where(tabela.estacao == estacao.upper())
+    if aba:
+        query = query.where(tabela.aba == aba)
+    if equipamento:
+        query = query.where(tabela.equipamento == equipamento)
+    return query
+
+def _fonte_resumo(dimensoes, equipamento, periodo):
+    """
+    Tabela que responde à consulta com menos linhas lidas: resumo por dia (sem
+    equipamento), resumo por item (sem dia nem período) ou, combinando equipamento e
+    tempo, os próprios resultados (restritos pelos índices de estação/equipamento)
+    """
+    por_equipamento = "equipamento" in dimensoes or equipamento
+    if not por_equipamento:
+        return ResumoResultados, {"dia": ResumoResultados.dia}
+    if "dia" not in dimensoes and not periodo:
+        return ResumoItem, {}
+    return Resultado, {"dia": func.date(Resultado.data)}
+
+@medir("consultar_resumo")
+def consultar_resumo(agrupar, estacao=None, aba=None, equipamento=None, de=None, ate=None):
+    """Totais de OK/NOK e taxa de NOK agrupados pelas dimensões pedidas (DIMENSOES_RESUMO)"""
+    tabela, colunas = _fonte_resumo(agrupar, equipamento, de or ate)
+    if tabela is Resultado:
+        colunas.update((campo, func.coalesce(getattr(Resultado, campo), "")) for campo in CHAVE_ITEM)
+        contagens = (func.count(), func.count().filter(Resultado.status == "OK"),
+                     func.count().filter(Resultado.status == "NOK"))
+    else:
+        contagens = (func.sum(tabela.total), func.sum(tabela.ok), func.sum(tabela.nok))
+    grupos = [(colunas[d] if d in colunas else getattr(tabela, d)).label(d) for d in agrupar]
+    query = select(*grupos, *(c.label(n) for c, n in zip(contagens, CONTAGENS)))
+    query = _filtrar_item(query.group_by(*grupos).order_by(*grupos), tabela, estacao, aba, equipamento)
+    if tabela is ResumoResultados:
+        query = query.where(ResumoResultados.dia >= de) if de else query
+        query = query.where(ResumoResultados.dia <= ate) if ate else query
+    elif tabela is Resultado:
+        query = query.where(Resultado.data >= datetime.combine(de, datetime.min.time())) if de else query
+        query = query.where(Resultado.data < datetime.combine(ate + timedelta(days=1), datetime.min.time())) if ate else query
+
+    with SessionLocal() as db:
+        linhas = []
+        for r in db.execute(query):
+            linha = {d: r._mapping[d] for d in agrupar}
+            if "dia" in linha:
+                linha["dia"] = str(linha["dia"])  # date (resumos, PostgreSQL) ou texto ISO (date() do SQLite)
+            linha.update(total=r.total or 0, ok=r.ok or 0, nok=r.nok or 0)
+            linha["taxa_nok"] = linha["nok"] / linha["total"] if linha["total"] else 0.0
+            linhas.append(linha)
+        return linhas
+
+@medir("consultar_ultimo_status")
+def consultar_ultimo_status(estacao=None, aba=None, equipamento=None, status=None, inicio=0, limite=ITENS_POR_PAGINA):
+    """Resultado mais recente de cada item, com as contagens do item (resumo_itens), paginado"""
+    query = _filtrar_item(select(ResumoItem), ResumoItem, estacao, aba, equipamento)
+    if status:
+        query = query.where(ResumoItem.status == status.upper())
+
+    with SessionLocal() as db:
+        total = db.scalar(select(func.count()).select_from(query.subquery()))
+        pagina = db.scalars(query.order_by(ResumoItem.estacao, ResumoItem.aba, ResumoItem.equipamento)
+                            .offset(inicio).limit(limite))
+        itens = [{
+            "estacao": r.estacao,
+            "aba": r.aba,
+            "equipamento": r.equipamento,
+            "data": r.data.isoformat(timespec="seconds"),
+            "usuario": r.usuario,
+            "status": r.status,
+            "valor_medido": r.valor_medido,
+            "total": r.total,
+            "nok": r.nok,
+        } for r in pagina]
+    return {"total": total, "inicio": inicio, "proximo": inicio + limite if inicio + limite < total else None, "itens": itens}
+
+@medir("consultar_historico")
+def consultar_historico(estacao, equipamento, aba=None, limite=ITENS_POR_PAGINA):
+    """Resultados de um equipamento da estação, do mais recente para o mais antigo"""
+    query = _filtrar_item(select(
+        Resultado.data, Resultado.usuario, Resultado.aba, Resultado.status, Resultado.justificativa, Resultado.valor_medido
+    ), Resultado, estacao, aba, equipamento).order_by(Resultado.data.desc(), Resultado.id.desc()).limit(limite)
+
+    with SessionLocal() as db:
+        return [{
+            "data": r.data.isoformat(timespec="seconds"),
+            "usuario": r.usuario,
+            "aba": r.aba,
+            "status": r.status,
+            "justificativa": r.justificativa,
+            "valor_medido": r.valor_medido,
+        } for r in db.execute(query)]
+
 def verify_password(plain_password, hashed_password):
     try:
         return pwd_context.verify(plain_password, hashed_password)
     except Exception:
         return False
 
+def verify_password_and_update(plain_password, hashed_password):
+    """Retorna (senha válida, novo hash ou None) - novo hash só com PASSWORD_REHASH"""
+    if not PASSWORD_REHASH:
+        return verify_password(plain_password, hashed_password), None
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except Exception:
+        return False, None
+
 def get_password_hash(password):
     if len(password) > 72:
         password = password[:72]
     return pwd_context.hash(password)
 
+class PoolSenhas:
+    """
+    Executa o bcrypt (hash/verificação) num pool de threads, fora do event loop,
+    com no máximo max_concorrentes operações simultâneas; as demais aguardam na fila.
+    """
+
+    def __init__(self, max_concorrentes=4):
+        self.max_concorrentes = max_concorrentes
+        self.em_fila = 0
+        self.em_execucao = 0
+        self.concluidas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=max_concorrentes, thread_name_prefix="senhas")
+        self._semaforo = asyncio.Semaphore(max_concorrentes)
+
+    async def executar(self, funcao, *args):
+        inicio = time.perf_counter()
+        self.em_fila += 1
+        try:
+            await self._semaforo.acquire()
+        finally:
+            self.em_fila -= 1
+
+        espera = time.perf_counter() - inicio
+        self.espera_total += espera
+        self.espera_maxima = max(self.espera_maxima, espera)
+        self.em_execucao += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, funcao, *args)
+        finally:
+            self.em_execucao -= 1
+            self.concluidas += 1
+            self._semaforo.release()
+
+    def estatisticas(self):
+        return {
+            "em_fila": self.em_fila,
+            "em_execucao": self.em_execucao,
+            "concluidas": self.concluidas,
+            "espera_media": self.espera_total / self.concluidas if self.concluidas else 0.0,
+            "espera_maxima": self.espera_maxima,
+        }
+
+pool_senhas = PoolSenhas(max_concorrentes=SENHAS_WORKERS)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -101,15 +817,23 @@ def decode_token_get_username(token: str) -> Optional[str]:
     except JWTError:
         return None
 
+@medir("autenticacao")
 def get_current_user_from_request(request: Request):
     token = request.cookies.get(COOKIE_NAME)
     if not token:
         return None
-    username = decode_token_get_username(token)
+    with medir("jwt"):
+        username = decode_token_get_username(token)
     if not username:
         return None
-    db = next(get_db())
-    return db.query(User).filter(User.username == username).first()
+
+    user = cache_usuarios.obter(username)
+    if user is None:
+        with medir("usuario_banco"), SessionLocal() as db:
+            user = db.query(User).filter(User.username == username).first()
+        if user is not None:
+            cache_usuarios.guardar(username, user)
+    return user
 
 # =====================================================
 # LOGIN / REGISTRO / LOGOUT
@@ -119,11 +843,19 @@ async def get_login(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @app.post("/login")
-async def post_login(request: Request, username: str = Form(...), password: str = Form(...)):
-    db = next(get_db())
+async def post_login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
     user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+    # Devolve a conexão ao pool antes de esperar o bcrypt
+    db.close()
+    if not user:
         return templates.TemplateResponse("login.html", {"request": request, "error": "Usuário ou senha inválidos"})
+    valida, novo_hash = await pool_senhas.executar(verify_password_and_update, password, user.hashed_password)
+    if not valida:
+        return templates.TemplateResponse("login.html", {"request": request, "error": "Usuário ou senha inválidos"})
+    if novo_hash:
+        db.add(user)
+        user.hashed_password = novo_hash
+        db.commit()
     token = create_access_token({"sub": user.username})
     response = RedirectResponse(url="/selecao_estacao", status_code=303)
     response.set_cookie(COOKIE_NAME, token, httponly=True, secure=COOKIE_SECURE, samesite="lax")
@@ -134,16 +866,22 @@ async def get_register(request: Request):
     return templates.TemplateResponse("register.html", {"request": request})
 
 @app.post("/register")
-async def post_register(request: Request, username: str = Form(...), password: str = Form(...), email: str = Form(None)):
-    db = next(get_db())
+async def post_register(request: Request, username: str = Form(...), password: str = Form(...), email: str = Form(None), db: Session = Depends(get_db)):
     existing_user = db.query(User).filter(or_(User.username == username, User.email == email)).first()
     if existing_user:
         return templates.TemplateResponse("register.html", {"request": request, "error": "Usuário ou e-mail já cadastrado"})
     if len(password) > 72:
         return templates.TemplateResponse("register.html", {"request": request, "error": "A senha não pode ultrapassar 72 caracteres."})
-    user = User(username=username, email=email, hashed_password=get_password_hash(password))
+    db.close()
+    hashed_password = await pool_senhas.executar(get_password_hash, password)
+    user = User(username=username, email=email, hashed_password=hashed_password)
     db.add(user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Outro cadastro com o mesmo usuário/e-mail venceu a corrida durante o hash da senha
+        db.rollback()
+        return templates.TemplateResponse("register.html", {"request": request, "error": "Usuário ou e-mail já cadastrado"})
     return RedirectResponse(url="/login", status_code=303)
 
 @app.get("/logout")
@@ -165,12 +903,7 @@ async def selecao_estacao(request: Request):
     if not user:
         return RedirectResponse(url="/login", status_code=303)
 
-    estacoes = [
-        {"id": "CPR"}, {"id": "CPL"}, {"id": "VBE"}, {"id": "GGR"}, {"id": "STA"},
-        {"id": "LTR"}, {"id": "APN"}, {"id": "ABV"}, {"id": "BGA"}, {"id": "BRK"},
-        {"id": "CPB"}, {"id": "ECT"}, {"id": "MOE"}, {"id": "SER"}, {"id": "HSP"},
-        {"id": "SCZ"}, {"id": "CKB"}, {"id": "PCR"}, {"id": "PGC"},
-    ]
+    estacoes = registro_estacoes.listar()
 
     return templates.TemplateResponse("selecao_estacao.html", {"request": request, "estacoes": estacoes, "user": user})
 
@@ -183,12 +916,7 @@ async def selecao_estacao_formulario_campo(request: Request):
     if not user:
         return RedirectResponse(url="/login", status_code=303)
 
-    estacoes = [
-        {"id": "CPR"}, {"id": "CPL"}, {"id": "VBE"}, {"id": "GGR"}, {"id": "STA"},
-        {"id": "LTR"}, {"id": "APN"}, {"id": "ABV"}, {"id": "BGA"}, {"id": "BRK"},
-        {"id": "CPB"}, {"id": "ECT"}, {"id": "MOE"}, {"id": "SER"}, {"id": "HSP"},
-        {"id": "SCZ"}, {"id": "CKB"}, {"id": "PCR"}, {"id": "PGC"},
-    ]
+    estacoes = registro_estacoes.listar()
 
     return templates.TemplateResponse("selecao_estacao_formulario_campo.html", {
         "request": request, 
@@ -203,17 +931,33 @@ async def formulario_campo(request: Request, estacao: str):
         return RedirectResponse(url="/login", status_code=303)
 
     try:
-        # Carregar dados das 3 abas do formulário campo
-        dados = carregar_formulario_campo(PLANILHA_CAMPO, estacao)
-        
-        return templates.TemplateResponse("formulario_campo.html", {
+        # Índice das 3 abas do formulário campo (por estação)
+        indice = await obter_indice_formulario_campo_async(PLANILHA_CAMPO)
+        etag = gerar_etag("formulario_campo", indice.versao if indice else None, estacao.upper(), user.username)
+        if nao_modificado(request, etag):
+            return resposta_nao_modificada(etag)
+
+        def contexto():
+            # Só a primeira página de cada aba; as demais linhas são carregadas sob demanda
+            dados = indice.consultar(estacao) if indice else {}
+            paginas = {tipo: paginar_itens(dados.get(tipo, []), 0, ITENS_POR_PAGINA) for tipo in TIPOS_CAMPO}
+            contexto = {tipo: pagina["itens"] for tipo, pagina in paginas.items()}
+            contexto["proximos"] = {tipo: pagina["proximo"] for tipo, pagina in paginas.items()}
+            contexto["estacao"] = estacao
+            return contexto
+
+        if indice:
+            # A versão do índice entra na chave: enquanto ele é reconstruído, o fragmento antigo continua válido
+            tabelas = await fragmento_em_cache(PLANILHA_CAMPO, (estacao.upper(), indice.versao), "formulario_campo_tabelas.html", contexto)
+        else:
+            tabelas = renderizar_fragmento("formulario_campo_tabelas.html", contexto())
+
+        return com_etag(templates.TemplateResponse("formulario_campo.html", {
             "request": request,
             "estacao": estacao,
             "user": user,
-            "comunicacao": dados.get("comunicacao", []),
-            "sensores_digitais": dados.get("sensores_digitais", []),
-            "sensores_analogicos": dados.get("sensores_analogicos", [])
-        })
+            "tabelas": tabelas
+        }), etag)
                              
     except Exception as e:
         return templates.TemplateResponse("erro.html", {
@@ -221,6 +965,138 @@ async def formulario_campo(request: Request, estacao: str):
             "mensagem": f"Erro ao carregar formulário campo: {str(e)}"
         })
 
+# =====================================================
+# API PAGINADA (CARREGAMENTO PROGRESSIVO)
+# =====================================================
+# Macro de formulario_campo_linhas.html que renderiza a linha de cada aba
+TIPOS_CAMPO = {
+    "comunicacao": "linha_comunicacao",
+    "sensores_digitais": "linha_sensor_digital",
+    "sensores_analogicos": "linha_sensor_analogico",
+}
+
+def erro_api(mensagem, status_code):
+    return JSONResponse({"message": mensagem}, status_code=status_code)
+
+def _limite_pagina(limite):
+    return min(max(limite or ITENS_POR_PAGINA, 1), ITENS_POR_PAGINA_MAX)
+
+def _colunas_pedidas(colunas):
+    return [c.strip() for c in colunas.split(",") if c.strip()] if colunas else None
+
+def renderizar_pagina_formulario(itens, pagina, aba_id):
+    """
+    Linhas HTML de uma página do formulário isolado.
+    html continua a última tabela da página; secoes traz as seções (abas da
+    planilha) que começam nesta página, já com título e cabeçalho.
+    """
+    modulo = templates.get_template("formulario_linhas.html").module
+    inicio = pagina["inicio"]
+    secao_atual = itens[inicio - 1]["aba"] if 0 < inicio <= len(itens) else None
+    continuacao, secoes = [], []
+    for i, item in enumerate(pagina["itens"], start=inicio + 1):
+        if item["aba"] != secao_atual:
+            if secoes:
+                secoes.append("</table></div>")
+            secao_atual = item["aba"]
+            secoes.append(str(modulo.abrir_secao(secao_atual, aba_id)))
+        linha = str(modulo.linha_formulario(item, i, aba_id))
+        (secoes if secoes else continuacao).append(linha)
+    if secoes:
+        secoes.append("</table></div>")
+    return "".join(continuacao), "".join(secoes)
+
+@app.get("/api/formulario_isolado/{estacao_id}/{aba_id}/itens")
+async def api_itens_formulario(request: Request, estacao_id: str, aba_id: str, inicio: int = 0,
+                               limite: Optional[int] = None, colunas: Optional[str] = None,
+                               q: Optional[str] = None, formato: str = "json"):
+    """
+    Itens da aba paginados (inicio/limite), com filtro de texto (q) e seleção de colunas.
+    formato=html devolve as linhas já renderizadas para o carregamento progressivo
+    (nesse caso q e colunas são ignorados, para manter a numeração dos campos).
+    """
+    user = get_current_user_from_request(request)
+    if not user:
+        return erro_api("Não autenticado", 401)
+    planilha = registro_estacoes.planilha(estacao_id)
+    if planilha is None:
+        return erro_api(f"A estação {estacao_id} não possui formulário isolado", 403)
+    if aba_id not in MAPEAMENTO_ABAS:
+        return erro_api(f"Aba inválida: {aba_id}", 404)
+
+    result = await carregar_itens_async(planilha, aba_id)
+    itens = result.get("items", [])
+    limite = _limite_pagina(limite)
+
+    if formato == "html":
+        pagina = paginar_itens(itens, inicio, limite)
+        html, secoes = renderizar_pagina_formulario(itens, pagina, aba_id)
+        return {"html": html, "secoes": secoes, "proximo": pagina["proximo"], "total": pagina["total"]}
+
+    return paginar_itens(itens, inicio, limite, _colunas_pedidas(colunas), q)
+
+@app.get("/api/formulario_campo/{estacao}/{tipo}")
+async def api_itens_formulario_campo(request: Request, estacao: str, tipo: str, inicio: int = 0,
+                                     limite: Optional[int] = None, colunas: Optional[str] = None,
+                                     q: Optional[str] = None, formato: str = "json"):
+    """Itens de uma aba do formulário campo (comunicacao, sensores_digitais, sensores_analogicos)"""
+    user = get_current_user_from_request(request)
+    if not user:
+        return erro_api("Não autenticado", 401)
+    if tipo not in TIPOS_CAMPO:
+        return erro_api(f"Aba inválida: {tipo}", 404)
+
+    indice = await obter_indice_formulario_campo_async(PLANILHA_CAMPO)
+    itens = indice.consultar(estacao).get(tipo, []) if indice else []
+    limite = _limite_pagina(limite)
+
+    if formato == "html":
+        pagina = paginar_itens(itens, inicio, limite)
+        macro = getattr(templates.get_template("formulario_campo_linhas.html").module, TIPOS_CAMPO[tipo])
+        html = "".join(str(macro(item, i)) for i, item in enumerate(pagina["itens"], start=pagina["inicio"] + 1))
+        return {"html": html, "proximo": pagina["proximo"], "total": pagina["total"]}
+
+    return paginar_itens(itens, inicio, limite, _colunas_pedidas(colunas), q)
+
+# Prefixo dos campos de cada aba no formulario_campo.html
+PREFIXOS_CAMPO = {
+    "comunicacao": "comunicacao",
+    "sensores_digitais": "digital",
+    "sensores_analogicos": "analogico",
+}
+CAMPO_FORMULARIO = re.compile(r"^(comunicacao|digital|analogico)_(\d+)_(\w+)$")
+
+def extrair_linhas_campo(campos, estacao, usuario, agora):
+    """Agrupa os campos <prefixo>_<n>_<campo> em uma linha por item de cada aba"""
+    tipos = {prefixo: tipo for tipo, prefixo in PREFIXOS_CAMPO.items()}
+    itens = {}
+    for chave, valor in campos.items():
+        m = CAMPO_FORMULARIO.match(chave)
+        if not m:
+            continue
+        prefixo, numero, campo = m.groups()
+        itens.setdefault((tipos[prefixo], int(numero)), {})[campo] = str(valor).strip()
+
+    linhas = []
+    for (tipo, numero), valores in sorted(itens.items()):
+        if not valores.get("status") and not any(valores.get(c) for c in ("observacao", "clp", "epm")):
+            continue  # item não preenchido
+        linhas.append({
+            "data": agora,
+            "usuario": usuario,
+            "estacao": estacao,
+            "tipo": tipo,
+            "item": numero,
+            "equipamento": valores.get("equipamento"),
+            "sensor": valores.get("sensor"),
+            "item_pt": valores.get("item_pt"),
+            "status": valores.get("status"),
+            "observacao": valores.get("observacao"),
+            "valor_clp": valores.get("clp"),
+            "valor_epm": valores.get("epm"),
+        })
+    return linhas
+
 @app.post("/salvar_formulario_campo")
 async def salvar_formulario_campo(request: Request):
     user = get_current_user_from_request(request)
@@ -228,21 +1104,26 @@ async def salvar_formulario_campo(request: Request):
         return RedirectResponse(url="/login", status_code=303)
 
     try:
-        form_data = await request.form()
-        
-        # Processar dados do formulário campo
-        dados_salvar = {
-            "estacao": form_data.get("estacao"),
-            "usuario": user.username,
-            "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "comunicacao": [],
-            "sensores_digitais": [],
-            "sensores_analogicos": []
-        }
-        
-        # Aqui você pode processar os dados específicos de cada aba
-        # e salvar no banco de dados ou arquivo
-        
+        # O formulário envia JSON (uma chave por aba); também aceita form-urlencoded
+        if request.headers.get("content-type", "").startswith("application/json"):
+            payload = await request.json()
+            campos = {}
+            for tipo in PREFIXOS_CAMPO:
+                campos.update(payload.get(tipo) or {})
+            estacao = payload.get("estacao")
+        else:
+            campos = dict(await request.form())
+            estacao = campos.get("estacao")
+
+        if not estacao:
+            return templates.TemplateResponse("erro.html", {
+                "request": request,
+                "mensagem": "Estação não informada"
+            }, status_code=400)
+
+        linhas = extrair_linhas_campo(campos, estacao.upper(), user.username, datetime.now())
+        fila_campo.enfileirar(linhas)
+
         return RedirectResponse(url="/selecao_estacao", status_code=303)
         
     except Exception as e:
@@ -261,7 +1142,7 @@ async def formulario_isolado_raiz(request: Request, estacao_id: str):
     if not user:
         return RedirectResponse(url="/login", status_code=303)
 
-    if estacao_id.upper() != "CPR":
+    if registro_estacoes.planilha(estacao_id) is None:
         return templates.TemplateResponse(
             "erro.html",
             {"request": request, "mensagem": f"A estação {estacao_id} não possui formulário isolado."},
@@ -278,54 +1159,387 @@ async def formulario_isolado_com_aba(request: Request, estacao_id: str, aba_id:
     if not user:
         return RedirectResponse(url="/login", status_code=303)
 
-    if estacao_id.upper() != "CPR":
+    # cpr e CPR são a mesma estação: mesma entrada no cache de fragmentos e mesmo ETag
+    estacao_id = estacao_id.strip().upper()
+    planilha = registro_estacoes.planilha(estacao_id)
+    if planilha is None:
         return templates.TemplateResponse(
             "erro.html", 
-            {"request": request, "mensagem": f"Formulário isolado disponível apenas para CPR"},
+            {"request": request, "mensagem": f"A estação {estacao_id} não possui formulário isolado."},
             status_code=403
         )
+    # Aba desconhecida não chega ao cache nem ao ETag
+    if aba_id not in MAPEAMENTO_ABAS:
+        return templates.TemplateResponse(
+            "erro.html",
+            {"request": request, "mensagem": f"Aba inválida: {aba_id}."},
+            status_code=404
+        )
 
-    result = carregar_itens(PLANILHA, aba_id)
-    itens = result.get("items", [])
-    headers = result.get("headers", [])
+    # A versão que entra no ETag e na chave do fragmento é a dos itens servidos: com a
+    # planilha alterada em disco, continua a anterior até recarregar_planilha trocá-los
+    encontrados = cache_planilhas.consultar(planilha, ("itens", aba_id))
+    versao, result = encontrados or await carregar_itens_versionado_async(planilha, aba_id)
+
+    etag = gerar_etag("formulario", versao, estacao_id, aba_id, user.username)
+    if nao_modificado(request, etag):
+        return resposta_nao_modificada(etag)
+
+    def contexto():
+        # Só a primeira página; as demais linhas vêm de /api/formulario_isolado/.../itens
+        pagina = paginar_itens(result.get("items", []), 0, ITENS_POR_PAGINA)
+        return {
+            "itens": pagina["itens"],
+            "proximo": pagina["proximo"],
+            "headers": result.get("headers", []),
+            "aba_id": aba_id,
+            "estacao": estacao_id
+        }
 
-    return templates.TemplateResponse("formulario.html", {
+    tabela = await fragmento_em_cache(planilha, (estacao_id, aba_id, versao), "formulario_tabela.html", contexto)
+
+    return com_etag(templates.TemplateResponse("formulario.html", {
         "request": request,
-        "itens": itens,
-        "headers": headers,
+        "tabela": tabela,
+        "tem_itens": bool(tabela.strip()),
         "aba_id": aba_id,
         "user": user,
         "estacao": estacao_id
-    })
+    }), etag)
 
 # =====================================================
 # ENVIO DO FORMULÁRIO
 # =====================================================
+STATUS_FORMULARIO = {"OK", "NOK"}
+
+def _campos_aba(info):
+    """Campos <campo>_<n> que o formulário da aba envia, conforme as colunas do MAPEAMENTO_ABAS"""
+    colunas = {coluna.upper() for coluna in info["colunas"]}
+    campos = {"aba", "equipamento"}
+    if {"OK", "NOK"} <= colunas:
+        campos.add("status")
+    if any(coluna.startswith("OBSERVA") for coluna in colunas):
+        campos.add("just")
+    if info.get("campo_medido"):
+        campos.add(info["campo_medido"])
+    return campos
+
+CAMPOS_FORMULARIO_ABA = {aba_id: _campos_aba(info) for aba_id, info in MAPEAMENTO_ABAS.items()}
+
+async def ler_campos_formulario(request):
+    """
+    Campos de um POST de formulário. O corpo urlencoded (envio padrão do navegador) é
+    decodificado com parse_qsl, cerca de 10x mais rápido que request.form() em
+    formulários com milhares de itens; multipart continua com request.form().
+    """
+    if request.headers.get("content-type", "").startswith("application/x-www-form-urlencoded"):
+        corpo = await request.body()
+        return dict(parse_qsl(corpo.decode("utf-8", errors="replace"), keep_blank_values=True))
+    return await request.form()
+
+def extrair_linhas_formulario(campos, estacao, usuario, agora):
+    """
+    Uma linha por item respondido (status_<n>) do formulário isolado. Os campos
+    <campo>_<n> são agrupados por item numa única passada e validados contra as colunas
+    da aba no MAPEAMENTO_ABAS (CAMPOS_FORMULARIO_ABA); o valor medido só existe nas abas
+    que declaram campo_medido. ValueError se um status não for OK/NOK, se a aba não for
+    reconhecida ou se o item trouxer um campo que a aba não tem.
+    """
+    itens = {}
+    for chave, valor in campos.items():
+        campo, _, numero = chave.rpartition("_")
+        if campo and numero.isdigit():
+            item = itens.get(numero)
+            if item is None:
+                item = itens[numero] = {}
+            item[campo] = valor if isinstance(valor, str) else str(valor)
+
+    abas = {}  # nome da aba (planilha) → aba_id, resolvido uma vez por aba
+    linhas = []
+    for numero, valores in itens.items():
+        status = valores.get("status")
+        if status is None:
+            continue  # item não respondido
+        if status not in STATUS_FORMULARIO:
+            raise ValueError(f"Status inválido no item {numero}: {status}")
+
+        aba = valores.get("aba", "")
+        if aba not in abas:
+            abas[aba] = identificar_aba(aba)
+        aba_id = abas[aba]
+        if aba_id is None:
+            raise ValueError(f"Aba não reconhecida no item {numero}: {aba}")
+        extras = valores.keys() - CAMPOS_FORMULARIO_ABA[aba_id]
+        if extras:
+            raise ValueError(f"Campos {', '.join(sorted(extras))} não pertencem à aba {aba} (item {numero})")
+        campo_medido = MAPEAMENTO_ABAS[aba_id].get("campo_medido")
+        medido = valores.get(campo_medido, "").strip() if campo_medido else ""
+
+        linhas.append({
+            "data": agora,
+            "usuario": usuario,
+            "estacao": estacao,
+            "aba": aba,
+            "equipamento": valores.get("equipamento", ""),
+            "status": status,
+            "justificativa": valores.get("just", ""),
+            "valor_medido": medido or None,
+        })
+    return linhas
+
 @app.post("/enviar")
 async def enviar_formulario(request: Request):
     user = get_current_user_from_request(request)
     if not user:
         return RedirectResponse(url="/login", status_code=303)
 
-    form = await request.form()
-    dados = []
-    for key in form:
-        if key.startswith("status_"):
-            item_id = key.split("_")[1]
-            status = form[key]
-            justificativa = form.get(f"just_{item_id}", "")
-            equipamento = form.get(f"equipamento_{item_id}", "")
-            aba = form.get(f"aba_{item_id}", "")
-            dados.append({
-                "Data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "Usuario": user.username,
-                "Aba": aba,
-                "Equipamento": equipamento,
-                "Status": status,
-                "Justificativa": justificativa,
-            })
-
-    nome_arquivo = f"resultados_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    salvar_resultados(nome_arquivo, dados)
-
-    return RedirectResponse(url="/formulario_isolado/CPR", status_code=303)
\ No newline at end of file
+    form = await ler_campos_formulario(request)
+    estacao = (form.get("estacao") or "CPR").upper()
+    try:
+        linhas = extrair_linhas_formulario(form, estacao, user.username, datetime.now())
+    except ValueError as e:
+        return templates.TemplateResponse("erro.html", {"request": request, "mensagem": str(e)}, status_code=400)
+
+    await executar_em_pool(gravar_resultados, linhas)
+
+    return RedirectResponse(url=f"/formulario_isolado/{estacao}", status_code=303)
+
+# =====================================================
+# SINCRONIZAÇÃO OFFLINE
+# =====================================================
+# Formulários preenchidos sem conexão ficam numa fila no aparelho (static/rascunhos.js)
+# e são enviados em lote quando a conexão volta.
+EXTRATORES_ENVIO = {
+    "isolado": extrair_linhas_formulario,
+    "campo": extrair_linhas_campo,
+}
+
+def _data_envio(valor, padrao):
+    """Data ISO informada pelo aparelho (momento do preenchimento), em horário local"""
+    try:
+        data = datetime.fromisoformat(str(valor))
+    except (TypeError, ValueError):
+        return padrao
+    return data.astimezone().replace(tzinfo=None) if data.tzinfo else data
+
+def preparar_envio(envio, usuario, agora):
+    """Valida um envio da fila offline e converte os campos em linhas; ValueError se inválido"""
+    if not isinstance(envio, dict):
+        raise ValueError("Envio inválido")
+    id_cliente = envio.get("id")
+    if not isinstance(id_cliente, str) or not 0 < len(id_cliente) <= 64:
+        raise ValueError("id ausente ou inválido")
+    tipo = envio.get("tipo")
+    if tipo not in EXTRATORES_ENVIO:
+        raise ValueError(f"Tipo inválido: {tipo}")
+    estacao = str(envio.get("estacao") or "").upper()
+    campos = envio.get("campos")
+    if not estacao or not isinstance(campos, dict):
+        raise ValueError("Estação ou campos não informados")
+    # Só textos e números (convertidos em texto): um objeto ou lista num campo faria o lote inteiro falhar na gravação
+    for chave, valor in campos.items():
+        if isinstance(valor, bool) or not isinstance(valor, (str, int, float)):
+            raise ValueError(f"Valor inválido no campo {chave}")
+    campos = {chave: valor if isinstance(valor, str) else str(valor) for chave, valor in campos.items()}
+
+    preenchido_em = _data_envio(envio.get("data"), None)
+    try:
+        linhas = EXTRATORES_ENVIO[tipo](campos, estacao, usuario, preenchido_em or agora)
+    except ValueError:
+        raise
+    except Exception as e:
+        # Erro inesperado na extração invalida só este envio, não o lote
+        raise ValueError(f"Campos inválidos: {e}") from e
+    return {
+        "id": id_cliente,
+        "tipo": tipo,
+        "estacao": estacao,
+        "usuario": usuario,
+        "preenchido_em": preenchido_em,
+        "recebido_em": agora,
+        "linhas": linhas,
+    }
+
+@app.post("/api/sincronizar")
+async def sincronizar_envios(request: Request):
+    """
+    Recebe {"envios": [{"id", "tipo": "campo"|"isolado", "estacao", "data", "campos"}]}
+    e devolve o status de cada um: gravado, duplicado (já recebido antes) ou invalido.
+    """
+    user = get_current_user_from_request(request)
+    if not user:
+        return erro_api("Não autenticado", 401)
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        return erro_api("JSON inválido", 400)
+    envios = payload.get("envios") if isinstance(payload, dict) else None
+    if not isinstance(envios, list):
+        return erro_api("Campo 'envios' ausente", 400)
+    if len(envios) > SINCRONIZAR_MAX_ENVIOS:
+        return erro_api(f"Máximo de {SINCRONIZAR_MAX_ENVIOS} envios por requisição", 413)
+
+    agora = datetime.now()
+    resultados, validos = [], {}
+    for envio in envios:
+        try:
+            preparado = preparar_envio(envio, user.username, agora)
+        except ValueError as e:
+            id_cliente = envio.get("id") if isinstance(envio, dict) else None
+            resultados.append({"id": id_cliente, "status": "invalido", "mensagem": str(e)})
+            continue
+        validos.setdefault(preparado["id"], preparado)
+        resultados.append({"id": preparado["id"]})
+
+    try:
+        gravados = await executar_em_pool(gravar_envios, list(validos.values())) if validos else set()
+    except Exception as e:
+        # Nada foi gravado: o aparelho mantém a fila e tenta de novo mais tarde
+        return erro_api(f"Erro ao gravar envios: {str(e)}", 503)
+
+    for resultado in resultados:
+        if "status" not in resultado:
+            id_cliente = resultado["id"]
+            resultado["status"] = "gravado" if id_cliente in gravados else "duplicado"
+            gravados.discard(id_cliente)  # ids repetidos no mesmo lote contam uma vez
+    return {"resultados": resultados}
+
+@app.get("/sw.js", include_in_schema=False)
+async def service_worker():
+    # Servido na raiz para que o service worker controle todas as páginas
+    return FileResponse("app/static/sw.js", media_type="application/javascript",
+                        headers={"Cache-Control": "no-cache"})
+
+# =====================================================
+# MÉTRICAS (FORMATO PROMETHEUS)
+# =====================================================
+@registro.coletor
+def metricas_caches():
+    """Hits/misses e taxa de acerto dos caches, lidos a cada coleta"""
+    acessos = Contador("cache_acessos_total", "Consultas aos caches em memória", ("cache", "resultado"))
+    taxa = Medidor("cache_taxa_acerto", "Fração das consultas atendidas pelo cache", ("cache",))
+    entradas = Medidor("cache_entradas", "Entradas guardadas no cache", ("cache",))
+    caches = {
+        "planilhas": cache_planilhas.estatisticas(),
+        "indice_estacoes": indice_estacoes.estatisticas(),
+        "usuarios": cache_usuarios.estatisticas(),
+    }
+    if cache_compartilhado is not None:
+        caches["compartilhado"] = cache_compartilhado.estatisticas()
+    for nome, est in caches.items():
+        acessos.inc(nome, "hit", quantidade=est["hits"])
+        acessos.inc(nome, "miss", quantidade=est["misses"])
+        total = est["hits"] + est["misses"]
+        taxa.definir(est["hits"] / total if total else 0.0, nome)
+        entradas.definir(est.get("entradas", est.get("planilhas", 0)), nome)
+    return [acessos, taxa, entradas]
+
+@registro.coletor
+def metricas_recursos():
+    """Fila de gravação, pools de threads (planilhas e bcrypt) e banco"""
+    fila = Medidor("fila_campo_pendentes", "Submissões do formulário campo aguardando gravação")
+    fila.definir(fila_campo.pendentes())
+    gravadas = Contador("fila_campo_gravadas_total", "Linhas gravadas pela fila do formulário campo")
+    gravadas.inc(quantidade=fila_campo.gravadas)
+    descartadas = Contador("fila_campo_descartadas_total", "Linhas que a fila não conseguiu gravar ao encerrar")
+    descartadas.inc(quantidade=fila_campo.descartadas)
+
+    planilhas = Medidor("planilhas_pool_fila", "Tarefas aguardando o pool de threads das planilhas")
+    planilhas.definir(executor_planilhas._work_queue.qsize())
+
+    registro = registro_estacoes.estatisticas()
+    residentes = Medidor("planilhas_estacoes_residentes", "Planilhas de estação com itens em memória")
+    residentes.definir(registro["residentes"])
+    descartes = Contador("planilhas_estacoes_descartes_total", "Planilhas de estação descartadas da memória (LRU)")
+    descartes.inc(quantidade=registro["descartes"])
+    recargas = Contador("planilhas_recargas_total", "Planilhas alteradas em disco e reprocessadas", ("resultado",))
+    recargas.inc("ok", quantidade=observador_planilhas.recargas)
+    recargas.inc("falha", quantidade=observador_planilhas.falhas)
+
+    senhas = pool_senhas.estatisticas()
+    bcrypt = Medidor("senhas_pool", "Operações de bcrypt por estado", ("estado",))
+    bcrypt.definir(senhas["em_fila"], "em_fila")
+    bcrypt.definir(senhas["em_execucao"], "em_execucao")
+
+    with lock_estatisticas_banco:
+        banco = dict(estatisticas_banco)
+    queries = Contador("banco_queries_total", "Queries executadas", ("tipo",))
+    queries.inc("todas", quantidade=banco["queries"])
+    queries.inc("lentas", quantidade=banco["queries_lentas"])
+    tempo = Contador("banco_queries_segundos_total", "Tempo total gasto em queries")
+    tempo.inc(quantidade=banco["tempo_queries"])
+    checkouts = Contador("banco_checkouts_total", "Conexões retiradas do pool")
+    checkouts.inc(quantidade=banco["checkouts"])
+    espera = Contador("banco_espera_checkout_segundos_total", "Tempo total de espera por conexão livre no pool")
+    espera.inc(quantidade=banco["espera_checkout_total"])
+    return [fila, gravadas, descartadas, planilhas, residentes, descartes, recargas, bcrypt, queries, tempo, checkouts, espera]
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registro.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/exportar_resultados")
+async def exportar_resultados(request: Request, estacao: Optional[str] = None, aba: Optional[str] = None, formato: str = "xlsx"):
+    """Exporta os resultados gravados (xlsx ou csv) em streaming"""
+    user = get_current_user_from_request(request)
+    if not user:
+        return RedirectResponse(url="/login", status_code=303)
+
+    linhas = iterar_resultados(estacao, aba)
+    nome_arquivo = f"resultados_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    if formato == "csv":
+        return StreamingResponse(
+            gerar_csv(linhas, COLUNAS_EXPORTACAO),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}.csv"'}
+        )
+
+    return StreamingResponse(
+        gerar_excel(linhas, COLUNAS_EXPORTACAO),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}.xlsx"'}
+    )
+
+# =====================================================
+# RELATÓRIOS DOS RESULTADOS
+# =====================================================
+@app.get("/api/resultados/resumo")
+async def api_resumo_resultados(request: Request, agrupar: str = "estacao", estacao: Optional[str] = None,
+                                aba: Optional[str] = None, equipamento: Optional[str] = None,
+                                de: Optional[date] = None, ate: Optional[date] = None):
+    """
+    Totais e taxa de NOK agrupados por estacao, aba, equipamento e/ou dia (agrupar,
+    separados por vírgula), com filtros opcionais e período (de/ate, inclusivos)
+    """
+    user = get_current_user_from_request(request)
+    if not user:
+        return erro_api("Não autenticado", 401)
+    dimensoes = _colunas_pedidas(agrupar) or []
+    invalidas = [d for d in dimensoes if d not in DIMENSOES_RESUMO]
+    if invalidas:
+        return erro_api(f"Não é possível agrupar por {', '.join(invalidas)}; use {', '.join(DIMENSOES_RESUMO)}", 400)
+
+    linhas = await executar_em_pool(consultar_resumo, list(dict.fromkeys(dimensoes)), estacao, aba, equipamento, de, ate)
+    return {"agrupar": dimensoes, "linhas": linhas}
+
+@app.get("/api/resultados/ultimo_status")
+async def api_ultimo_status(request: Request, estacao: Optional[str] = None, aba: Optional[str] = None,
+                            equipamento: Optional[str] = None, status: Optional[str] = None,
+                            inicio: int = 0, limite: Optional[int] = None):
+    """Status mais recente de cada item, paginado (status=NOK lista as pendências)"""
+    user = get_current_user_from_request(request)
+    if not user:
+        return erro_api("Não autenticado", 401)
+    return await executar_em_pool(consultar_ultimo_status, estacao, aba, equipamento, status,
+                                  max(inicio, 0), _limite_pagina(limite))
+
+@app.get("/api/resultados/historico")
+async def api_historico_resultados(request: Request, estacao: str, equipamento: str, aba: Optional[str] = None,
+                                   limite: Optional[int] = None):
+    """Histórico de um equipamento da estação, do resultado mais recente para o mais antigo"""
+    user = get_current_user_from_request(request)
+    if not user:
+        return erro_api("Não autenticado", 401)
+    return {"itens": await executar_em_pool(consultar_historico, estacao, equipamento, aba, _limite_pagina(limite))}
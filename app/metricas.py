@@ -0,0 +1,192 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from starlette.routing import Match
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+BUCKETS_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rota (template do path) da requisição em andamento; rotula as etapas medidas dentro dela
+rota_atual = ContextVar("rota_atual", default="")
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(nomes, valores, extra=""):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Metrica:
+    """Série de valores por combinação de rótulos, exportada no formato texto do Prometheus"""
+
+    tipo = "untyped"
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            linhas.extend(self._linhas(valores, serie) for valores, serie in series)
+        return "\n".join(linhas)
+
+    def _linhas(self, valores, serie):
+        return f"{self.nome}{_rotulos(self.rotulos, valores)} {_numero(serie)}"
+
+
+class Contador(Metrica):
+    tipo = "counter"
+
+    def inc(self, *valores, quantidade=1):
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + quantidade
+
+
+class Medidor(Metrica):
+    tipo = "gauge"
+
+    def inc(self, *valores, quantidade=1):
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + quantidade
+
+    def dec(self, *valores, quantidade=1):
+        self.inc(*valores, quantidade=-quantidade)
+
+    def definir(self, valor, *valores):
+        with self._lock:
+            self._series[valores] = valor
+
+
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, *valores):
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                # contagem por bucket (não acumulada; +Inf na última posição), soma e total
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][bisect_left(self.buckets, valor)] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def _linhas(self, valores, serie):
+        contagens, soma, total = serie
+        linhas, acumulado = [], 0
+        for limite, contagem in zip(self.buckets + (float("inf"),), contagens):
+            acumulado += contagem
+            le = 'le="' + _numero(float(limite)) + '"'
+            linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, valores, le)} {acumulado}")
+        linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, valores)} {_numero(soma)}")
+        linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, valores)} {total}")
+        return "\n".join(linhas)
+
+
+class Registro:
+    """
+    Métricas da aplicação. Além das métricas atualizadas a cada evento, os coletores
+    (funções sem argumentos) são chamados a cada leitura de /metrics e devolvem
+    métricas calculadas na hora (tamanho de caches, fila, pool).
+    """
+
+    def __init__(self):
+        self.metricas = []
+        self.coletores = []
+
+    def registrar(self, metrica):
+        self.metricas.append(metrica)
+        return metrica
+
+    def coletor(self, funcao):
+        self.coletores.append(funcao)
+        return funcao
+
+    def exportar(self):
+        blocos = [m.exportar() for m in self.metricas]
+        for coletor in self.coletores:
+            blocos.extend(m.exportar() for m in coletor())
+        return "\n".join(blocos) + "\n"
+
+
+registro = Registro()
+
+requisicoes_duracao = registro.registrar(Histograma(
+    "http_requisicao_duracao_segundos", "Duração das requisições HTTP", ("metodo", "rota", "status")
+))
+requisicoes_em_andamento = registro.registrar(Medidor(
+    "http_requisicoes_em_andamento", "Requisições HTTP em andamento"
+))
+etapas_duracao = registro.registrar(Histograma(
+    "etapa_duracao_segundos", "Duração de cada etapa do processamento, por rota", ("rota", "etapa")
+))
+
+
+@contextmanager
+def medir(etapa):
+    """Mede o bloco (ou a função, usado como decorador) como uma etapa da rota atual"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapas_duracao.observar(time.perf_counter() - inicio, rota_atual.get(), etapa)
+
+
+def rota_da_requisicao(scope):
+    """Template do path da rota (ex.: /formulario_campo/{estacao}), para não explodir a cardinalidade"""
+    for rota in scope["app"].router.routes:
+        correspondencia, _ = rota.matches(scope)
+        if correspondencia == Match.FULL:
+            return rota.path
+    return "nao_encontrada"
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI: duração por rota/status e requisições em andamento (inclui o corpo em streaming)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        rota = rota_da_requisicao(scope)
+        status = [500]
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status[0] = mensagem["status"]
+            await send(mensagem)
+
+        token = rota_atual.set(rota)
+        requisicoes_em_andamento.inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            requisicoes_em_andamento.dec()
+            requisicoes_duracao.observar(time.perf_counter() - inicio, scope["method"], rota, str(status[0]))
+            rota_atual.reset(token)
@@ -0,0 +1,17 @@
+"""
+Cria/atualiza o esquema do banco (DATABASE_URL) e preenche os resumos dos resultados,
+como uma etapa de deploy antes de subir os workers (com MIGRAR_BANCO_NO_STARTUP=false).
+
+Uso:
+    python -m app.migrar
+"""
+from app.main import engine, preparar_banco
+
+
+def main():
+    preparar_banco()
+    print(f"✅ Banco preparado ({engine.url.render_as_string(hide_password=True)})")
+
+
+if __name__ == "__main__":
+    main()
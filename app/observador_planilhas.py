@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+
+try:
+    # Com o watchdog instalado (inotify no Linux) as mudanças são percebidas na hora;
+    # sem ele, o diretório é verificado a cada intervalo segundos.
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+
+class ObservadorPlanilhas:
+    """
+    Observa os diretórios das planilhas e, numa única thread, chama ao_mudar(caminho)
+    para cada planilha alterada, uma de cada vez, depois que o arquivo fica estabilidade
+    segundos sem mudar (o Excel e as cópias gravam o arquivo em etapas). ao_mudar também
+    é chamado se o arquivo for removido antes de estabilizar, e retorna True quando uma
+    nova versão foi aplicada (só essas contam em recargas).
+    """
+
+    EXTENSOES = (".xlsx", ".xlsm")
+
+    def __init__(self, diretorios, ao_mudar, intervalo=2.0, estabilidade=1.0):
+        self.diretorios = sorted({os.path.abspath(d) for d in diretorios})
+        self.ao_mudar = ao_mudar
+        self.intervalo = intervalo
+        self.estabilidade = estabilidade
+        self.recargas = 0
+        self.falhas = 0
+        self._estado = {}
+        self._pendentes = {}
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+        self._observer = None
+
+    def _listar(self):
+        estado = {}
+        for diretorio in self.diretorios:
+            try:
+                entradas = list(os.scandir(diretorio))
+            except FileNotFoundError:
+                continue
+            for entrada in entradas:
+                nome = entrada.name
+                if nome.startswith("~$") or not nome.lower().endswith(self.EXTENSOES):
+                    continue
+                try:
+                    st = entrada.stat()
+                except FileNotFoundError:
+                    continue
+                estado[entrada.path] = (st.st_mtime_ns, st.st_size)
+        return estado
+
+    def verificar(self):
+        """Uma rodada de verificação; retorna as planilhas de fato recarregadas nela"""
+        agora = time.monotonic()
+        estado = self._listar()
+        for caminho, assinatura in estado.items():
+            if self._estado.get(caminho) != assinatura:
+                # Mudou (ou continua mudando): reinicia a contagem de estabilidade
+                self._pendentes[caminho] = agora
+        self._estado = estado
+
+        prontas = [c for c, desde in self._pendentes.items() if agora - desde >= self.estabilidade]
+        recarregadas = []
+        for caminho in prontas:
+            del self._pendentes[caminho]
+            try:
+                # False: planilha removida ou fora da memória (será lida sob demanda)
+                if self.ao_mudar(caminho):
+                    self.recargas += 1
+                    recarregadas.append(caminho)
+            except Exception as e:
+                # A versão anterior continua em uso; uma nova gravação do arquivo tenta de novo
+                self.falhas += 1
+                print(f"❌ Falha ao recarregar {caminho}: {e}")
+        return recarregadas
+
+    def _executar(self):
+        while not self._parar.is_set():
+            # Com mudanças pendentes, verifica de novo assim que elas podem estar estáveis
+            espera = min(self.intervalo, self.estabilidade) if self._pendentes else self.intervalo
+            self._acordar.wait(espera)
+            self._acordar.clear()
+            if not self._parar.is_set():
+                self.verificar()
+
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._estado = self._listar()  # situação inicial não dispara recarga
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="observador-planilhas", daemon=True)
+        self._thread.start()
+
+        if Observer is not None:
+            acordar = self._acordar
+
+            class _Evento(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    acordar.set()
+
+            self._observer = Observer()
+            for diretorio in self.diretorios:
+                if os.path.isdir(diretorio):
+                    self._observer.schedule(_Evento(), diretorio, recursive=False)
+            self._observer.start()
+
+    def parar(self):
+        self._parar.set()
+        self._acordar.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,127 @@
+"""
+Gera planilhas sintéticas com o mesmo layout das planilhas reais (que não ficam no
+repositório), para desenvolvimento local e para os benchmarks (app.benchmark).
+
+Uso:
+    python -m app.planilhas_sinteticas [--itens 200] [--estacoes 19] [--semente 1] [--destino app/planilhas]
+                                       [--por-estacao]
+"""
+import argparse
+import os
+import random
+
+from openpyxl import Workbook
+
+from app.utils import ESTACOES, MAPEAMENTO_ABAS, MAPEAMENTO_FORMULARIO_CAMPO
+
+NOME_PLANILHA = "FT-5.82.AD.BA6XX-403 - ANEXO 1.xlsx"
+NOME_PLANILHA_ESTACAO = "FT-5.82.AD.BA6XX-403 - ANEXO 1 - {estacao}.xlsx"
+NOME_PLANILHA_CAMPO = "Geral_Formulario_Campo.xlsx"
+
+
+def lista_estacoes(quantidade):
+    """Estações conhecidas (ESTACOES); acima desse número, códigos sintéticos (E020, E021...)"""
+    extras = [f"E{i:03d}" for i in range(len(ESTACOES) + 1, quantidade + 1)]
+    return (ESTACOES + extras)[:quantidade]
+
+
+def _valor(rng, coluna, i):
+    """Mistura de textos com espaços, vazios e números, como nas planilhas preenchidas à mão"""
+    return rng.choice([f" {coluna[:4].strip()} {i} ", None, i % 7, 2.5, "x"])
+
+
+def gerar_planilha(destino, itens_por_aba=200, semente=1):
+    """
+    Planilha do formulário isolado: uma aba por MAPEAMENTO_ABAS, com linhas de
+    preâmbulo antes do cabeçalho, linhas em branco e linhas de agrupamento.
+    """
+    rng = random.Random(semente)
+    wb = Workbook()
+    wb.remove(wb.active)
+    for aba_id, info in MAPEAMENTO_ABAS.items():
+        ws = wb.create_sheet(info["titulo"])
+        ws.append(["FT-5.82.AD.BA6XX-403 - ANEXO 1"])
+        ws.append([None])
+        ws.append(["PROJETO", "SINTÉTICO", None, "REVISÃO", 0])
+        ws.append(info["colunas"])
+        for i in range(itens_por_aba):
+            sorteio = rng.random()
+            if sorteio < 0.04:
+                ws.append([None] * len(info["colunas"]))
+            elif sorteio < 0.07:
+                ws.append([f"EQUIPAMENTO GRUPO {i}"])
+            else:
+                ws.append([f"EQ-{aba_id}-{i:05d}"] + [_valor(rng, c, i) for c in info["colunas"][1:]])
+    wb.create_sheet("REVISÕES")["A1"] = "Histórico de revisões"
+    wb.save(destino)
+    return destino
+
+
+def gerar_planilha_campo(destino, itens_por_aba=200, estacoes=19, semente=1):
+    """
+    Planilha do formulário campo: as três abas de MAPEAMENTO_FORMULARIO_CAMPO;
+    comunicação e sensores digitais têm a coluna ESTAÇÃO (com caixa e espaços variados).
+    """
+    rng = random.Random(semente)
+    codigos = lista_estacoes(estacoes)
+    wb = Workbook()
+    wb.remove(wb.active)
+    for tipo, info in MAPEAMENTO_FORMULARIO_CAMPO.items():
+        ws = wb.create_sheet(info["aba"])
+        ws.append([info["aba"]])
+        if info["cabecalho"].get("linha") is None:
+            ws.append([None])
+        ws.append(["Preencher OK/NOK e observações"])
+        ws.append(info["colunas"])
+        for i in range(itens_por_aba):
+            if rng.random() < 0.04:
+                ws.append([None] * len(info["colunas"]))
+                continue
+            linha = []
+            for coluna in info["colunas"]:
+                if coluna == "ESTAÇÃO":
+                    linha.append(rng.choice([str.upper, str.lower])(rng.choice(codigos)) + rng.choice(["", " "]))
+                elif coluna in ("OK", "NOK"):
+                    linha.append(None)
+                else:
+                    linha.append(_valor(rng, coluna, i))
+            ws.append(linha)
+    wb.save(destino)
+    return destino
+
+
+def gerar(destino_dir, itens_por_aba=200, estacoes=19, semente=1, por_estacao=False):
+    """
+    Gera as duas planilhas em destino_dir; retorna (planilha, planilha_campo).
+    por_estacao: também gera uma planilha do formulário isolado para cada estação.
+    """
+    os.makedirs(destino_dir, exist_ok=True)
+    if por_estacao:
+        for numero, estacao in enumerate(lista_estacoes(estacoes)):
+            nome = NOME_PLANILHA_ESTACAO.format(estacao=estacao)
+            gerar_planilha(os.path.join(destino_dir, nome), itens_por_aba, semente + numero + 1)
+    return (
+        gerar_planilha(os.path.join(destino_dir, NOME_PLANILHA), itens_por_aba, semente),
+        gerar_planilha_campo(os.path.join(destino_dir, NOME_PLANILHA_CAMPO), itens_por_aba, estacoes, semente),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera planilhas sintéticas com o layout das planilhas de inspeção")
+    parser.add_argument("--itens", type=int, default=200, help="linhas por aba")
+    parser.add_argument("--estacoes", type=int, default=len(ESTACOES))
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--destino", default="app/planilhas")
+    parser.add_argument("--por-estacao", action="store_true", help="uma planilha do formulário isolado por estação")
+    args = parser.parse_args()
+
+    planilha, planilha_campo = gerar(args.destino, args.itens, args.estacoes, args.semente, args.por_estacao)
+    print(f"✅ {planilha}")
+    print(f"✅ {planilha_campo}")
+    if args.por_estacao:
+        print(f"✅ {args.estacoes} planilhas por estação")
+    print("   Use PLANILHA, PLANILHA_CAMPO e DIRETORIO_PLANILHAS para apontar a aplicação para esses arquivos")
+
+
+if __name__ == "__main__":
+    main()
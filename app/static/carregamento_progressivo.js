@@ -0,0 +1,70 @@
+// Carregamento progressivo das tabelas: as linhas seguintes são buscadas na API
+// quando o marcador .carregar-mais se aproxima da área visível.
+(function () {
+    async function carregarProxima(marcador) {
+        if (marcador.dataset.carregando || !marcador.dataset.proximo) return;
+        marcador.dataset.carregando = "1";
+        try {
+            const url = `${marcador.dataset.url}?formato=html&inicio=${marcador.dataset.proximo}`;
+            const resposta = await fetch(url, { credentials: "same-origin" });
+            if (!resposta.ok) throw new Error(`HTTP ${resposta.status}`);
+            const dados = await resposta.json();
+
+            // Linhas que continuam a última tabela; seções novas entram antes do marcador
+            const destinos = document.querySelectorAll(marcador.dataset.destino);
+            if (dados.html) destinos[destinos.length - 1].insertAdjacentHTML("beforeend", dados.html);
+            if (dados.secoes) marcador.insertAdjacentHTML("beforebegin", dados.secoes);
+
+            if (dados.proximo === null) {
+                marcador.remove();
+            } else {
+                marcador.dataset.proximo = dados.proximo;
+            }
+        } catch (erro) {
+            marcador.textContent = "Erro ao carregar itens. Role novamente para tentar outra vez.";
+        } finally {
+            delete marcador.dataset.carregando;
+        }
+    }
+
+    // Garante que todas as linhas estejam na página (antes de validar/enviar o formulário)
+    async function carregarTodasAsLinhas(raiz) {
+        for (const marcador of (raiz || document).querySelectorAll(".carregar-mais")) {
+            while (marcador.isConnected && marcador.dataset.proximo) {
+                const anterior = marcador.dataset.proximo;
+                await carregarProxima(marcador);
+                if (marcador.isConnected && marcador.dataset.proximo === anterior) break;
+            }
+        }
+    }
+    window.carregarTodasAsLinhas = carregarTodasAsLinhas;
+
+    document.addEventListener("DOMContentLoaded", function () {
+        const observer = new IntersectionObserver(function (entradas) {
+            entradas.forEach(async function (entrada) {
+                if (!entrada.isIntersecting) return;
+                await carregarProxima(entrada.target);
+                // Se o marcador continua visível, observa de novo para buscar a próxima página
+                if (entrada.target.isConnected) {
+                    observer.unobserve(entrada.target);
+                    observer.observe(entrada.target);
+                }
+            });
+        }, { rootMargin: "600px" });
+
+        document.querySelectorAll(".carregar-mais").forEach(function (marcador) {
+            observer.observe(marcador);
+        });
+
+        // O formulário isolado usa campos "required": carrega o restante antes de enviar
+        const form = document.getElementById("form-formulario");
+        if (form) {
+            form.addEventListener("submit", async function (evento) {
+                if (!form.querySelector(".carregar-mais")) return;
+                evento.preventDefault();
+                await carregarTodasAsLinhas(form);
+                if (!form.querySelector(".carregar-mais")) form.requestSubmit();
+            });
+        }
+    });
+})();
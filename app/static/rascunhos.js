@@ -0,0 +1,208 @@
+// Rascunhos e fila de envios offline (IndexedDB).
+// - Rascunhos: respostas salvas automaticamente por página (estação/aba) enquanto o técnico preenche.
+// - Fila: formulários enviados sem conexão; sincronizados em lote em /api/sincronizar.
+// Também é carregado pelo service worker (sw.js) para a sincronização em segundo plano.
+(function (global) {
+    const BANCO = "formularios-offline";
+    const LOTE = 20;
+    const TAG_SYNC = "sincronizar-envios";
+
+    function abrirBanco() {
+        return new Promise(function (resolve, reject) {
+            const req = indexedDB.open(BANCO, 1);
+            req.onupgradeneeded = function () {
+                req.result.createObjectStore("rascunhos");
+                req.result.createObjectStore("fila", { keyPath: "id" });
+            };
+            req.onsuccess = function () { resolve(req.result); };
+            req.onerror = function () { reject(req.error); };
+        });
+    }
+
+    async function operacao(loja, modo, executar) {
+        const banco = await abrirBanco();
+        return new Promise(function (resolve, reject) {
+            const tx = banco.transaction(loja, modo);
+            const req = executar(tx.objectStore(loja));
+            tx.oncomplete = function () { banco.close(); resolve(req && req.result); };
+            tx.onerror = function () { banco.close(); reject(tx.error); };
+        });
+    }
+
+    function gerarId() {
+        if (global.crypto && crypto.randomUUID) return crypto.randomUUID();
+        return Date.now().toString(36) + "-" + Math.random().toString(36).slice(2, 12);
+    }
+
+    // =====================================================
+    // FILA DE ENVIOS
+    // =====================================================
+    async function enfileirar(tipo, estacao, campos) {
+        const envio = { id: gerarId(), tipo: tipo, estacao: estacao, campos: campos, data: new Date().toISOString() };
+        await operacao("fila", "readwrite", function (loja) { return loja.put(envio); });
+        return envio.id;
+    }
+
+    function pendentes() {
+        return operacao("fila", "readonly", function (loja) { return loja.getAll(); });
+    }
+
+    let sincronizando = null;
+
+    // Envia a fila em lotes; retorna o status de cada id processado.
+    // Envios gravados, duplicados (já recebidos) ou inválidos saem da fila; os demais ficam para depois.
+    function sincronizar() {
+        if (!sincronizando) {
+            sincronizando = sincronizarFila().finally(function () { sincronizando = null; });
+        }
+        return sincronizando;
+    }
+
+    async function sincronizarFila() {
+        const status = {};
+        const fila = await pendentes();
+        for (let i = 0; i < fila.length; i += LOTE) {
+            const resposta = await fetch("/api/sincronizar", {
+                method: "POST",
+                credentials: "same-origin",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ envios: fila.slice(i, i + LOTE) })
+            });
+            if (!resposta.ok) throw new Error(`HTTP ${resposta.status}`);
+            const dados = await resposta.json();
+            const concluidos = dados.resultados.filter(function (r) { return r.id; });
+            await operacao("fila", "readwrite", function (loja) {
+                concluidos.forEach(function (r) { loja.delete(r.id); });
+            });
+            concluidos.forEach(function (r) { status[r.id] = r.status; });
+        }
+        return status;
+    }
+
+    // Pede ao service worker para sincronizar quando a conexão voltar (Background Sync)
+    async function agendarSincronizacao() {
+        if (!("serviceWorker" in navigator)) return;
+        const registro = await navigator.serviceWorker.ready;
+        if (registro.sync) await registro.sync.register(TAG_SYNC);
+    }
+
+    // Enfileira e tenta enviar na hora; resolve true se o servidor já recebeu o envio
+    async function enviar(tipo, estacao, campos) {
+        const id = await enfileirar(tipo, estacao, campos);
+        let status = {};
+        try {
+            // Uma sincronização já em andamento não inclui este envio: espera e começa outra
+            if (sincronizando) await sincronizando.catch(function () {});
+            status = await sincronizar();
+        } catch (erro) {
+            // Sem conexão (ou servidor indisponível): o envio continua na fila
+        }
+        if (status[id] === "invalido") throw new Error("Envio rejeitado pelo servidor");
+        if (status[id]) return true;
+        agendarSincronizacao().catch(function () {});
+        return false;
+    }
+
+    // =====================================================
+    // RASCUNHOS
+    // =====================================================
+    function salvarRascunho(chave, campos) {
+        return operacao("rascunhos", "readwrite", function (loja) {
+            return loja.put({ campos: campos, salvo_em: new Date().toISOString() }, chave);
+        });
+    }
+
+    function obterRascunho(chave) {
+        return operacao("rascunhos", "readonly", function (loja) { return loja.get(chave); });
+    }
+
+    function descartarRascunho(chave) {
+        return operacao("rascunhos", "readwrite", function (loja) { return loja.delete(chave); });
+    }
+
+    global.Rascunhos = {
+        disponivel: typeof indexedDB !== "undefined",
+        TAG_SYNC: TAG_SYNC,
+        enfileirar: enfileirar,
+        pendentes: pendentes,
+        sincronizar: sincronizar,
+        enviar: enviar,
+        salvarRascunho: salvarRascunho,
+        obterRascunho: obterRascunho,
+        descartarRascunho: descartarRascunho
+    };
+
+    if (typeof document === "undefined") return;  // service worker: só a fila
+
+    // =====================================================
+    // PÁGINA: AUTOSALVAMENTO E RESTAURAÇÃO
+    // =====================================================
+    function camposDe(raiz) {
+        const campos = {};
+        raiz.querySelectorAll("input[name]").forEach(function (input) {
+            if (input.type === "hidden") return;
+            if (input.type === "radio" || input.type === "checkbox") {
+                if (input.checked) campos[input.name] = input.value;
+            } else if (input.value) {
+                campos[input.name] = input.value;
+            }
+        });
+        return campos;
+    }
+
+    function aplicarCampos(raiz, campos) {
+        let faltando = 0;
+        Object.keys(campos).forEach(function (nome) {
+            const inputs = raiz.querySelectorAll(`input[name="${CSS.escape(nome)}"]`);
+            if (!inputs.length) faltando++;
+            inputs.forEach(function (input) {
+                if (input.type === "radio" || input.type === "checkbox") {
+                    input.checked = input.value === campos[nome];
+                } else {
+                    input.value = campos[nome];
+                }
+            });
+        });
+        return faltando;
+    }
+
+    // O rascunho é por página: estação (e aba, no formulário isolado)
+    const chaveRascunho = location.pathname.toUpperCase();
+    global.Rascunhos.chavePagina = chaveRascunho;
+
+    document.addEventListener("DOMContentLoaded", async function () {
+        if ("serviceWorker" in navigator) {
+            navigator.serviceWorker.register("/sw.js").catch(function () {});
+        }
+        if (!global.Rascunhos.disponivel) return;
+
+        const raiz = document.querySelector(".container") || document.body;
+        try {
+            const rascunho = await obterRascunho(chaveRascunho);
+            // Respostas de linhas ainda não carregadas: carrega a tabela inteira e aplica de novo
+            if (rascunho && aplicarCampos(raiz, rascunho.campos) && global.carregarTodasAsLinhas) {
+                await global.carregarTodasAsLinhas(raiz);
+                aplicarCampos(raiz, rascunho.campos);
+            }
+        } catch (erro) {
+            console.warn("Não foi possível restaurar o rascunho", erro);
+        }
+
+        let temporizador = null;
+        const salvar = function () {
+            clearTimeout(temporizador);
+            temporizador = setTimeout(function () {
+                salvarRascunho(chaveRascunho, camposDe(raiz)).catch(function () {});
+            }, 500);
+        };
+        raiz.addEventListener("input", salvar);
+        raiz.addEventListener("change", salvar);
+
+        // Envios que ficaram na fila de outra visita
+        sincronizar().catch(function () {});
+    });
+
+    global.addEventListener("online", function () {
+        sincronizar().catch(function () {});
+    });
+})(self);
@@ -0,0 +1,52 @@
+// Service worker: mantém as páginas de formulário disponíveis sem conexão
+// e envia a fila de formulários (rascunhos.js) quando a conexão volta.
+importScripts("/static/rascunhos.js");
+
+const CACHE = "formularios-v1";
+const PRE_CACHE = ["/static/style.css", "/static/rascunhos.js", "/static/carregamento_progressivo.js"];
+// Páginas e dados que podem ser abertos offline (sempre tenta a rede primeiro)
+const OFFLINE = /^\/(static\/|selecao_estacao|formulario_isolado\/|formulario_campo\/|api\/formulario_)/;
+
+self.addEventListener("install", function (evento) {
+    evento.waitUntil(caches.open(CACHE).then(function (cache) { return cache.addAll(PRE_CACHE); }));
+    self.skipWaiting();
+});
+
+self.addEventListener("activate", function (evento) {
+    evento.waitUntil(
+        caches.keys()
+            .then(function (nomes) {
+                return Promise.all(nomes.filter(function (n) { return n !== CACHE; }).map(function (n) { return caches.delete(n); }));
+            })
+            .then(function () { return self.clients.claim(); })
+    );
+});
+
+self.addEventListener("fetch", function (evento) {
+    const url = new URL(evento.request.url);
+    if (evento.request.method !== "GET" || url.origin !== location.origin || !OFFLINE.test(url.pathname)) return;
+
+    evento.respondWith(
+        fetch(evento.request)
+            .then(function (resposta) {
+                if (resposta.ok && !resposta.redirected) {
+                    const copia = resposta.clone();
+                    caches.open(CACHE).then(function (cache) { cache.put(evento.request, copia); });
+                }
+                return resposta;
+            })
+            .catch(function () {
+                return caches.match(evento.request).then(function (resposta) {
+                    return resposta || new Response("Sem conexão e página não disponível offline.", {
+                        status: 503, headers: { "Content-Type": "text/plain; charset=utf-8" }
+                    });
+                });
+            })
+    );
+});
+
+self.addEventListener("sync", function (evento) {
+    if (evento.tag === Rascunhos.TAG_SYNC) {
+        evento.waitUntil(Rascunhos.sincronizar());
+    }
+});
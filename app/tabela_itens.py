@@ -0,0 +1,136 @@
+import sys
+from collections.abc import Mapping, Sequence
+
+# Uma tupla de colunas (e o mapa coluna → posição) por cabeçalho distinto, compartilhada pelas tabelas
+_CABECALHOS = {}
+
+
+def _cabecalho(colunas):
+    colunas = tuple(sys.intern(str(c)) for c in colunas)
+    if colunas not in _CABECALHOS:
+        _CABECALHOS[colunas] = (colunas, {c: i for i, c in enumerate(colunas)})
+    return _CABECALHOS[colunas]
+
+
+def _internar(valor):
+    return sys.intern(valor) if type(valor) is str else valor
+
+
+class LinhaItem(Mapping):
+    """
+    Visão de uma linha da TabelaItens; lida como dicionário (item["ITEM DO PT"], get,
+    dict(item)) ou por atributo (item.coluna_1), inclusive nos templates Jinja.
+    """
+
+    __slots__ = ("_tabela", "_indice")
+
+    def __init__(self, tabela, indice):
+        self._tabela = tabela
+        self._indice = indice
+
+    def __getitem__(self, coluna):
+        return self._tabela._dados[self._tabela._posicoes[coluna]][self._indice]
+
+    def __getattr__(self, coluna):
+        if coluna.startswith("__"):
+            raise AttributeError(coluna)
+        try:
+            return self[coluna]
+        except KeyError:
+            raise AttributeError(coluna) from None
+
+    def __iter__(self):
+        return iter(self._tabela.colunas)
+
+    def __len__(self):
+        return len(self._tabela.colunas)
+
+    def __repr__(self):
+        return f"LinhaItem({dict(self)!r})"
+
+
+class TabelaItens(Sequence):
+    """
+    Itens de uma aba guardados por coluna (uma tupla por coluna), em vez de um
+    dicionário por linha. Textos repetidos (nome da aba, código da estação, "OK")
+    são internados e o cabeçalho é compartilhado entre tabelas iguais.
+    Indexar devolve uma LinhaItem; fatiar devolve outra TabelaItens.
+    """
+
+    __slots__ = ("colunas", "_posicoes", "_dados")
+
+    def __init__(self, colunas, dados):
+        self.colunas, self._posicoes = _cabecalho(colunas)
+        self._dados = tuple(tuple(coluna) for coluna in dados)
+
+    @classmethod
+    def de_colunas(cls, colunas):
+        """{nome: valores} (por exemplo, as colunas de um DataFrame)"""
+        return cls(colunas.keys(), (map(_internar, valores) for valores in colunas.values()))
+
+    @classmethod
+    def de_registros(cls, registros, colunas=None):
+        registros = list(registros)
+        if colunas is None:
+            colunas = list(registros[0]) if registros else []
+        return cls(colunas, ([_internar(r.get(c, "")) for r in registros] for c in colunas))
+
+    @classmethod
+    def concatenar(cls, tabelas):
+        """Uma tabela com as linhas de todas; colunas que faltam numa delas ficam com "" """
+        tabelas = [t for t in tabelas if len(t)]
+        colunas = list(dict.fromkeys(c for t in tabelas for c in t.colunas))
+        return cls(colunas, ([v for t in tabelas for v in t.coluna(c)] for c in colunas))
+
+    def __len__(self):
+        return len(self._dados[0]) if self._dados else 0
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return TabelaItens(self.colunas, (coluna[indice] for coluna in self._dados))
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError(indice)
+        return LinhaItem(self, indice)
+
+    def __eq__(self, outra):
+        if isinstance(outra, TabelaItens):
+            return self.colunas == outra.colunas and self._dados == outra._dados
+        return list(map(dict, self)) == list(outra)
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return self.colunas, self._dados
+
+    def __setstate__(self, estado):
+        # Textos repetidos já voltam compartilhados: o pickle grava cada objeto uma vez
+        self.colunas, self._posicoes = _cabecalho(estado[0])
+        self._dados = estado[1]
+
+    def coluna(self, nome):
+        return self._dados[self._posicoes[nome]] if nome in self._posicoes else ("",) * len(self)
+
+    def filtrar(self, termo):
+        """Linhas em que algum valor contém termo (sem diferenciar maiúsculas)"""
+        termo = termo.lower()
+        contem = {}  # por valor distinto: os textos se repetem muito entre as linhas
+        linhas = set()
+        for coluna in self._dados:
+            for i, valor in enumerate(coluna):
+                if valor not in contem:
+                    contem[valor] = termo in str(valor).lower()
+                if contem[valor]:
+                    linhas.add(i)
+        linhas = sorted(linhas)
+        return TabelaItens(self.colunas, ([coluna[i] for i in linhas] for coluna in self._dados))
+
+    def registros(self, colunas=None):
+        """Linhas como dicionários (respostas JSON); colunas restringe os campos"""
+        colunas = list(colunas) if colunas else list(self.colunas)
+        valores = [self.coluna(c) for c in colunas]
+        return [dict(zip(colunas, linha)) for linha in zip(*valores)] if valores else [{} for _ in range(len(self))]
+
+    def __repr__(self):
+        return f"TabelaItens({len(self)} linhas, colunas={list(self.colunas)})"
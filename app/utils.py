@@ -1,5 +1,33 @@
-import pandas as pd
 import os
+import asyncio
+import csv
+import io
+import tempfile
+import hashlib
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from app.cache_compartilhado import criar_cache_compartilhado
+from app.metricas import medir
+from app.tabela_itens import TabelaItens
+
+PLANILHA = os.getenv("PLANILHA", "app/planilhas/FT-5.82.AD.BA6XX-403 - ANEXO 1.xlsm")
+PLANILHA_CAMPO = os.getenv("PLANILHA_CAMPO", "app/planilhas/Geral_Formulario_Campo.xlsx")
+ARTEFATO_PLANILHAS = os.getenv("ARTEFATO_PLANILHAS", "app/planilhas/planilhas_compiladas.pkl")
+# Vários workers: diretório (ex.: /dev/shm/radix-planilhas) ou redis://... para processar cada planilha uma vez só
+CACHE_COMPARTILHADO = os.getenv("CACHE_COMPARTILHADO", "")
+
+# Planilhas do formulário isolado por estação (ver RegistroEstacoes)
+DIRETORIO_PLANILHAS = os.getenv("DIRETORIO_PLANILHAS", os.path.dirname(PLANILHA))
+ESTACOES = [e.strip().upper() for e in os.getenv(
+    "ESTACOES", "CPR,CPL,VBE,GGR,STA,LTR,APN,ABV,BGA,BRK,CPB,ECT,MOE,SER,HSP,SCZ,CKB,PCR,PGC"
+).split(",") if e.strip()]
+ESTACOES_AQUECIDAS = [e.strip().upper() for e in os.getenv("ESTACOES_AQUECIDAS", "CPR").split(",") if e.strip()]
+PLANILHAS_RESIDENTES_MAX = int(os.getenv("PLANILHAS_RESIDENTES_MAX", "4"))
 
 MAPEAMENTO_ABAS = {
     "1": {
@@ -33,7 +61,9 @@ MAPEAMENTO_ABAS = {
             "OK",
             "NOK",
             "OBSERVAÇÕES"
-        ]
+        ],
+        # Campo do formulário (<campo>_<n>) com o valor digitado na coluna ALIMENTAÇÃO AFERIDA
+        "campo_medido": "alimentacao_aferida"
     },
     "6": {
         "titulo": "PROCEDIMENTO VERIFICAÇÃO CLP",
@@ -46,55 +76,294 @@ MAPEAMENTO_ABAS = {
 MAPEAMENTO_FORMULARIO_CAMPO = {
     "comunicacao": {
         "aba": "TESTE DE COMUNICAÇÃO ENTRE CLP",
-        "colunas": ["ESTAÇÃO", "EQUIPAMENTO", "STATUS DO PAINEL", "ITEM DO PT", "OK", "NOK", "OBSERVAÇÕES"]
+        "colunas": ["ESTAÇÃO", "EQUIPAMENTO", "STATUS DO PAINEL", "ITEM DO PT", "OK", "NOK", "OBSERVAÇÕES"],
+        # Linha 1 é o cabeçalho (ESTAÇÃO, EQUIPAMENTO, etc.)
+        "cabecalho": {"linha": 1}
     },
     "sensores_digitais": {
         "aba": "TESTES SENSORES DIGITAIS",
-        "colunas": ["ESTAÇÃO", "EQUIPAMENTO", "SENSOR", "ITEM DO PT", "ESTADO", "OK", "NOK", "OBSERVAÇÃO"]
+        "colunas": ["ESTAÇÃO", "EQUIPAMENTO", "SENSOR", "ITEM DO PT", "ESTADO", "OK", "NOK", "OBSERVAÇÃO"],
+        "cabecalho": {"contem": ["ESTAÇÃO", "EQUIPAMENTO"]}
     },
     "sensores_analogicos": {
         "aba": "SENSORES ANALÓGICOS",
-        "colunas": ["EQUIPAMENTO", "SENSOR", "ITEM DO PT", "VALOR PREVISTO", "VARIÁVEIS MEDIDAS NO CLP", "VARIÁVEIS MEDIDAS NO EPM", "OK", "NOK", "OBSERVAÇÕES"]
+        "colunas": ["EQUIPAMENTO", "SENSOR", "ITEM DO PT", "VALOR PREVISTO", "VARIÁVEIS MEDIDAS NO CLP", "VARIÁVEIS MEDIDAS NO EPM", "OK", "NOK", "OBSERVAÇÕES"],
+        "cabecalho": {"contem": ["EQUIPAMENTO", "SENSOR"]}
     }
 }
 
+# Regra de cabeçalho das abas do MAPEAMENTO_ABAS (pode ser sobrescrita com a chave "cabecalho")
+CABECALHO_PADRAO = {
+    "iguais": ["EQUIPAMENTO", "CIRCUITO", "PONTO", "SISTEMA", "TAG", "SENSOR", "SENSORES", "ATERRAMENTO", "ESTAÇÃO", "ESTACAO"],
+    "min_preenchidas": 3
+}
+
+# =====================================================
+# CACHE DE PLANILHAS
+# =====================================================
+def versao_planilha(caminho_planilha):
+    """Identifica a versão do arquivo em disco (caminho absoluto, mtime e tamanho)"""
+    st = os.stat(caminho_planilha)
+    return (os.path.abspath(caminho_planilha), st.st_mtime_ns, st.st_size)
+
+class CachePlanilhas:
+    """
+    Cache LRU dos itens já processados de cada planilha.
+    Cada entrada guarda a versão do arquivo; se a planilha for substituída
+    em disco, a entrada antiga é descartada e o conteúdo é recarregado.
+    Com manter_versao_anterior (ligado quando o ObservadorPlanilhas está ativo), a
+    planilha alterada não é relida na requisição: a versão anterior continua sendo
+    servida até recarregar_planilha trocar as entradas (substituir).
+    """
+
+    def __init__(self, max_entradas=64):
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self.manter_versao_anterior = False
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, caminho_planilha, chave, carregar, compartilhar=False):
+        """compartilhar: na falta, busca (ou grava) o valor também no cache_compartilhado"""
+        return self.obter_versionado(caminho_planilha, chave, carregar, compartilhar)[1]
+
+    def obter_versionado(self, caminho_planilha, chave, carregar, compartilhar=False):
+        """
+        Como obter, mas retorna (versao, valor) com a versão da planilha de onde o valor
+        veio: com manter_versao_anterior, pode ser a anterior à que está em disco.
+        """
+        versao = versao_planilha(caminho_planilha)
+        encontrada = self._consultar((versao[0],) + chave, versao)
+        if encontrada is not None:
+            return encontrada
+
+        valor = carregar_compartilhado(versao, chave, carregar) if compartilhar else carregar()
+        self._guardar((versao[0],) + chave, versao, valor)
+        return versao, valor
+
+    def consultar(self, caminho_planilha, chave):
+        """(versao, valor) se já estiver em memória, sem carregar (nem contar falta); senão None"""
+        versao = versao_planilha(caminho_planilha)
+        return self._consultar((versao[0],) + chave, versao, contar_falta=False)
+
+    def _consultar(self, chave_completa, versao, contar_falta=True):
+        with self._lock:
+            entrada = self._entradas.get(chave_completa)
+            if entrada is not None and (entrada[0] == versao or self.manter_versao_anterior):
+                self._entradas.move_to_end(chave_completa)
+                self.hits += 1
+                return entrada
+            if contar_falta:
+                self.misses += 1
+            return None
+
+    def definir(self, caminho_planilha, chave, valor):
+        """Registra um valor já processado para a versão atual da planilha"""
+        versao = versao_planilha(caminho_planilha)
+        self._guardar((versao[0],) + chave, versao, valor)
+
+    def _guardar(self, chave_completa, versao, valor):
+        with self._lock:
+            self._entradas[chave_completa] = (versao, valor)
+            self._entradas.move_to_end(chave_completa)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def descartar(self, caminho_planilha):
+        """Remove todas as entradas de uma planilha"""
+        caminho = os.path.abspath(caminho_planilha)
+        with self._lock:
+            for chave in [c for c in self._entradas if c[0] == caminho]:
+                del self._entradas[chave]
+
+    def valores(self, caminho_planilha):
+        """{chave: valor} das entradas em memória de uma planilha"""
+        caminho = os.path.abspath(caminho_planilha)
+        with self._lock:
+            return {c[1:]: entrada[1] for c, entrada in self._entradas.items() if c[0] == caminho}
+
+    def substituir(self, caminho_planilha, versao, valores):
+        """
+        Troca de uma vez todas as entradas da planilha pelos valores ({chave: valor}) da
+        nova versão; as derivadas (fragmentos renderizados) são refeitas sob demanda.
+        """
+        caminho = os.path.abspath(caminho_planilha)
+        with self._lock:
+            for chave in [c for c in self._entradas if c[0] == caminho]:
+                del self._entradas[chave]
+            for chave, valor in valores.items():
+                self._entradas[(caminho,) + chave] = (versao, valor)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def estatisticas(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entradas": len(self._entradas)}
+
+# O limite de memória por planilha fica no RegistroEstacoes; este é só uma proteção adicional
+cache_planilhas = CachePlanilhas(max_entradas=int(os.getenv("CACHE_PLANILHAS_MAX", "256")))
+
+# Camada entre processos: o primeiro worker processa a planilha, os outros leem o resultado
+cache_compartilhado = criar_cache_compartilhado(CACHE_COMPARTILHADO)
+
+def carregar_compartilhado(versao, chave, carregar):
+    if cache_compartilhado is None:
+        return carregar()
+    return cache_compartilhado.obter_ou_construir((versao,) + chave, carregar)
+
+# =====================================================
+# LEITURA DA PLANILHA (PASSADA ÚNICA)
+# =====================================================
+# pandas e openpyxl são importados na primeira leitura/escrita de planilha, não no boot:
+# com o artefato compilado ou o cache compartilhado, um worker pode nem chegar a usá-los.
+
+# Os mesmos de openpyxl.cell.cell.ERROR_CODES
+CODIGOS_ERRO_EXCEL = frozenset(("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"))
+
+def _converter_celula(valor):
+    # Mesma conversão do leitor openpyxl do pandas (inteiros exatos viram int)
+    if valor is None:
+        return ""
+    if isinstance(valor, str) and valor in CODIGOS_ERRO_EXCEL:
+        return float("nan")
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+def _dataframe_da_sheet(sheet):
+    import pandas as pd
+    from pandas.io.parsers import TextParser
+
+    sheet.reset_dimensions()
+
+    dados = []
+    ultima_linha_com_dados = -1
+    for numero, linha in enumerate(sheet.iter_rows(values_only=True)):
+        convertida = [_converter_celula(valor) for valor in linha]
+        while convertida and convertida[-1] == "":
+            convertida.pop()
+        if convertida:
+            ultima_linha_com_dados = numero
+        dados.append(convertida)
+
+    dados = dados[:ultima_linha_com_dados + 1]
+    if not dados:
+        return pd.DataFrame()
+
+    largura = max(len(linha) for linha in dados)
+    dados = [linha + [""] * (largura - len(linha)) for linha in dados]
+
+    # Primeira linha como cabeçalho, igual ao pd.read_excel(header=0)
+    return TextParser(dados, header=0, skip_blank_lines=False).read()
+
+@medir("leitura_planilha")
+def ler_planilha(caminho_planilha, escolher_abas=None):
+    """
+    Abre a planilha uma única vez (openpyxl read-only) e devolve
+    {nome_aba: DataFrame} para as abas escolhidas, na ordem da planilha.
+    escolher_abas recebe a lista de nomes das abas e devolve as que devem ser lidas.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(caminho_planilha, read_only=True, data_only=True, keep_links=False)
+    try:
+        nomes = wb.sheetnames
+        selecionadas = escolher_abas(nomes) if escolher_abas else nomes
+        return {nome: _dataframe_da_sheet(wb[nome]) for nome in selecionadas}
+    finally:
+        wb.close()
+
+def identificar_aba(nome_aba):
+    """Retorna o aba_id do MAPEAMENTO_ABAS correspondente ao nome da aba (ou None)"""
+    for aba_id, info in MAPEAMENTO_ABAS.items():
+        if info["titulo"] in nome_aba:
+            return aba_id
+    return None
+
+def abas_mapeadas(nomes):
+    return [nome for nome in nomes if identificar_aba(nome)]
+
+def abas_formulario_campo(nomes):
+    necessarias = {info["aba"] for info in MAPEAMENTO_FORMULARIO_CAMPO.values()}
+    return [nome for nome in nomes if nome in necessarias]
+
+def _textos_da_tabela(df):
+    """
+    Converte todas as células para texto sem espaços nas pontas ("" para vazias),
+    coluna a coluna. Retorna os textos e a máscara das linhas totalmente vazias.
+    """
+    import pandas as pd
+
+    valores = df.to_numpy()  # mesmos tipos que o iterrows entregava em cada linha
+    nulos = pd.isna(valores)
+    textos = pd.DataFrame(valores, index=df.index).astype(str)
+    textos = textos.apply(lambda coluna: coluna.str.strip()).mask(nulos, "")
+    return textos, nulos.all(axis=1)
+
+def localizar_cabecalho(df, iguais=(), contem=(), min_preenchidas=0, bloco=50):
+    """
+    Procura a primeira linha de cabeçalho analisando blocos de linhas de uma vez.
+    iguais: alguma célula deve ser exatamente uma dessas palavras
+    contem: todas essas palavras devem aparecer em alguma célula da linha
+    Retorna o índice da linha ou None.
+    """
+    for inicio in range(0, len(df), bloco):
+        topo = df.iloc[inicio:inicio + bloco]
+        preenchidas = topo.notna()
+        textos = topo.astype(str).apply(lambda coluna: coluna.str.strip().str.upper()).where(preenchidas, "")
+
+        candidatas = preenchidas.sum(axis=1) >= min_preenchidas
+        if iguais:
+            candidatas &= textos.isin(iguais).any(axis=1)
+        for palavra in contem:
+            candidatas &= textos.apply(lambda coluna: coluna.str.contains(palavra, regex=False)).any(axis=1)
+
+        if candidatas.any():
+            return candidatas.idxmax()
+    return None
+
 def encontrar_cabecalho(df, aba_id=None):
-    for idx, row in df.iterrows():
-        if row.notna().sum() >= 3:
-            valores = [str(val).strip().upper() for val in row if pd.notna(val)]
-            if any(val in ["EQUIPAMENTO", "CIRCUITO", "PONTO", "SISTEMA", "TAG", "SENSOR", "SENSORES", "ATERRAMENTO", "ESTAÇÃO", "ESTACAO"]
-                   for val in valores):
-                return idx
-    return 0
+    regra = MAPEAMENTO_ABAS.get(str(aba_id), {}).get("cabecalho", CABECALHO_PADRAO)
+    idx = localizar_cabecalho(df, **regra)
+    return idx if idx is not None else 0
 
 def carregar_abas(caminho_planilha):
-    xlsx = pd.ExcelFile(caminho_planilha)
+    planilha = ler_planilha(caminho_planilha, abas_mapeadas)
     abas_info = []
 
-    for nome_aba in xlsx.sheet_names:
-        for aba_id, info in MAPEAMENTO_ABAS.items():
-            if info["titulo"] in nome_aba:
-                df = pd.read_excel(caminho_planilha, sheet_name=nome_aba)
-                cabecalho_idx = encontrar_cabecalho(df, aba_id)
-                df = df.iloc[cabecalho_idx:].reset_index(drop=True)
+    for nome_aba, df in planilha.items():
+        aba_id = identificar_aba(nome_aba)
+        cabecalho_idx = encontrar_cabecalho(df, aba_id)
+        df = df.iloc[cabecalho_idx:].reset_index(drop=True)
 
-                total_itens = len([row for _, row in df.iterrows() if not pd.isna(row).all()])
+        total_itens = int(df.notna().any(axis=1).sum())
 
-                abas_info.append({
-                    'id': aba_id,
-                    'titulo': nome_aba,
-                    'descricao': info["descricao"],
-                    'total_itens': total_itens - 1
-                })
-                break
+        abas_info.append({
+            'id': aba_id,
+            'titulo': nome_aba,
+            'descricao': MAPEAMENTO_ABAS[aba_id]["descricao"],
+            'total_itens': total_itens - 1
+        })
 
     return sorted(abas_info, key=lambda x: int(x['id']))
 
 def carregar_itens(caminho_planilha, aba_id=None):
-    xlsx = pd.ExcelFile(caminho_planilha)
+    return carregar_itens_versionado(caminho_planilha, aba_id)[1]
 
-    def processar_sheet(nome_aba, aba_id=None):
-        df = pd.read_excel(caminho_planilha, sheet_name=nome_aba)
+@medir("carregar_itens")
+def carregar_itens_versionado(caminho_planilha, aba_id=None):
+    """(versao, itens): a versão é a da planilha de onde os itens servidos vieram"""
+    chave = ("itens", str(aba_id) if aba_id else None)
+    return cache_planilhas.obter_versionado(
+        caminho_planilha, chave, lambda: _carregar_itens(caminho_planilha, aba_id), compartilhar=True)
+
+def _carregar_itens(caminho_planilha, aba_id=None):
+    def processar_sheet(nome_aba, df, aba_id=None):
         cabecalho_idx = encontrar_cabecalho(df, aba_id)
 
         if aba_id in MAPEAMENTO_ABAS:
@@ -119,16 +388,11 @@ def carregar_itens(caminho_planilha, aba_id=None):
         df_dados = df_dados.iloc[:, :len(header_names)]
         df_dados.columns = header_names
 
-        itens = []
-        for _, row in df_dados.iterrows():
-            if pd.isna(row).all():
-                continue
-            item = {}
-            for i, col in enumerate(df_dados.columns[:8]):
-                val = row[col]
-                item[f"coluna_{i + 1}"] = str(val).strip() if pd.notna(val) else ""
-            item["aba"] = nome_aba
-            itens.append(item)
+        textos, vazias = _textos_da_tabela(df_dados.iloc[:, :8])
+        textos = textos[~vazias]
+        colunas = {f"coluna_{i + 1}": textos.iloc[:, i].tolist() for i in range(len(textos.columns))}
+        colunas["aba"] = [nome_aba] * len(textos)
+        itens = TabelaItens.de_colunas(colunas)
 
         show_quantity_test = (aba_id == "1")
         return itens, header_names, show_quantity_test
@@ -139,179 +403,622 @@ def carregar_itens(caminho_planilha, aba_id=None):
             return {'items': [], 'headers': [], 'show_quantity_test': False}
 
         target = info["titulo"]
-        sheet_name = next((n for n in xlsx.sheet_names if target in n), None)
+        planilha = ler_planilha(caminho_planilha, lambda nomes: [n for n in nomes if target in n][:1])
 
-        if not sheet_name:
+        if not planilha:
             return {'items': [], 'headers': [], 'show_quantity_test': False}
 
-        itens, headers, show_quantity_test = processar_sheet(sheet_name, aba_id)
+        sheet_name, df = next(iter(planilha.items()))
+        itens, headers, show_quantity_test = processar_sheet(sheet_name, df, aba_id)
         return {'items': itens, 'headers': headers, 'show_quantity_test': show_quantity_test}
 
     todas_abas = []
-    for nome_aba in xlsx.sheet_names:
-        for aid, info in MAPEAMENTO_ABAS.items():
-            if info["titulo"] in nome_aba:
-                itens, _, _ = processar_sheet(nome_aba, aid)
-                todas_abas.extend(itens)
-                break
+    for nome_aba, df in ler_planilha(caminho_planilha, abas_mapeadas).items():
+        itens, _, _ = processar_sheet(nome_aba, df, identificar_aba(nome_aba))
+        todas_abas.append(itens)
 
-    return {'items': todas_abas, 'headers': [], 'show_quantity_test': False}
+    return {'items': TabelaItens.concatenar(todas_abas), 'headers': [], 'show_quantity_test': False}
 
+@medir("carregar_formulario_campo")
 def carregar_formulario_campo(caminho_planilha, estacao):
     """
-    Carrega dados do formulário campo filtrando por estação
+    Carrega dados do formulário campo filtrando por estação (consulta ao índice por estação)
     """
-    try:
+    indice = obter_indice_formulario_campo(caminho_planilha)
+    return indice.consultar(estacao) if indice else {}
+
+@medir("indice_formulario_campo")
+def obter_indice_formulario_campo(caminho_planilha):
+    """Índice por estação da planilha (None se o arquivo não existir)"""
+    if not os.path.exists(caminho_planilha):
+        print(f"❌ ARQUIVO NÃO ENCONTRADO: {caminho_planilha}")
+        return None
+    return indice_estacoes.obter(caminho_planilha)
+
+def _preparar_aba_campo(tipo, df):
+    """Aplica a estratégia de cabeçalho de cada aba e remove linhas vazias"""
+    # ESTRATÉGIA ESPECÍFICA PARA CADA ABA (definida no MAPEAMENTO_FORMULARIO_CAMPO)
+    regra = MAPEAMENTO_FORMULARIO_CAMPO[tipo]["cabecalho"]
+    if "linha" in regra:
+        cabecalho_idx = regra["linha"]
+    else:
+        cabecalho_idx = localizar_cabecalho(df, **regra)
+    if cabecalho_idx is None:
+        cabecalho_idx = 0
+
+    df.columns = df.iloc[cabecalho_idx]
+    df = df.iloc[cabecalho_idx + 1:].reset_index(drop=True)
+
+    # Remover linhas vazias
+    return df.dropna(how='all')
+
+def _converter_itens_campo(df_filtrado, colunas_necessarias):
+    """Seleciona as colunas do mapeamento e converte as linhas numa TabelaItens"""
+    # Adicionar colunas faltantes
+    for col in colunas_necessarias:
+        if col not in df_filtrado.columns:
+            df_filtrado[col] = ""
+
+    # Selecionar e ordenar colunas
+    df_filtrado = df_filtrado[colunas_necessarias]
+
+    textos, vazias = _textos_da_tabela(df_filtrado)
+    textos.columns = df_filtrado.columns
+
+    # Descartar linhas vazias e linhas sem nenhum dado válido
+    validas = ~vazias & (textos != "").any(axis=1)
+    textos = textos[validas]
+    return TabelaItens.de_colunas({coluna: textos.iloc[:, i].tolist() for i, coluna in enumerate(textos.columns)})
+
+class IndiceFormularioCampo:
+    """
+    Itens do formulário campo já agrupados por estação.
+    grupos[tipo] mapeia o código da estação para a lista de itens; a chave None
+    indica uma aba sem filtro por estação (mesmos itens para todas).
+    """
+
+    def __init__(self, grupos):
+        self.grupos = grupos
+        self.versao = None  # versão da planilha usada na construção
+
+    def consultar(self, estacao):
         dados = {}
-        
-        print(f"🎯 INICIANDO CARREGAMENTO PARA ESTAÇÃO: {estacao}")
-        print(f"📁 Planilha: {caminho_planilha}")
-        
-        if not os.path.exists(caminho_planilha):
-            print(f"❌ ARQUIVO NÃO ENCONTRADO: {caminho_planilha}")
-            return {}
-        
-        xlsx = pd.ExcelFile(caminho_planilha)
-        print(f"📑 Abas disponíveis: {xlsx.sheet_names}")
-        
-        for tipo, info in MAPEAMENTO_FORMULARIO_CAMPO.items():
-            try:
-                print(f"\n🔍 === PROCESSANDO ABA: {info['aba']} ===")
-                
-                if info['aba'] not in xlsx.sheet_names:
-                    print(f"❌ ABA NÃO ENCONTRADA: {info['aba']}")
-                    dados[tipo] = []
-                    continue
-                
-                df = pd.read_excel(caminho_planilha, sheet_name=info["aba"])
-                print(f"✅ Aba carregada - {len(df)} linhas")
-                
-                # ESTRATÉGIA ESPECÍFICA PARA CADA ABA
-                if tipo == "comunicacao":
-                    print("🎯 ESTRATÉGIA PARA COMUNICAÇÃO")
-                    # Linha 1 é o cabeçalho (ESTAÇÃO, EQUIPAMENTO, etc.)
-                    df.columns = df.iloc[1]  # Usar linha 1 como cabeçalho
-                    df = df.iloc[2:].reset_index(drop=True)  # Dados começam na linha 2
-                    
-                elif tipo == "sensores_digitais":
-                    print("🎯 ESTRATÉGIA PARA SENSORES DIGITAIS")
-                    # Procurar linha com "ESTAÇÃO" e "EQUIPAMENTO"
-                    cabecalho_idx = None
-                    for idx, row in df.iterrows():
-                        linha_str = ' '.join([str(cell).upper() for cell in row if pd.notna(cell)])
-                        if "ESTAÇÃO" in linha_str and "EQUIPAMENTO" in linha_str:
-                            cabecalho_idx = idx
-                            break
-                    
-                    if cabecalho_idx is not None:
-                        df.columns = df.iloc[cabecalho_idx]
-                        df = df.iloc[cabecalho_idx + 1:].reset_index(drop=True)
-                    else:
-                        df.columns = df.iloc[0]
-                        df = df.iloc[1:].reset_index(drop=True)
-                        
-                else:  # sensores_analogicos
-                    print("🎯 ESTRATÉGIA PARA SENSORES ANALÓGICOS")
-                    # Procurar linha com "EQUIPAMENTO" e "SENSOR"
-                    cabecalho_idx = None
-                    for idx, row in df.iterrows():
-                        linha_str = ' '.join([str(cell).upper() for cell in row if pd.notna(cell)])
-                        if "EQUIPAMENTO" in linha_str and "SENSOR" in linha_str:
-                            cabecalho_idx = idx
-                            break
-                    
-                    if cabecalho_idx is not None:
-                        df.columns = df.iloc[cabecalho_idx]
-                        df = df.iloc[cabecalho_idx + 1:].reset_index(drop=True)
-                    else:
-                        df.columns = df.iloc[0]
-                        df = df.iloc[1:].reset_index(drop=True)
-                
-                # Remover linhas vazias
-                df = df.dropna(how='all')
-                print(f"📈 Dados processados: {len(df)} linhas")
-                
-                # FILTRAGEM POR ESTAÇÃO
-                if tipo in ["comunicacao", "sensores_digitais"]:
-                    # Encontrar coluna ESTAÇÃO
-                    coluna_estacao = None
-                    for col in df.columns:
-                        if str(col).upper().strip() in ['ESTAÇÃO', 'ESTACAO', 'ESTAÇAO']:
-                            coluna_estacao = col
-                            break
-                    
-                    if coluna_estacao:
-                        print(f"📍 Coluna de estação: '{coluna_estacao}'")
-                        # Padronizar valores
-                        df[coluna_estacao] = df[coluna_estacao].astype(str).str.upper().str.strip()
-                        valores_unicos = df[coluna_estacao].unique()
-                        print(f"📋 Valores únicos: {list(valores_unicos)}")
-                        
-                        # Filtrar por estação
-                        df_filtrado = df[df[coluna_estacao] == estacao.upper()]
-                        print(f"✅ {len(df_filtrado)} linhas para estação {estacao}")
-                        
-                        # Remover coluna ESTAÇÃO
-                        df_filtrado = df_filtrado.drop(coluna_estacao, axis=1)
-                    else:
-                        print("❌ Coluna ESTAÇÃO não encontrada")
-                        df_filtrado = df
-                else:
-                    # Sensores analógicos não tem filtro por estação
-                    df_filtrado = df
-                    print("ℹ️ Sensores analógicos - sem filtro por estação")
-                
-                # PREPARAR COLUNAS FINAIS
-                colunas_necessarias = info["colunas"]
-                
-                # Adicionar colunas faltantes
-                for col in colunas_necessarias:
-                    if col not in df_filtrado.columns:
-                        df_filtrado[col] = ""
-                        print(f"➕ Adicionada coluna: {col}")
-                
-                # Selecionar e ordenar colunas
-                df_filtrado = df_filtrado[colunas_necessarias]
-                
-                # CONVERTER PARA DICIONÁRIOS
-                itens = []
-                for _, row in df_filtrado.iterrows():
-                    if pd.isna(row).all():
-                        continue
-                    
-                    item = {}
-                    for col in df_filtrado.columns:
-                        val = row[col]
-                        item[col] = str(val).strip() if pd.notna(val) else ""
-                    
-                    # Verificar se tem dados válidos
-                    if any(value.strip() for value in item.values() if value):
-                        itens.append(item)
-                
-                print(f"🎉 {len(itens)} itens carregados")
-                if itens:
-                    print(f"📄 Primeiro item: {itens[0]}")
-                dados[tipo] = itens
-                
-            except Exception as e:
-                print(f"❌ Erro na aba {info['aba']}: {e}")
-                import traceback
-                traceback.print_exc()
-                dados[tipo] = []
-        
-        print(f"\n📊 RESUMO FINAL:")
-        print(f"   Comunicação: {len(dados.get('comunicacao', []))} itens")
-        print(f"   Sensores Digitais: {len(dados.get('sensores_digitais', []))} itens")
-        print(f"   Sensores Analógicos: {len(dados.get('sensores_analogicos', []))} itens")
-        
+        for tipo, por_estacao in self.grupos.items():
+            if None in por_estacao:
+                dados[tipo] = por_estacao[None]
+            else:
+                dados[tipo] = por_estacao.get(estacao.upper(), [])
         return dados
-        
+
+def construir_indice_estacoes(caminho_planilha):
+    """
+    Lê as abas do formulário campo uma única vez e agrupa comunicação e
+    sensores digitais pela coluna ESTAÇÃO normalizada
+    """
+    print(f"🎯 CONSTRUINDO ÍNDICE POR ESTAÇÃO: {caminho_planilha}")
+    grupos = {}
+
+    try:
+        planilha = ler_planilha(caminho_planilha, abas_formulario_campo)
     except Exception as e:
         print(f"🚨 ERRO GERAL: {e}")
         import traceback
         traceback.print_exc()
-        return {}
+        return IndiceFormularioCampo({})
+
+    for tipo, info in MAPEAMENTO_FORMULARIO_CAMPO.items():
+        try:
+            if info['aba'] not in planilha:
+                print(f"❌ ABA NÃO ENCONTRADA: {info['aba']}")
+                grupos[tipo] = {None: []}
+                continue
+
+            df = _preparar_aba_campo(tipo, planilha[info["aba"]])
+
+            # Sensores analógicos não tem filtro por estação
+            coluna_estacao = None
+            if tipo in ["comunicacao", "sensores_digitais"]:
+                for col in df.columns:
+                    if str(col).upper().strip() in ['ESTAÇÃO', 'ESTACAO', 'ESTAÇAO']:
+                        coluna_estacao = col
+                        break
+                if coluna_estacao is None:
+                    print(f"❌ Coluna ESTAÇÃO não encontrada na aba {info['aba']}")
+
+            if coluna_estacao is None:
+                grupos[tipo] = {None: _converter_itens_campo(df, info["colunas"])}
+                continue
+
+            # Padronizar valores e agrupar por estação
+            codigos = df[coluna_estacao].astype(str).str.upper().str.strip()
+            df = df.drop(coluna_estacao, axis=1)
+            grupos[tipo] = {
+                codigo: _converter_itens_campo(df_estacao, info["colunas"])
+                for codigo, df_estacao in df.groupby(codigos, sort=False)
+            }
+            print(f"📍 {info['aba']}: {len(grupos[tipo])} estações indexadas")
+
+        except Exception as e:
+            print(f"❌ Erro na aba {info['aba']}: {e}")
+            import traceback
+            traceback.print_exc()
+            grupos[tipo] = {None: []}
 
+    return IndiceFormularioCampo(grupos)
+
+class IndiceEstacoes:
+    """
+    Mantém um IndiceFormularioCampo por planilha, reconstruído quando o arquivo muda.
+    Enquanto a nova versão é construída em segundo plano, as requisições continuam
+    sendo atendidas pelo índice anterior. Uma versão recusada (abas que ficaram sem
+    itens) não é reconstruída de novo até o arquivo mudar outra vez.
+    Com manter_versao_anterior (ligado quando o ObservadorPlanilhas está ativo), as
+    requisições não disparam reconstruções: quem troca o índice é recarregar_planilha.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.manter_versao_anterior = False
+        self._indices = {}
+        self._recusadas = {}
+        self._reconstruindo = set()
+        self._lock = threading.Lock()
+        self._lock_construcao = threading.Lock()
+
+    def obter(self, caminho_planilha):
+        versao = versao_planilha(caminho_planilha)
+
+        with self._lock:
+            atual = self._indices.get(versao[0])
+            if atual is not None and atual[0] == versao:
+                self.hits += 1
+                return atual[1]
+            self.misses += 1
+            if atual is not None:
+                recusada = self._recusadas.get(versao[0])
+                ja_recusada = recusada is not None and recusada[0] == versao
+                if not (self.manter_versao_anterior or ja_recusada or versao[0] in self._reconstruindo):
+                    self._reconstruindo.add(versao[0])
+                    threading.Thread(target=self._reconstruir_em_segundo_plano, args=(caminho_planilha,), daemon=True).start()
+                return atual[1]
+
+        # Primeira carga: não há índice anterior para servir
+        return self.reconstruir(caminho_planilha)
+
+    def _reconstruir_em_segundo_plano(self, caminho_planilha):
+        try:
+            self.reconstruir(caminho_planilha)
+        except Exception as e:
+            # O índice anterior continua em uso
+            print(f"❌ Falha ao reconstruir o índice de {caminho_planilha}: {e}")
+
+    def reconstruir(self, caminho_planilha):
+        try:
+            with self._lock_construcao:
+                versao = versao_planilha(caminho_planilha)
+                with self._lock:
+                    atual = self._indices.get(versao[0])
+                    recusada = self._recusadas.get(versao[0])
+                if atual is not None and atual[0] == versao:
+                    return atual[1]
+                if recusada is not None and recusada[0] == versao:
+                    raise ValueError(recusada[1])
+
+                indice = carregar_compartilhado(
+                    versao, ("indice_estacoes",), lambda: construir_indice_estacoes(caminho_planilha)
+                )
+                indice.versao = versao
+                # Planilha gravada pela metade ou sem as abas (grupos {None: []}): mantém o índice anterior
+                if atual is not None:
+                    esvaziados = [
+                        tipo for tipo, grupos in atual[1].grupos.items()
+                        if any(grupos.values()) and not any(indice.grupos.get(tipo, {}).values())
+                    ]
+                    if esvaziados:
+                        mensagem = f"{', '.join(esvaziados)} sem itens em {caminho_planilha}; mantendo a versão anterior"
+                        with self._lock:
+                            self._recusadas[versao[0]] = (versao, mensagem)
+                        raise ValueError(mensagem)
+                with self._lock:
+                    self._indices[versao[0]] = (versao, indice)
+                    self._recusadas.pop(versao[0], None)
+                return indice
+        finally:
+            with self._lock:
+                self._reconstruindo.discard(os.path.abspath(caminho_planilha))
+
+    def limpar(self):
+        with self._lock:
+            self._indices.clear()
+            self._recusadas.clear()
+
+    def atual(self, caminho_planilha):
+        """Índice em memória da planilha (mesmo de uma versão anterior), sem reconstruir; ou None"""
+        with self._lock:
+            atual = self._indices.get(os.path.abspath(caminho_planilha))
+        return atual[1] if atual is not None else None
+
+    def definir(self, caminho_planilha, indice):
+        """Registra um índice já construído para a versão atual da planilha"""
+        versao = versao_planilha(caminho_planilha)
+        indice.versao = versao
+        with self._lock:
+            self._indices[versao[0]] = (versao, indice)
+
+    def estatisticas(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "planilhas": len(self._indices)}
+
+indice_estacoes = IndiceEstacoes()
+
+# =====================================================
+# REGISTRO DE PLANILHAS POR ESTAÇÃO
+# =====================================================
+class RegistroEstacoes:
+    """
+    Estação → planilha do formulário isolado, descoberta no diretório de planilhas:
+    arquivo .xlsx/.xlsm cujo nome contém o código da estação (ex.: "ANEXO 1 - CPL.xlsm").
+    Estações sem arquivo próprio usam a planilha padrão quando listadas em padrao_para.
+
+    As planilhas são processadas sob demanda; no máximo max_residentes ficam com os
+    itens no cache_planilhas (LRU). As estações aquecidas nunca são descartadas.
+    """
+
+    EXTENSOES = (".xlsx", ".xlsm")
+
+    def __init__(self, diretorio, estacoes, planilha_padrao=None, padrao_para=("CPR",),
+                 aquecidas=(), max_residentes=4, ignorar=()):
+        self.diretorio = diretorio
+        self.estacoes = list(estacoes)
+        self.planilha_padrao = planilha_padrao
+        self.padrao_para = set(padrao_para)
+        self.aquecidas = list(aquecidas)
+        self.max_residentes = max_residentes
+        self.ignorar = {os.path.abspath(c) for c in ignorar}
+        self.descartes = 0
+        self._versao_diretorio = None
+        self._planilhas = {}
+        self._residentes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _descobrir(self):
+        """Relê o diretório só quando ele muda (arquivo criado, removido ou renomeado)"""
+        try:
+            versao = os.stat(self.diretorio).st_mtime_ns
+        except FileNotFoundError:
+            versao = None
+        if versao == self._versao_diretorio:
+            return
+
+        encontradas = {}
+        if versao is not None:
+            for nome in os.listdir(self.diretorio):
+                caminho = os.path.join(self.diretorio, nome)
+                if nome.startswith("~$") or not nome.lower().endswith(self.EXTENSOES):
+                    continue
+                if os.path.abspath(caminho) in self.ignorar:
+                    continue
+                partes = set(re.split(r"[^A-Z0-9]+", os.path.splitext(nome)[0].upper()))
+                for estacao in self.estacoes:
+                    if estacao in partes:
+                        # Mais de um arquivo para a mesma estação: vale o mais recente
+                        atual = encontradas.get(estacao)
+                        if atual is None or os.path.getmtime(caminho) > os.path.getmtime(atual):
+                            encontradas[estacao] = caminho
+
+        for estacao in self.padrao_para:
+            if estacao not in encontradas and self.planilha_padrao:
+                encontradas[estacao] = self.planilha_padrao
+        self._planilhas = encontradas
+        self._versao_diretorio = versao
+
+    def planilha(self, estacao):
+        """
+        Caminho da planilha da estação (None se ela não tiver formulário isolado).
+        Marca a planilha como residente e descarta do cache as menos usadas além do limite.
+        """
+        estacao = estacao.strip().upper()
+        descartar = []
+        with self._lock:
+            self._descobrir()
+            caminho = self._planilhas.get(estacao)
+            if caminho is None:
+                return None
+
+            self._residentes[caminho] = estacao
+            self._residentes.move_to_end(caminho)
+            # As aquecidas ficam sempre residentes e não contam no limite
+            fixas = {self._planilhas.get(e) for e in self.aquecidas}
+            excedentes = sum(1 for c in self._residentes if c not in fixas) - self.max_residentes
+            for antiga in list(self._residentes):
+                if excedentes <= 0:
+                    break
+                if antiga not in fixas and antiga != caminho:
+                    del self._residentes[antiga]
+                    descartar.append(antiga)
+                    excedentes -= 1
+            self.descartes += len(descartar)
+
+        for antiga in descartar:
+            cache_planilhas.descartar(antiga)
+        return caminho
+
+    def listar(self):
+        """Estações conhecidas, indicando quais têm formulário isolado"""
+        with self._lock:
+            self._descobrir()
+            return [{"id": e, "formulario_isolado": e in self._planilhas} for e in self.estacoes]
+
+    def aquecer(self):
+        """Pré-processa as abas das estações aquecidas"""
+        for estacao in self.aquecidas:
+            caminho = self.planilha(estacao)
+            if caminho and os.path.exists(caminho):
+                for aba_id in MAPEAMENTO_ABAS:
+                    carregar_itens(caminho, aba_id)
+
+    def estatisticas(self):
+        with self._lock:
+            return {"residentes": len(self._residentes), "planilhas": len(self._planilhas), "descartes": self.descartes}
+
+registro_estacoes = RegistroEstacoes(
+    DIRETORIO_PLANILHAS,
+    ESTACOES,
+    planilha_padrao=PLANILHA,
+    aquecidas=ESTACOES_AQUECIDAS,
+    max_residentes=PLANILHAS_RESIDENTES_MAX,
+    ignorar=[PLANILHA_CAMPO],
+)
+
+# =====================================================
+# RECARGA DAS PLANILHAS (OBSERVADOR DE ARQUIVOS)
+# =====================================================
+def recarregar_planilha(caminho_planilha):
+    """
+    Reprocessa uma planilha alterada em disco (chamado pelo ObservadorPlanilhas) e troca
+    os dados em memória de uma vez, só depois de lidos e validados: se uma aba que tinha
+    itens ficar vazia (ou o arquivo não puder ser lido), levanta a exceção e a versão
+    anterior continua.
+    Retorna True se uma nova versão foi aplicada.
+    """
+    if not os.path.exists(caminho_planilha):
+        cache_planilhas.descartar(caminho_planilha)
+        return False
+
+    if os.path.abspath(caminho_planilha) == os.path.abspath(PLANILHA_CAMPO):
+        anterior = indice_estacoes.atual(caminho_planilha)
+        if anterior is None:
+            return False  # não está em memória: será lida sob demanda
+        return indice_estacoes.reconstruir(caminho_planilha) is not anterior
+
+    anteriores = cache_planilhas.valores(caminho_planilha)
+    if not anteriores:
+        return False  # não está em memória: será lida sob demanda
+
+    versao = versao_planilha(caminho_planilha)
+    valores = {
+        ("itens", aba_id): carregar_compartilhado(versao, ("itens", aba_id), lambda: _carregar_itens(caminho_planilha, aba_id))
+        for aba_id in MAPEAMENTO_ABAS
+    }
+    esvaziadas = [
+        chave[1] for chave, resultado in valores.items()
+        if not resultado["items"] and anteriores.get(chave, {}).get("items")
+    ]
+    if esvaziadas:
+        raise ValueError(f"Abas {', '.join(esvaziadas)} sem itens em {caminho_planilha}; mantendo a versão anterior")
+    if versao_planilha(caminho_planilha) != versao:
+        return False  # mudou de novo durante a leitura: o observador dispara outra recarga
+
+    cache_planilhas.substituir(caminho_planilha, versao, valores)
+    print(f"🔄 Planilha recarregada: {caminho_planilha}")
+    return True
+
+# =====================================================
+# PAGINAÇÃO
+# =====================================================
+def paginar_itens(itens, inicio=0, limite=200, colunas=None, filtro=None):
+    """
+    Fatia os itens (TabelaItens ou lista de dicionários, já em cache) para as respostas
+    paginadas; os itens da página saem como dicionários.
+    filtro: texto buscado (sem diferenciar maiúsculas) em qualquer valor do item.
+    colunas: restringe os campos devolvidos em cada item.
+    proximo é o início da página seguinte, ou None na última página.
+    """
+    if filtro:
+        termo = filtro.strip().lower()
+        if isinstance(itens, TabelaItens):
+            itens = itens.filtrar(termo)
+        else:
+            itens = [item for item in itens if any(termo in str(v).lower() for v in item.values())]
+
+    inicio = max(int(inicio), 0)
+    fim = inicio + max(int(limite), 1)
+    pagina = itens[inicio:fim]
+    if isinstance(pagina, TabelaItens):
+        pagina = pagina.registros(colunas)
+    elif colunas:
+        pagina = [{c: item.get(c, "") for c in colunas} for item in pagina]
+
+    return {
+        "total": len(itens),
+        "inicio": inicio,
+        "proximo": fim if fim < len(itens) else None,
+        "itens": pagina,
+    }
+
+# =====================================================
+# EXPORTAÇÃO (STREAMING)
+# =====================================================
+def _linhas_com_colunas(linhas, colunas):
+    """Descobre as colunas pela primeira linha quando não informadas"""
+    linhas = iter(linhas)
+    primeira = next(linhas, None)
+    if colunas is None:
+        colunas = list(primeira) if primeira else []
+
+    def todas():
+        if primeira is not None:
+            yield primeira
+            yield from linhas
+
+    return colunas, todas()
+
+def escrever_excel(destino, linhas, colunas=None):
+    """
+    Grava linhas (iterável de dicionários) em xlsx usando o modo write-only do
+    openpyxl: as linhas não ficam em memória, então o consumo é constante.
+    """
+    from openpyxl import Workbook
+
+    colunas, linhas = _linhas_com_colunas(linhas, colunas)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Resultados")
+    ws.append(colunas)
+    for linha in linhas:
+        ws.append([linha.get(col) for col in colunas])
+    wb.save(destino)
+
+def gerar_excel(linhas, colunas=None, tamanho_bloco=64 * 1024):
+    """Gera o xlsx em blocos de bytes (para StreamingResponse)"""
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as arquivo:
+        escrever_excel(arquivo, linhas, colunas)
+        arquivo.seek(0)
+        while bloco := arquivo.read(tamanho_bloco):
+            yield bloco
+
+def gerar_csv(linhas, colunas=None, linhas_por_bloco=1000):
+    """Gera o CSV em blocos de texto, sem materializar o resultado"""
+    colunas, linhas = _linhas_com_colunas(linhas, colunas)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=colunas, extrasaction="ignore")
+    writer.writeheader()
+    for i, linha in enumerate(linhas, start=1):
+        writer.writerow(linha)
+        if i % linhas_por_bloco == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+@medir("salvar_resultados")
 def salvar_resultados(caminho_saida, dados):
-    df = pd.DataFrame(dados)
-    df.to_excel(caminho_saida, index=False)
\ No newline at end of file
+    escrever_excel(caminho_saida, dados)
+
+# =====================================================
+# AQUECIMENTO E ARTEFATO COMPILADO
+# =====================================================
+def hash_planilha(caminho_planilha):
+    h = hashlib.sha256()
+    with open(caminho_planilha, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def aquecer_planilhas(caminho_planilha=PLANILHA, caminho_planilha_campo=PLANILHA_CAMPO):
+    """Pré-processa as abas do MAPEAMENTO_ABAS e o índice de estações do formulário campo"""
+    itens = {}
+    if os.path.exists(caminho_planilha):
+        for aba_id in MAPEAMENTO_ABAS:
+            itens[aba_id] = carregar_itens(caminho_planilha, aba_id)
+
+    indice = None
+    if os.path.exists(caminho_planilha_campo):
+        indice = indice_estacoes.obter(caminho_planilha_campo)
+
+    return itens, indice
+
+def compilar_artefato(caminho_planilha=PLANILHA, caminho_planilha_campo=PLANILHA_CAMPO, destino=ARTEFATO_PLANILHAS):
+    """Processa as planilhas e grava o resultado serializado (pickle) em destino"""
+    itens, indice = aquecer_planilhas(caminho_planilha, caminho_planilha_campo)
+    artefato = {
+        "planilha": {
+            "hash": hash_planilha(caminho_planilha) if itens else None,
+            "itens": itens
+        },
+        "planilha_campo": {
+            "hash": hash_planilha(caminho_planilha_campo) if indice else None,
+            "indice": indice
+        }
+    }
+
+    temporario = f"{destino}.tmp"
+    with open(temporario, "wb") as f:
+        pickle.dump(artefato, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, destino)
+    return artefato
+
+def carregar_artefato(destino=ARTEFATO_PLANILHAS, caminho_planilha=PLANILHA, caminho_planilha_campo=PLANILHA_CAMPO):
+    """
+    Popula os caches a partir do artefato compilado.
+    Partes cujo hash não confere com a planilha atual são ignoradas
+    (a aplicação volta a ler a planilha). Retorna True se algo foi aproveitado.
+    """
+    if not os.path.exists(destino):
+        return False
+
+    try:
+        with open(destino, "rb") as f:
+            artefato = pickle.load(f)
+    except Exception as e:
+        print(f"❌ Artefato inválido ({destino}): {e}")
+        return False
+
+    aproveitado = False
+
+    parte = artefato.get("planilha", {})
+    if parte.get("hash") and os.path.exists(caminho_planilha) and parte["hash"] == hash_planilha(caminho_planilha):
+        for aba_id, resultado in parte["itens"].items():
+            cache_planilhas.definir(caminho_planilha, ("itens", aba_id), resultado)
+        aproveitado = True
+    else:
+        print(f"🟡 Artefato desatualizado para {caminho_planilha}")
+
+    parte = artefato.get("planilha_campo", {})
+    if parte.get("hash") and os.path.exists(caminho_planilha_campo) and parte["hash"] == hash_planilha(caminho_planilha_campo):
+        indice_estacoes.definir(caminho_planilha_campo, parte["indice"])
+        aproveitado = True
+    else:
+        print(f"🟡 Artefato desatualizado para {caminho_planilha_campo}")
+
+    return aproveitado
+
+# =====================================================
+# EXECUÇÃO FORA DO EVENT LOOP
+# =====================================================
+# Leitura e escrita de planilhas são síncronas e pesadas; rodam num pool limitado
+# de threads para não travar as demais requisições (login, navegação).
+executor_planilhas = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PLANILHAS_WORKERS", "4")),
+    thread_name_prefix="planilhas"
+)
+_em_andamento = {}
+
+async def executar_em_pool(funcao, *args, chave=None):
+    """
+    Executa funcao(*args) no executor_planilhas.
+    Chamadas simultâneas com a mesma chave compartilham a mesma execução.
+    O contexto (rota atual, para as métricas) é copiado para a thread.
+    """
+    loop = asyncio.get_running_loop()
+    if chave is None:
+        return await loop.run_in_executor(executor_planilhas, copy_context().run, funcao, *args)
+
+    futuro = _em_andamento.get(chave)
+    if futuro is None:
+        futuro = loop.run_in_executor(executor_planilhas, copy_context().run, funcao, *args)
+        _em_andamento[chave] = futuro
+        futuro.add_done_callback(lambda _: _em_andamento.pop(chave, None))
+    # shield: uma requisição cancelada não cancela a carga das outras
+    return await asyncio.shield(futuro)
+
+async def carregar_itens_async(caminho_planilha, aba_id=None):
+    return (await carregar_itens_versionado_async(caminho_planilha, aba_id))[1]
+
+async def carregar_itens_versionado_async(caminho_planilha, aba_id=None):
+    chave = ("itens", caminho_planilha, str(aba_id) if aba_id else None)
+    return await executar_em_pool(carregar_itens_versionado, caminho_planilha, aba_id, chave=chave)
+
+async def obter_indice_formulario_campo_async(caminho_planilha):
+    chave = ("indice", caminho_planilha)
+    return await executar_em_pool(obter_indice_formulario_campo, caminho_planilha, chave=chave)
@@ -0,0 +1,26 @@
+"""
+Micro-benchmarks (pytest-benchmark) sobre planilhas sintéticas maiores que as dos
+testes; o tamanho vem de BENCHMARK_ITENS (linhas por aba) e BENCHMARK_ESTACOES.
+"""
+import os
+
+import pytest
+
+from app.planilhas_sinteticas import gerar_planilha, gerar_planilha_campo
+
+ITENS = int(os.getenv("BENCHMARK_ITENS", "500"))
+ESTACOES = int(os.getenv("BENCHMARK_ESTACOES", "40"))
+
+
+@pytest.fixture(scope="session")
+def planilha(tmp_path_factory):
+    caminho = str(tmp_path_factory.mktemp("benchmark") / "planilha.xlsx")
+    gerar_planilha(caminho, ITENS)
+    return caminho
+
+
+@pytest.fixture(scope="session")
+def planilha_campo(tmp_path_factory):
+    caminho = str(tmp_path_factory.mktemp("benchmark") / "planilha_campo.xlsx")
+    gerar_planilha_campo(caminho, ITENS, ESTACOES)
+    return caminho
@@ -0,0 +1,40 @@
+import asyncio
+from datetime import datetime
+from urllib.parse import urlencode
+
+import pytest
+from starlette.requests import Request
+
+from app.benchmark import campos_envio
+
+
+def _requisicao(corpo):
+    async def receber():
+        return {"type": "http.request", "body": corpo, "more_body": False}
+    return Request({"type": "http", "method": "POST",
+                    "headers": [(b"content-type", b"application/x-www-form-urlencoded")]}, receber)
+
+
+@pytest.mark.parametrize("itens", [1000, 5000])
+def test_request_form_starlette(benchmark, itens):
+    campos = campos_envio(itens)
+    corpo = urlencode(campos).encode()
+
+    async def formulario():
+        return await _requisicao(corpo).form(max_fields=len(campos) + 1)
+
+    assert len(benchmark(lambda: asyncio.run(formulario()))) == len(campos)
+
+
+@pytest.mark.parametrize("itens", [1000, 5000])
+def test_ler_campos_formulario(benchmark, main, itens):
+    campos = campos_envio(itens)
+    corpo = urlencode(campos).encode()
+    assert benchmark(lambda: asyncio.run(main.ler_campos_formulario(_requisicao(corpo)))) == campos
+
+
+@pytest.mark.parametrize("itens", [1000, 5000])
+def test_extrair_linhas_formulario(benchmark, main, itens):
+    campos = campos_envio(itens)
+    linhas = benchmark(main.extrair_linhas_formulario, campos, "CPR", "benchmark", datetime.now())
+    assert len(linhas) == itens
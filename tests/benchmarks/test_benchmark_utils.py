@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import pytest
+
+from app import utils
+from app.benchmark import itens_por_coluna, itens_por_linha, tabela_mista
+
+
+@pytest.fixture
+def itens(planilha):
+    return utils.carregar_itens(planilha)["items"]
+
+
+def test_ler_planilha(benchmark, planilha):
+    abas = benchmark(utils.ler_planilha, planilha, utils.abas_mapeadas)
+    assert len(abas) == len(utils.MAPEAMENTO_ABAS)
+
+
+def test_ler_planilha_campo(benchmark, planilha_campo):
+    abas = benchmark(utils.ler_planilha, planilha_campo, utils.abas_formulario_campo)
+    assert abas
+
+
+def test_hash_planilha(benchmark, planilha):
+    benchmark(utils.hash_planilha, planilha)
+
+
+def test_carregar_abas(benchmark, planilha):
+    abas = benchmark(utils.carregar_abas, planilha)
+    assert [aba["id"] for aba in abas] == sorted(utils.MAPEAMENTO_ABAS, key=int)
+
+
+@pytest.mark.parametrize("aba_id", sorted(utils.MAPEAMENTO_ABAS, key=int))
+def test_carregar_itens_frio(benchmark, planilha, aba_id):
+    resultado = benchmark.pedantic(utils.carregar_itens, args=(planilha, aba_id),
+                                   setup=utils.cache_planilhas.limpar, rounds=5)
+    assert resultado["items"]
+
+
+def test_carregar_itens_em_cache(benchmark, planilha):
+    utils.carregar_itens(planilha, "3")
+    benchmark(utils.carregar_itens, planilha, "3")
+
+
+def test_encontrar_cabecalho(benchmark, planilha):
+    df = next(iter(utils.ler_planilha(planilha, lambda nomes: nomes[:1]).values()))
+    benchmark(utils.encontrar_cabecalho, df, "1")
+
+
+def test_construir_indice_estacoes(benchmark, planilha_campo):
+    indice = benchmark(utils.construir_indice_estacoes, planilha_campo)
+    assert indice.grupos
+
+
+def test_consultar_indice(benchmark, planilha_campo):
+    indice = utils.construir_indice_estacoes(planilha_campo)
+    assert benchmark(indice.consultar, "cpr")
+
+
+def test_carregar_formulario_campo_em_cache(benchmark, planilha_campo):
+    utils.indice_estacoes.definir(planilha_campo, utils.construir_indice_estacoes(planilha_campo))
+    assert benchmark(utils.carregar_formulario_campo, planilha_campo, "CPR")
+
+
+def test_paginar_itens(benchmark, itens):
+    assert benchmark(utils.paginar_itens, itens, 100, 200)["itens"]
+
+
+def test_paginar_itens_com_filtro(benchmark, itens):
+    benchmark(utils.paginar_itens, itens, 0, 200, filtro="eq-3")
+
+
+def _linhas_exportacao(itens):
+    return [{"Data": datetime(2024, 1, 1), "Usuario": "u", "Estacao": "CPR", "Aba": item["aba"],
+             "Equipamento": item["coluna_1"], "Status": "OK", "Justificativa": ""} for item in itens]
+
+
+@pytest.mark.parametrize("gerar", [utils.gerar_csv, utils.gerar_excel], ids=["csv", "excel"])
+def test_exportacao(benchmark, itens, gerar):
+    linhas = _linhas_exportacao(itens)
+    assert benchmark(lambda: sum(len(bloco) for bloco in gerar(linhas)))
+
+
+def test_compilar_artefato(benchmark, planilha, planilha_campo, tmp_path):
+    artefato = str(tmp_path / "artefato.pkl")
+    benchmark.pedantic(utils.compilar_artefato, args=(planilha, planilha_campo, artefato), rounds=1)
+
+
+def test_carregar_artefato(benchmark, planilha, planilha_campo, tmp_path):
+    artefato = str(tmp_path / "artefato.pkl")
+    utils.compilar_artefato(planilha, planilha_campo, artefato)
+    assert benchmark(utils.carregar_artefato, artefato, planilha, planilha_campo)
+
+
+@pytest.mark.parametrize("converter", [itens_por_linha, itens_por_coluna], ids=["iterrows_anterior", "textos_da_tabela"])
+def test_conversao_10k_linhas(benchmark, converter):
+    df = tabela_mista(10_000)
+    assert benchmark.pedantic(converter, args=(df,), rounds=3)
@@ -0,0 +1,70 @@
+"""
+Ambiente dos testes: planilhas sintéticas (app.planilhas_sinteticas) e banco SQLite
+descartáveis, configurados por variáveis de ambiente antes de importar a aplicação.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA = tempfile.mkdtemp(prefix="testes_")
+
+os.environ.update({
+    "PLANILHA": os.path.join(PASTA, "planilha.xlsx"),
+    "PLANILHA_CAMPO": os.path.join(PASTA, "planilha_campo.xlsx"),
+    "ARTEFATO_PLANILHAS": os.path.join(PASTA, "artefato.pkl"),
+    "DATABASE_URL": f"sqlite:///{os.path.join(PASTA, 'testes.db')}",
+    "CACHE_COMPARTILHADO": "",
+    "OBSERVAR_PLANILHAS": "false",
+    "AQUECER_PLANILHAS": "false",
+    "BCRYPT_ROUNDS": "4",
+})
+# Templates e arquivos estáticos são resolvidos a partir da raiz do projeto
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+
+from app.planilhas_sinteticas import gerar_planilha, gerar_planilha_campo  # noqa: E402
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    # Os micro-benchmarks (tests/benchmarks) precisam do pytest-benchmark (requirements-dev.txt)
+    collect_ignore = ["benchmarks"]
+
+gerar_planilha(os.environ["PLANILHA"], 50)
+gerar_planilha_campo(os.environ["PLANILHA_CAMPO"], 50, 5)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Sem --benchmark-enable (ou --benchmark-only), cada benchmark roda uma vez, como teste
+    opcoes = config.option
+    if hasattr(opcoes, "benchmark_disable") and not (opcoes.benchmark_enable or opcoes.benchmark_only):
+        opcoes.benchmark_disable = True
+
+
+@pytest.fixture(scope="session")
+def main():
+    from app import main
+    main.preparar_banco()
+    return main
+
+
+@pytest.fixture
+def cliente(main):
+    from fastapi.testclient import TestClient
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def cliente_logado(main, cliente):
+    """Cliente com o cookie de um usuário cadastrado"""
+    nome = f"teste_{os.urandom(4).hex()}"
+    with main.SessionLocal() as db:
+        db.add(main.User(username=nome, hashed_password=main.get_password_hash("senha")))
+        db.commit()
+    cliente.cookies.set(main.COOKIE_NAME, main.create_access_token({"sub": nome}))
+    return cliente
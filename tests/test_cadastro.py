@@ -0,0 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_cadastros_simultaneos_do_mesmo_usuario(main, cliente):
+    dados = {"username": "duplicado", "password": "senha", "email": "duplicado@teste"}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        respostas = list(executor.map(lambda _: cliente.post("/register", data=dados, follow_redirects=False), range(4)))
+
+    status = sorted(r.status_code for r in respostas)
+    assert status == [200, 200, 200, 303]
+    assert all("já cadastrado" in r.text for r in respostas if r.status_code == 200)
+
+    db = main.SessionLocal()
+    try:
+        assert db.query(main.User).filter(main.User.username == "duplicado").count() == 1
+    finally:
+        db.close()
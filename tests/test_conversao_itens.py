@@ -0,0 +1,15 @@
+import pytest
+
+from app.benchmark import itens_por_coluna, itens_por_linha, tabela_mista
+
+
+@pytest.mark.parametrize("colunas", [
+    ["texto", "inteiro", "decimal", "data", "misto"],
+    ["inteiro", "decimal"],  # só numéricas: o iterrows promovia os inteiros a float
+    ["texto"],
+])
+def test_textos_da_tabela_igual_ao_iterrows(colunas):
+    df = tabela_mista(600)[colunas]
+    anteriores, novos = itens_por_linha(df), itens_por_coluna(df)
+    assert novos == anteriores
+    assert [list(item.items()) for item in novos] == [list(item.items()) for item in anteriores]
@@ -0,0 +1,86 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.benchmark import campos_envio
+
+
+def test_extrai_todos_os_itens_com_valor_medido_so_na_aba_de_desempenho(main):
+    linhas = main.extrair_linhas_formulario(campos_envio(600), "CPR", "u", datetime.now())
+    assert len(linhas) == 600
+    medidos = {l["aba"] for l in linhas if l["valor_medido"]}
+    assert medidos == {"DESEMPENHO DO SISTEMA"}
+
+
+@pytest.mark.parametrize("campos, mensagem", [
+    ({"status_1": "TALVEZ", "aba_1": "ATERRAMENTO"}, "Status inválido"),
+    ({"status_1": "OK", "aba_1": "ABA QUALQUER"}, "Aba não reconhecida"),
+    ({"status_1": "OK", "aba_1": 4}, "Aba não reconhecida"),
+    ({"status_1": "OK", "aba_1": "ATERRAMENTO", "alimentacao_aferida_1": "127 V"}, "não pertencem à aba"),
+])
+def test_item_invalido(main, campos, mensagem):
+    with pytest.raises(ValueError, match=mensagem):
+        main.extrair_linhas_formulario(campos, "CPR", "u", datetime.now())
+
+
+def test_aba_numerica_na_sincronizacao_e_invalida(cliente_logado):
+    envio = {"id": str(uuid.uuid4()), "tipo": "isolado", "estacao": "CPR", "campos": {"status_1": "OK", "aba_1": 5}}
+    resposta = cliente_logado.post("/api/sincronizar", json={"envios": [envio]})
+    assert resposta.status_code == 200
+    assert resposta.json()["resultados"][0]["status"] == "invalido"
+
+
+def test_enviar_recusa_campo_de_outra_aba(cliente_logado):
+    campos = {"estacao": "CPR", "status_1": "OK", "aba_1": "ATERRAMENTO", "alimentacao_aferida_1": "127 V"}
+    assert cliente_logado.post("/enviar", data=campos, follow_redirects=False).status_code == 400
+    campos = {"estacao": "CPR", "status_1": "OK", "aba_1": "DESEMPENHO DO SISTEMA", "alimentacao_aferida_1": "127 V"}
+    assert cliente_logado.post("/enviar", data=campos, follow_redirects=False).status_code == 303
+
+
+def test_formulario_isolado_mesmo_etag_e_fragmento_sem_diferenciar_caixa(main, cliente_logado):
+    maiuscula = cliente_logado.get("/formulario_isolado/CPR/1")
+    assert maiuscula.status_code == 200
+    entradas = main.cache_planilhas.estatisticas()
+
+    minuscula = cliente_logado.get("/formulario_isolado/cpr/1")
+    assert minuscula.status_code == 200
+    assert minuscula.headers["ETag"] == maiuscula.headers["ETag"]
+    assert minuscula.text == maiuscula.text
+    assert main.cache_planilhas.estatisticas()["entradas"] == entradas["entradas"]
+
+    revalidacao = cliente_logado.get("/formulario_isolado/cpr/1", headers={"If-None-Match": maiuscula.headers["ETag"]})
+    assert revalidacao.status_code == 304
+
+
+@pytest.mark.parametrize("aba", ["99", "x", "1%20"])
+def test_aba_inexistente_e_404_sem_entrar_no_cache(main, cliente_logado, aba):
+    entradas = main.cache_planilhas.estatisticas()["entradas"]
+
+    pagina = cliente_logado.get(f"/formulario_isolado/CPR/{aba}")
+    assert pagina.status_code == 404
+    assert "ETag" not in pagina.headers
+    api = cliente_logado.get(f"/api/formulario_isolado/CPR/{aba}/itens")
+    assert api.status_code == 404
+    assert api.json()["message"] == f"Aba inválida: {aba.replace('%20', ' ')}"
+    assert main.cache_planilhas.estatisticas()["entradas"] == entradas
+
+
+def test_etag_do_formulario_muda_com_a_versao_da_interface(main, cliente_logado, monkeypatch):
+    antes = cliente_logado.get("/formulario_isolado/CPR/1")
+    assert antes.status_code == 200
+
+    monkeypatch.setattr(main, "VERSAO_INTERFACE", "outro-deploy")
+    depois = cliente_logado.get("/formulario_isolado/CPR/1", headers={"If-None-Match": antes.headers["ETag"]})
+    assert depois.status_code == 200
+    assert depois.headers["ETag"] != antes.headers["ETag"]
+
+
+def test_versao_da_interface_acompanha_os_templates(main, tmp_path):
+    template = tmp_path / "formulario.html"
+    template.write_text("<p>antes</p>")
+    antes = main.versao_interface(tmp_path)
+    assert main.versao_interface(tmp_path) == antes
+
+    template.write_text("<p>depois, maior</p>")
+    assert main.versao_interface(tmp_path) != antes
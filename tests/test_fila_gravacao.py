@@ -0,0 +1,68 @@
+import threading
+from datetime import datetime
+
+from app.fila_gravacao import FilaGravacao
+
+
+def _linhas(estacao, produtor, quantidade):
+    return [{"data": datetime.now(), "usuario": f"produtor{produtor}", "estacao": estacao, "tipo": "comunicacao",
+             "item": item, "status": "OK"} for item in range(quantidade)]
+
+
+def _contar(main, estacao):
+    db = main.SessionLocal()
+    try:
+        return db.query(main.ResultadoCampo).filter(main.ResultadoCampo.estacao == estacao).count()
+    finally:
+        db.close()
+
+
+def test_parar_grava_tudo_que_foi_enfileirado(main):
+    fila = FilaGravacao(main.gravar_resultados_campo, tamanho_lote=50, intervalo=0.05)
+    produtores, envios, itens = 8, 25, 4
+
+    def produzir(produtor):
+        for _ in range(envios):
+            fila.enfileirar(_linhas("FILA", produtor, itens))
+
+    threads = [threading.Thread(target=produzir, args=(n,)) for n in range(produtores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    fila.parar()
+
+    assert _contar(main, "FILA") == produtores * envios * itens
+    assert fila.gravadas == produtores * envios * itens
+    assert fila.pendentes() == 0
+
+
+def test_parar_tenta_de_novo_se_a_gravacao_final_falhar(main):
+    falhas = []
+
+    def gravar(lote):
+        if len(falhas) < 2:
+            falhas.append(len(lote))
+            raise RuntimeError("banco indisponível")
+        main.gravar_resultados_campo(lote)
+
+    fila = FilaGravacao(gravar, tamanho_lote=1000, intervalo=0.01)
+    fila.enfileirar(_linhas("FILA-RETRY", 0, 10))
+    fila.parar()
+
+    assert _contar(main, "FILA-RETRY") == 10
+    assert fila.descartadas == 0
+
+
+def test_parar_registra_linhas_nao_gravadas(main, capsys):
+    def gravar(lote):
+        raise RuntimeError("banco indisponível")
+
+    fila = FilaGravacao(gravar, tamanho_lote=1000, intervalo=0.01, tentativas_parada=2)
+    fila.enfileirar(_linhas("FILA-PERDIDA", 0, 3))
+    fila.parar()
+
+    assert fila.descartadas == 3
+    saida = capsys.readouterr().out
+    assert "3 linhas não gravadas" in saida
+    assert saida.count("FILA-PERDIDA") == 3
@@ -0,0 +1,35 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+def test_query_com_erro_nao_deixa_inicio_pendente(main):
+    with main.engine.connect() as conexao:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conexao.execute(text("SELECT * FROM tabela_que_nao_existe"))
+            conexao.rollback()
+        assert conexao.info.get("inicio_query") == []
+        conexao.execute(text("SELECT 1"))
+        assert conexao.info["inicio_query"] == []
+
+
+def test_contadores_de_queries_com_varias_threads(main):
+    threads, queries = 8, 200
+    antes = main.estatisticas_banco["queries"]
+
+    def consultar():
+        with main.engine.connect() as conexao:
+            for _ in range(queries):
+                conexao.execute(text("SELECT 1"))
+
+    trabalhadores = [threading.Thread(target=consultar) for _ in range(threads)]
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+
+    # Pode haver queries de outras threads da aplicação, mas nenhum incremento se perde
+    assert main.estatisticas_banco["queries"] - antes >= threads * queries
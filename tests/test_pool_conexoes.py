@@ -0,0 +1,40 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+
+def test_requisicoes_autenticadas_devolvem_as_conexoes(main, cliente_logado):
+    pool = main.engine.pool
+    em_uso = {"atual": 0, "pico": 0}
+    lock = threading.Lock()
+
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        with lock:
+            em_uso["atual"] += 1
+            em_uso["pico"] = max(em_uso["pico"], em_uso["atual"])
+
+    def _checkin(dbapi_connection, connection_record):
+        with lock:
+            em_uso["atual"] -= 1
+
+    requisicoes, concorrentes = 200, 8
+    main.cache_usuarios.limpar()
+    checkouts_antes = main.estatisticas_banco["checkouts"]
+    event.listen(pool, "checkout", _checkout)
+    event.listen(pool, "checkin", _checkin)
+    try:
+        with ThreadPoolExecutor(max_workers=concorrentes) as executor:
+            status = list(executor.map(
+                lambda _: cliente_logado.get("/selecao_estacao", follow_redirects=False).status_code,
+                range(requisicoes),
+            ))
+    finally:
+        event.remove(pool, "checkout", _checkout)
+        event.remove(pool, "checkin", _checkin)
+
+    assert status == [200] * requisicoes
+    assert pool.checkedout() == 0
+    # Nenhuma requisição segura mais de uma conexão, e o cache de usuários evita a maioria dos checkouts
+    assert em_uso["pico"] <= concorrentes
+    assert main.estatisticas_banco["checkouts"] - checkouts_antes <= concorrentes
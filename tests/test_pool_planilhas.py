@@ -0,0 +1,39 @@
+import threading
+import time
+
+from app import utils
+
+
+def test_login_nao_espera_carga_de_planilha(main, cliente, monkeypatch):
+    with main.SessionLocal() as db:
+        db.add(main.User(username="durante_carga", hashed_password=main.get_password_hash("senha")))
+        db.commit()
+    cookie = main.create_access_token({"sub": "durante_carga"})
+
+    iniciou, liberar = threading.Event(), threading.Event()
+    carregar = utils._carregar_itens
+
+    def carga_lenta(caminho_planilha, aba_id=None):
+        iniciou.set()
+        liberar.wait(10)
+        return carregar(caminho_planilha, aba_id)
+
+    monkeypatch.setattr(utils, "_carregar_itens", carga_lenta)
+    utils.cache_planilhas.limpar()
+
+    formulario = {}
+    abrir = threading.Thread(target=lambda: formulario.update(
+        resposta=cliente.get("/formulario_isolado/CPR/3", cookies={main.COOKIE_NAME: cookie})))
+    abrir.start()
+    try:
+        assert iniciou.wait(5)
+        inicio = time.perf_counter()
+        login = cliente.post("/login", data={"username": "durante_carga", "password": "senha"}, follow_redirects=False)
+        duracao = time.perf_counter() - inicio
+    finally:
+        liberar.set()
+        abrir.join()
+
+    assert login.status_code == 303
+    assert duracao < 1.0
+    assert formulario["resposta"].status_code == 200
@@ -0,0 +1,210 @@
+import os
+import threading
+import time
+
+from openpyxl import Workbook
+
+from app import utils
+from app.observador_planilhas import ObservadorPlanilhas
+from app.planilhas_sinteticas import gerar_planilha, gerar_planilha_campo
+
+
+def _avancar_mtime(caminho, segundos=5):
+    """Garante uma versão nova mesmo com a resolução de mtime do sistema de arquivos"""
+    st = os.stat(caminho)
+    os.utime(caminho, ns=(st.st_atime_ns, st.st_mtime_ns + segundos * 10**9))
+
+
+def test_indice_mantem_versao_anterior_se_abas_sumirem(tmp_path):
+    caminho = str(tmp_path / "campo.xlsx")
+    gerar_planilha_campo(caminho, 20, 3)
+    indice = utils.IndiceEstacoes()
+    anterior = indice.obter(caminho)
+    assert any(any(grupos.values()) for grupos in anterior.grupos.values())
+
+    # Arquivo salvo sem as abas do formulário campo
+    wb = Workbook()
+    wb.active.title = "Outra"
+    wb.save(caminho)
+    _avancar_mtime(caminho)
+
+    try:
+        indice.reconstruir(caminho)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("índice vazio deveria ser recusado")
+    assert indice.obter(caminho) is anterior
+
+
+def test_leituras_concorrentes_durante_recarga(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils.cache_planilhas, "manter_versao_anterior", True)
+    caminho = str(tmp_path / "planilha.xlsx")
+    gerar_planilha(caminho, 30)
+    for aba_id in utils.MAPEAMENTO_ABAS:
+        utils.carregar_itens(caminho, aba_id)
+    antigo = len(utils.carregar_itens(caminho, "1")["items"])
+
+    nova = str(tmp_path / "nova.xlsx")
+    gerar_planilha(nova, 60, semente=2)
+    novo = len(utils._carregar_itens(nova, "1")["items"])
+    assert novo != antigo
+
+    lidos, erros = [], []
+    parar = threading.Event()
+
+    def leitor():
+        while not parar.is_set():
+            try:
+                lidos.append(len(utils.carregar_itens(caminho, "1")["items"]))
+            except Exception as e:  # noqa: BLE001
+                erros.append(e)
+
+    leitores = [threading.Thread(target=leitor) for _ in range(4)]
+    for t in leitores:
+        t.start()
+    try:
+        os.replace(nova, caminho)
+        _avancar_mtime(caminho)
+        assert utils.recarregar_planilha(caminho) is True
+        depois = len(lidos)
+        while len(lidos) < depois + 20:
+            time.sleep(0.01)
+    finally:
+        parar.set()
+        for t in leitores:
+            t.join()
+
+    assert not erros
+    # Cada leitura vê a versão antiga ou a nova inteira, nunca uma intermediária
+    assert set(lidos) <= {antigo, novo}
+    assert antigo in lidos and lidos[-1] == novo
+
+
+def test_observador_conta_so_recargas_aplicadas(tmp_path):
+    aplicadas = {"a.xlsx": True, "b.xlsx": False, "c.xlsx": None}
+    chamadas = []
+
+    def ao_mudar(caminho):
+        chamadas.append(os.path.basename(caminho))
+        resultado = aplicadas[os.path.basename(caminho)]
+        if resultado is None:
+            raise ValueError("aba sem itens")
+        return resultado
+
+    observador = ObservadorPlanilhas([tmp_path], ao_mudar, estabilidade=0)
+    observador._estado = observador._listar()
+    for nome in aplicadas:
+        (tmp_path / nome).write_bytes(b"planilha")
+
+    recarregadas = observador.verificar()
+
+    assert sorted(chamadas) == sorted(aplicadas)
+    assert [os.path.basename(c) for c in recarregadas] == ["a.xlsx"]
+    assert observador.recargas == 1
+    assert observador.falhas == 1
+
+
+def test_etag_do_formulario_acompanha_a_versao_servida(tmp_path, monkeypatch, main, cliente_logado):
+    caminho = str(tmp_path / "isolado.xlsx")
+    gerar_planilha(caminho, 20)
+    monkeypatch.setattr(main.registro_estacoes, "planilha", lambda estacao: caminho)
+    monkeypatch.setattr(main.cache_planilhas, "manter_versao_anterior", True)
+
+    v1 = cliente_logado.get("/formulario_isolado/CPR/1")
+    assert v1.status_code == 200
+
+    # Planilha alterada em disco; uma aba ainda fora do cache é lida já da versão nova
+    gerar_planilha(caminho, 30)
+    _avancar_mtime(caminho)
+    assert cliente_logado.get("/formulario_isolado/CPR/2").status_code == 200
+
+    # A aba 1 continua servindo a versão anterior, com o ETag dela
+    ainda_v1 = cliente_logado.get("/formulario_isolado/CPR/1")
+    assert ainda_v1.headers["ETag"] == v1.headers["ETag"]
+    assert ainda_v1.text == v1.text
+
+    assert utils.recarregar_planilha(caminho)
+    v2 = cliente_logado.get("/formulario_isolado/CPR/1", headers={"If-None-Match": v1.headers["ETag"]})
+    assert v2.status_code == 200
+    assert v2.headers["ETag"] != v1.headers["ETag"]
+    assert v2.text != v1.text
+
+
+def _contar_construcoes(monkeypatch):
+    construcoes = []
+    construir = utils.construir_indice_estacoes
+
+    def contando(caminho):
+        construcoes.append(caminho)
+        return construir(caminho)
+
+    monkeypatch.setattr(utils, "construir_indice_estacoes", contando)
+    return construcoes
+
+
+def _gravar_sem_abas(caminho):
+    wb = Workbook()
+    wb.active.title = "Outra"
+    wb.save(caminho)
+    _avancar_mtime(caminho)
+
+
+def _aguardar_reconstrucoes(indice):
+    limite = time.monotonic() + 10
+    while indice._reconstruindo and time.monotonic() < limite:
+        time.sleep(0.01)
+
+
+def test_versao_recusada_nao_e_reconstruida_a_cada_requisicao(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "campo.xlsx")
+    gerar_planilha_campo(caminho, 20, 3)
+    construcoes = _contar_construcoes(monkeypatch)
+    indice = utils.IndiceEstacoes()
+    anterior = indice.obter(caminho)
+
+    _gravar_sem_abas(caminho)
+    for _ in range(20):
+        assert indice.obter(caminho) is anterior
+        _aguardar_reconstrucoes(indice)
+    assert len(construcoes) == 2
+
+    # Arquivo corrigido: uma versão nova volta a ser construída
+    gerar_planilha_campo(caminho, 25, 3)
+    _avancar_mtime(caminho, 10)
+    indice.obter(caminho)
+    _aguardar_reconstrucoes(indice)
+    assert len(construcoes) == 3
+    assert indice.obter(caminho) is not anterior
+
+
+def test_com_observador_so_a_recarga_reconstroi_o_indice(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "campo.xlsx")
+    gerar_planilha_campo(caminho, 20, 3)
+    indice = utils.IndiceEstacoes()
+    indice.manter_versao_anterior = True
+    monkeypatch.setattr(utils, "indice_estacoes", indice)
+    monkeypatch.setattr(utils, "PLANILHA_CAMPO", caminho)
+    anterior = indice.obter(caminho)
+    construcoes = _contar_construcoes(monkeypatch)
+
+    _gravar_sem_abas(caminho)
+    for _ in range(20):
+        assert indice.obter(caminho) is anterior
+    assert construcoes == []
+
+    # Evento do observador: uma leitura, recusada, e a versão anterior continua
+    try:
+        utils.recarregar_planilha(caminho)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("índice vazio deveria ser recusado")
+    assert len(construcoes) == 1
+    assert indice.obter(caminho) is anterior
+
+    gerar_planilha_campo(caminho, 25, 3)
+    _avancar_mtime(caminho, 10)
+    assert utils.recarregar_planilha(caminho) is True
+    assert len(construcoes) == 2
+    assert indice.obter(caminho) is not anterior
@@ -0,0 +1,37 @@
+import uuid
+
+from sqlalchemy import func, select
+
+
+def _envio(tipo, campos, estacao="CPR"):
+    return {"id": str(uuid.uuid4()), "tipo": tipo, "estacao": estacao, "campos": campos}
+
+
+def test_envio_com_valor_invalido_nao_bloqueia_o_lote(main, cliente_logado):
+    validos = [
+        _envio("campo", {"comunicacao_1_status": "OK", "comunicacao_1_equipamento": "EQ-1"}),
+        # números viram texto
+        _envio("campo", {"comunicacao_1_status": "NOK", "comunicacao_1_clp": 12.5, "comunicacao_2_status": "OK",
+                         "comunicacao_2_equipamento": 7}),
+    ]
+    invalidos = [
+        _envio("campo", {"comunicacao_1_status": {"valor": "OK"}}),
+        _envio("campo", {"comunicacao_1_status": ["OK"]}),
+        _envio("isolado", {"status_1": "OK", "aba_1": None}),
+    ]
+    with main.SessionLocal() as db:
+        antes = db.scalar(select(func.count()).select_from(main.ResultadoCampo))
+
+    resposta = cliente_logado.post("/api/sincronizar", json={"envios": validos + invalidos})
+    assert resposta.status_code == 200
+    status = {r["id"]: r["status"] for r in resposta.json()["resultados"]}
+    assert [status[e["id"]] for e in validos] == ["gravado", "gravado"]
+    assert [status[e["id"]] for e in invalidos] == ["invalido"] * 3
+
+    with main.SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(main.ResultadoCampo)) == antes + 3
+        assert db.scalar(select(main.ResultadoCampo.valor_clp).where(main.ResultadoCampo.valor_clp == "12.5")) == "12.5"
+
+    # Reenvio do mesmo lote: os válidos já foram recebidos
+    resposta = cliente_logado.post("/api/sincronizar", json={"envios": validos})
+    assert [r["status"] for r in resposta.json()["resultados"]] == ["duplicado", "duplicado"]